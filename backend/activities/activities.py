@@ -1,9 +1,14 @@
 import os
+import io
+import csv
 import json
-from datetime import datetime
-from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import libsql
+from utils.db import connect_database
+
+from activities.rollups import new_deltas, add_activity, apply_deltas, apply_activity, ensure_rollups
+from activities.search import SEARCH_SQL, build_match_query
 
 activities_bp = Blueprint('activities', __name__)
 
@@ -13,17 +18,76 @@ _activities_conn = None
 def get_activities_db():
     global _activities_conn
     if _activities_conn is None:
-        turso_url = os.getenv("TURSO_DATABASE_URL")
-        turso_auth_token = os.getenv("TURSO_AUTH_TOKEN")
-        
-        if not turso_url or not turso_auth_token:
-            raise RuntimeError("TURSO_DATABASE_URL and TURSO_AUTH_TOKEN must be set")
-        
-        # Remote-only connection to Turso (no local file)
-        _activities_conn = libsql.connect(database=turso_url, auth_token=turso_auth_token)
-        
+        conn = connect_database()
+        # Every activity write updates the rollups, so they must exist before the first one
+        ensure_rollups(conn)
+        _activities_conn = conn
     return _activities_conn
 
+# Upper bound on the number of activities accepted by a single bulk request
+MAX_BULK_ACTIVITIES = int(os.getenv('MAX_BULK_ACTIVITIES', 500))
+
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = int(os.getenv('ACTIVITY_EXPORT_BATCH_SIZE', 500))
+
+EXPORT_COLUMNS = ['id', 'user_id', 'activity_type', 'title', 'status', 'result', 'details', 'created_at']
+
+def _validate_activity(data, allow_created_at=False):
+    """
+    Validate an activity payload and build its row values.
+    A client-supplied created_at is only honoured with `allow_created_at` (bulk imports
+    of activities queued offline); otherwise the activity is stamped with the current time.
+    Returns (values, None) on success or (None, error message) on failure.
+    """
+    if not isinstance(data, dict):
+        return None, 'Activity must be an object'
+
+    activity_type = data.get('activity_type')
+    title = data.get('title')
+    status = data.get('status', 'completed')
+    result = data.get('result')
+    details = data.get('details', {})
+    created_at = data.get('created_at') if allow_created_at else None
+
+    if not activity_type:
+        return None, 'activity_type is required'
+    if not title:
+        return None, 'title is required'
+    if details is not None and not isinstance(details, (dict, str)):
+        return None, 'details must be an object'
+
+    # Offline clients may send the time the activity actually happened
+    if created_at:
+        try:
+            created_at = datetime.fromisoformat(str(created_at)).isoformat()
+        except ValueError:
+            return None, 'created_at must be an ISO timestamp'
+    else:
+        created_at = datetime.now().isoformat()
+
+    # Convert details to JSON string if it's a dict
+    details_json = json.dumps(details) if isinstance(details, dict) else details
+
+    return (activity_type, title, status, result, details_json, created_at), None
+
+def _serialize_activity(activity):
+    """Convert a user_activities row into the JSON shape returned by the API."""
+    try:
+        details = json.loads(activity[6]) if activity[6] else {}
+    except (json.JSONDecodeError, TypeError):
+        details = {}
+
+    return {
+        'id': activity[0],
+        'user_id': activity[1],
+        'activity_type': activity[2],
+        'title': activity[3],
+        'status': activity[4],
+        'result': activity[5],
+        'details': details,
+        'created_at': activity[7]
+    }
+
 @activities_bp.route('/api/activities/create', methods=['POST'])
 @jwt_required()
 def create_activity():
@@ -37,39 +101,33 @@ def create_activity():
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
-            
-        activity_type = data.get('activity_type')
-        title = data.get('title')
-        status = data.get('status', 'completed')
-        result = data.get('result')
-        details = data.get('details', {})
-        
+
         # Validate required fields
-        if not activity_type:
-            return jsonify({'error': 'activity_type is required'}), 400
-        if not title:
-            return jsonify({'error': 'title is required'}), 400
+        values, error = _validate_activity(data)
+        if error:
+            return jsonify({'error': error}), 400
         if not user_id:
             return jsonify({'error': 'User authentication required'}), 401
 
         conn = get_activities_db()
         cur = conn.cursor()
-        
-        # Convert details to JSON string if it's a dict
-        details_json = json.dumps(details) if isinstance(details, dict) else details
-        
-        # Insert new activity
-        cur.execute(
-            '''INSERT INTO user_activities 
-               (user_id, activity_type, title, status, result, details, created_at) 
-               VALUES (?, ?, ?, ?, ?, ?, ?)''',
-            (int(user_id), activity_type, title, status, result, 
-             details_json, datetime.now().isoformat())
-        )
-        conn.commit()
-        
+
+        # Insert new activity and count it in the dashboard rollups
+        try:
+            cur.execute(
+                '''INSERT INTO user_activities
+                   (user_id, activity_type, title, status, result, details, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (int(user_id),) + values
+            )
+            activity_id = cur.lastrowid
+            apply_activity(cur, user_id, values[0], values[4], values[5])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
         # Get the created activity
-        activity_id = cur.lastrowid
         
         if activity_id:
             cur.execute(
@@ -81,16 +139,7 @@ def create_activity():
             if activity:
                 return jsonify({
                     'success': True,
-                    'activity': {
-                        'id': activity[0],
-                        'user_id': activity[1],
-                        'activity_type': activity[2],
-                        'title': activity[3],
-                        'status': activity[4],
-                        'result': activity[5],
-                        'details': json.loads(activity[6]) if activity[6] else {},
-                        'created_at': activity[7]
-                    }
+                    'activity': _serialize_activity(activity)
                 }), 201
         
         return jsonify({'error': 'Failed to create activity'}), 500
@@ -104,6 +153,80 @@ def create_activity():
         traceback.print_exc()
         return jsonify({'error': f'Failed to create activity: {str(e)}'}), 500
 
+@activities_bp.route('/api/activities/bulk', methods=['POST'])
+@jwt_required()
+def bulk_create_activities():
+    """
+    Create many activities in a single transaction.
+    Accepts {"activities": [...]} (or a bare list). Invalid items are reported
+    per index in `errors` and do not prevent the valid ones from being stored.
+    Items may carry the created_at of when they were queued offline.
+    """
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json()
+
+        items = data.get('activities') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'activities must be a non-empty list'}), 400
+        if len(items) > MAX_BULK_ACTIVITIES:
+            return jsonify({
+                'error': f'Too many activities in one request (max {MAX_BULK_ACTIVITIES})'
+            }), 413
+
+        rows = []
+        indices = []
+        errors = []
+        deltas = new_deltas()
+        for index, item in enumerate(items):
+            values, error = _validate_activity(item, allow_created_at=True)
+            if error:
+                errors.append({'index': index, 'error': error})
+            else:
+                rows.append((int(user_id),) + values)
+                indices.append(index)
+                add_activity(deltas, user_id, values[0], values[4], values[5])
+
+        created = []
+        if rows:
+            conn = get_activities_db()
+            cur = conn.cursor()
+            try:
+                # One INSERT per row, still in a single transaction, so each id is
+                # read back from its own statement rather than inferred from the last one
+                ids = []
+                for row in rows:
+                    cur.execute(
+                        '''INSERT INTO user_activities
+                           (user_id, activity_type, title, status, result, details, created_at)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                        row
+                    )
+                    ids.append(cur.lastrowid)
+                apply_deltas(cur, deltas)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            created = [
+                {'index': index, 'id': activity_id}
+                for index, activity_id in zip(indices, ids)
+            ]
+
+        status_code = 201 if created else 400
+        return jsonify({
+            'success': bool(created),
+            'created': created,
+            'errors': errors,
+            'created_count': len(created),
+            'error_count': len(errors)
+        }), status_code
+
+    except Exception as e:
+        print(f"Bulk create activities error: {e}")
+        return jsonify({'error': 'Failed to create activities'}), 500
+
 @activities_bp.route('/api/activities', methods=['GET'])
 @jwt_required()
 def get_activities():
@@ -135,23 +258,7 @@ def get_activities():
         
         activities = cur.fetchall()
         
-        activities_list = []
-        for activity in activities:
-            try:
-                details = json.loads(activity[6]) if activity[6] else {}
-            except (json.JSONDecodeError, TypeError):
-                details = {}
-                
-            activities_list.append({
-                'id': activity[0],
-                'user_id': activity[1],
-                'activity_type': activity[2],
-                'title': activity[3],
-                'status': activity[4],
-                'result': activity[5],
-                'details': details,
-                'created_at': activity[7]
-            })
+        activities_list = [_serialize_activity(activity) for activity in activities]
         
         has_more = (page * limit) < total_count
         
@@ -170,6 +277,215 @@ def get_activities():
         print(f"Get activities error: {e}")
         return jsonify({'error': 'Failed to fetch activities'}), 500
 
+@activities_bp.route('/api/activities/export', methods=['GET'])
+@jwt_required()
+def export_activities():
+    """
+    Stream the full activity history of the current user as NDJSON or CSV.
+    Query params: format=ndjson|csv (default ndjson), type=<activity_type> (optional)
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        export_format = request.args.get('format', 'ndjson').lower()
+        activity_type = request.args.get('type')
+
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+        rows = _iter_user_activities(user_id, activity_type)
+        if export_format == 'csv':
+            body, mimetype = _csv_lines(rows), 'text/csv'
+        else:
+            body, mimetype = _ndjson_lines(rows), 'application/x-ndjson'
+
+        filename = f"activities-{user_id}.{export_format}"
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'Cache-Control': 'no-store'
+            }
+        )
+
+    except Exception as e:
+        print(f"Export activities error: {e}")
+        return jsonify({'error': 'Failed to export activities'}), 500
+
+def _iter_user_activities(user_id, activity_type=None):
+    """
+    Yield a user's activities in id order, one batch per round trip.
+    Keyset pagination on the primary key keeps each query an index range scan
+    and only EXPORT_BATCH_SIZE rows are ever held in memory.
+    """
+    conn = get_activities_db()
+    cur = conn.cursor()
+    last_id = 0
+
+    query = 'SELECT * FROM user_activities WHERE user_id = ? AND id > ?'
+    if activity_type:
+        query += ' AND activity_type = ?'
+    query += ' ORDER BY id LIMIT ?'
+
+    while True:
+        params = (user_id, last_id, activity_type) if activity_type else (user_id, last_id)
+        cur.execute(query, params + (EXPORT_BATCH_SIZE,))
+        batch = cur.fetchall()
+        if not batch:
+            return
+
+        yield from batch
+
+        if len(batch) < EXPORT_BATCH_SIZE:
+            return
+        last_id = batch[-1][0]
+
+def _ndjson_lines(rows):
+    """Encode rows as newline-delimited JSON, decoding `details` one row at a time."""
+    for activity in rows:
+        yield json.dumps(_serialize_activity(activity)) + '\n'
+
+def _csv_lines(rows):
+    """Encode rows as CSV; `details` is written as its stored JSON text without decoding."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(EXPORT_COLUMNS)
+    for activity in rows:
+        writer.writerow(activity[:len(EXPORT_COLUMNS)])
+        # Flush whatever has accumulated and reuse the buffer for the next row
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    # Header only, when the user has no activities
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@activities_bp.route('/api/activities/stats', methods=['GET'])
+@jwt_required()
+def get_activity_stats():
+    """
+    Dashboard statistics answered from the rollup tables.
+    Query params: days=<window for the per-day series, default 30>,
+                  top=<size of the top lists, default 5>, region=<city filter>
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        days = min(max(int(request.args.get('days', 30)), 1), 366)
+        top = min(max(int(request.args.get('top', 5)), 1), 50)
+        region = request.args.get('region')
+
+        since = (datetime.now() - timedelta(days=days - 1)).date().isoformat()
+
+        conn = get_activities_db()
+        cur = conn.cursor()
+
+        cur.execute(
+            '''SELECT activity_type, SUM(count) FROM activity_daily_rollups
+               WHERE user_id = ? GROUP BY activity_type''',
+            (user_id,)
+        )
+        totals = {activity_type: count for activity_type, count in cur.fetchall() if count}
+
+        cur.execute(
+            '''SELECT day, activity_type, count FROM activity_daily_rollups
+               WHERE user_id = ? AND day >= ? AND count > 0
+               ORDER BY day''',
+            (user_id, since)
+        )
+        per_day = [
+            {'day': day, 'activity_type': activity_type, 'count': count}
+            for day, activity_type, count in cur.fetchall()
+        ]
+
+        def top_labels(activity_type):
+            query = '''SELECT label, SUM(count) AS total FROM activity_label_rollups
+                       WHERE user_id = ? AND activity_type = ?'''
+            params = [user_id, activity_type]
+            if region:
+                query += ' AND region = ?'
+                params.append(region.strip().title())
+            query += ' GROUP BY label HAVING total > 0 ORDER BY total DESC LIMIT ?'
+            params.append(top)
+            cur.execute(query, params)
+            return [{'label': label, 'count': total} for label, total in cur.fetchall()]
+
+        top_diseases = top_labels('disease')
+        top_crops = top_labels('crop')
+
+        cur.execute(
+            '''SELECT region, SUM(count) AS total FROM activity_label_rollups
+               WHERE user_id = ? AND region != ''
+               GROUP BY region HAVING total > 0 ORDER BY total DESC LIMIT ?''',
+            (user_id, top)
+        )
+        regions = [{'region': name, 'count': total} for name, total in cur.fetchall()]
+
+        return jsonify({
+            'success': True,
+            'stats': {
+                'totals': totals,
+                'per_day': per_day,
+                'top_diseases': top_diseases,
+                'top_crops': top_crops,
+                'regions': regions,
+                'since': since
+            }
+        }), 200
+
+    except ValueError:
+        return jsonify({'error': 'days and top must be integers'}), 400
+    except Exception as e:
+        print(f"Get activity stats error: {e}")
+        return jsonify({'error': 'Failed to fetch activity stats'}), 500
+
+@activities_bp.route('/api/activities/search', methods=['GET'])
+@jwt_required()
+def search_activities():
+    """
+    Ranked full-text search over the current user's activities.
+    Query params: q=<search text>, page=<default 1>, limit=<default 10, max 50>
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        page = max(int(request.args.get('page', 1)), 1)
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+
+        match_query = build_match_query(request.args.get('q', ''), user_id)
+        if match_query is None:
+            return jsonify({'error': 'q is required'}), 400
+
+        conn = get_activities_db()
+        cur = conn.cursor()
+
+        # Fetch one extra row to know whether another page exists without a COUNT(*)
+        cur.execute(SEARCH_SQL, (match_query, limit + 1, (page - 1) * limit, user_id))
+        rows = cur.fetchall()
+
+        results = []
+        for row in rows[:limit]:
+            activity = _serialize_activity(row)
+            # Raw bm25 (higher is better): rounding ties this index's small scores
+            activity['score'] = -row[-1]
+            results.append(activity)
+
+        return jsonify({
+            'success': True,
+            'activities': results,
+            'pagination': {
+                'page': page,
+                'limit': limit,
+                'has_more': len(rows) > limit
+            }
+        }), 200
+
+    except ValueError:
+        return jsonify({'error': 'page and limit must be integers'}), 400
+    except Exception as e:
+        print(f"Search activities error: {e}")
+        return jsonify({'error': 'Failed to search activities'}), 500
+
 @activities_bp.route('/api/activities/<int:activity_id>', methods=['GET'])
 @jwt_required()
 def get_activity(activity_id):
@@ -189,23 +505,9 @@ def get_activity(activity_id):
         if not activity:
             return jsonify({'error': 'Activity not found'}), 404
         
-        try:
-            details = json.loads(activity[6]) if activity[6] else {}
-        except (json.JSONDecodeError, TypeError):
-            details = {}
-        
         return jsonify({
             'success': True,
-            'activity': {
-                'id': activity[0],
-                'user_id': activity[1],
-                'activity_type': activity[2],
-                'title': activity[3],
-                'status': activity[4],
-                'result': activity[5],
-                'details': details,
-                'created_at': activity[7]
-            }
+            'activity': _serialize_activity(activity)
         }), 200
     
     except Exception as e:
@@ -227,8 +529,8 @@ def update_activity(activity_id):
             'SELECT * FROM user_activities WHERE id = ? AND user_id = ?',
             (activity_id, int(user_id))
         )
-        
-        if not cur.fetchone():
+        existing = cur.fetchone()
+        if not existing:
             return jsonify({'error': 'Activity not found'}), 404
         
         # Update activity
@@ -253,13 +555,23 @@ def update_activity(activity_id):
         
         if update_fields:
             update_values.extend([activity_id, int(user_id)])
-            cur.execute(
-                f'''UPDATE user_activities 
-                   SET {', '.join(update_fields)} 
-                   WHERE id = ? AND user_id = ?''',
-                update_values
-            )
-            conn.commit()
+            try:
+                cur.execute(
+                    f'''UPDATE user_activities 
+                       SET {', '.join(update_fields)} 
+                       WHERE id = ? AND user_id = ?''',
+                    update_values
+                )
+                # Only details can move an activity to another rollup bucket
+                if details is not None:
+                    deltas = new_deltas()
+                    add_activity(deltas, user_id, existing[2], existing[6], existing[7], sign=-1)
+                    add_activity(deltas, user_id, existing[2], details, existing[7])
+                    apply_deltas(cur, deltas)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
         
         # Get updated activity
         cur.execute(
@@ -269,23 +581,9 @@ def update_activity(activity_id):
         
         activity = cur.fetchone()
         
-        try:
-            details = json.loads(activity[6]) if activity[6] else {}
-        except (json.JSONDecodeError, TypeError):
-            details = {}
-        
         return jsonify({
             'success': True,
-            'activity': {
-                'id': activity[0],
-                'user_id': activity[1],
-                'activity_type': activity[2],
-                'title': activity[3],
-                'status': activity[4],
-                'result': activity[5],
-                'details': details,
-                'created_at': activity[7]
-            }
+            'activity': _serialize_activity(activity)
         }), 200
     
     except Exception as e:
@@ -306,16 +604,21 @@ def delete_activity(activity_id):
             'SELECT * FROM user_activities WHERE id = ? AND user_id = ?',
             (activity_id, int(user_id))
         )
-        
-        if not cur.fetchone():
+        activity = cur.fetchone()
+        if not activity:
             return jsonify({'error': 'Activity not found'}), 404
         
-        # Delete activity
-        cur.execute(
-            'DELETE FROM user_activities WHERE id = ? AND user_id = ?',
-            (activity_id, int(user_id))
-        )
-        conn.commit()
+        # Delete activity and remove it from the rollups
+        try:
+            cur.execute(
+                'DELETE FROM user_activities WHERE id = ? AND user_id = ?',
+                (activity_id, int(user_id))
+            )
+            apply_activity(cur, user_id, activity[2], activity[6], activity[7], sign=-1)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         
         return jsonify({'success': True, 'message': 'Activity deleted'}), 200
     
@@ -2,6 +2,7 @@
 
 import sqlite3
 import os
+import sys
 
 db_path = os.path.join(os.path.dirname(__file__), 'activities.db')
 conn = sqlite3.connect(db_path)
@@ -25,6 +26,14 @@ cur.execute('CREATE INDEX IF NOT EXISTS idx_user_activities_user_id ON user_acti
 cur.execute('CREATE INDEX IF NOT EXISTS idx_user_activities_created_at ON user_activities(created_at DESC)')
 cur.execute('CREATE INDEX IF NOT EXISTS idx_user_activities_type ON user_activities(activity_type)')
 
+# Dashboard rollups and the full-text search index with its sync triggers
+# (the same SQL as activities/rollups.py and activities/search.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from activities.rollups import ROLLUP_SCHEMA
+from activities.search import SEARCH_SCHEMA
+for statement in ROLLUP_SCHEMA + SEARCH_SCHEMA:
+    cur.execute(statement)
+
 conn.commit()
 conn.close()
-print("Initialized activities.db with user_activities table and indexes.")
\ No newline at end of file
+print("Initialized activities.db with user_activities table, indexes, rollup tables and search index.")
\ No newline at end of file
@@ -0,0 +1,189 @@
+# Incrementally maintained aggregates over user_activities for the dashboard stats.
+#
+# Rebuild from scratch (run from the backend directory):
+#   python -m activities.rollups rebuild
+
+import sys
+import json
+from collections import Counter
+
+ROLLUP_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS activity_daily_rollups (
+        user_id INTEGER NOT NULL,
+        activity_type TEXT NOT NULL,
+        day TEXT NOT NULL,                -- YYYY-MM-DD taken from created_at
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, activity_type, day)
+    )''',
+    '''CREATE TABLE IF NOT EXISTS activity_label_rollups (
+        user_id INTEGER NOT NULL,
+        activity_type TEXT NOT NULL,      -- 'crop', 'disease', 'fertilizer'
+        region TEXT NOT NULL DEFAULT '',  -- city from details, '' when unknown
+        label TEXT NOT NULL,              -- recommended crop / detected disease / analysed crop
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, activity_type, region, label)
+    )''',
+]
+
+# Where the label of each activity type lives inside `details`
+LABEL_PATHS = {
+    'crop': ('recommended_crop', 'name'),
+    'disease': ('disease_name',),
+    'fertilizer': ('crop_name',),
+}
+
+REBUILD_BATCH_SIZE = 1000
+
+def ensure_rollup_tables(conn):
+    """Create the rollup tables if they don't exist yet."""
+    cur = conn.cursor()
+    for statement in ROLLUP_SCHEMA:
+        cur.execute(statement)
+    conn.commit()
+
+def ensure_rollups(conn):
+    """
+    Create and fill the rollup tables on a database that doesn't have them yet, so
+    activity writes (which update them in the same transaction) work without a
+    manual migration. Returns True if they had to be built.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN (?, ?)",
+        ('activity_daily_rollups', 'activity_label_rollups')
+    )
+    if cur.fetchone()[0] == len(ROLLUP_SCHEMA):
+        return False
+    scanned, daily, labels = rebuild_rollups(conn)
+    print(f"Created activity rollups from {scanned} activities: {daily} daily buckets, {labels} label buckets")
+    return True
+
+def _load_details(details):
+    if isinstance(details, dict):
+        return details
+    try:
+        loaded = json.loads(details) if details else {}
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    return loaded if isinstance(loaded, dict) else {}
+
+def _extract_label(activity_type, details):
+    value = details
+    for key in LABEL_PATHS.get(activity_type, ()):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    if not value or not isinstance(value, str) or value == 'Unknown':
+        return None
+    # Crop names arrive both title-cased and lower-cased from the frontend
+    return value.strip().lower() if activity_type in ('crop', 'fertilizer') else value.strip()
+
+def rollup_keys(activity_type, details, created_at):
+    """
+    Return the (daily_key, label_key) buckets an activity contributes to.
+    label_key is None when the activity carries no usable label.
+    """
+    details = _load_details(details)
+    day = str(created_at or '')[:10]
+    daily_key = (activity_type, day)
+
+    label = _extract_label(activity_type, details)
+    if label is None:
+        return daily_key, None
+
+    region = details.get('city') or ''
+    region = region.strip().title() if isinstance(region, str) else ''
+    return daily_key, (activity_type, region, label)
+
+def add_activity(deltas, user_id, activity_type, details, created_at, sign=1):
+    """Accumulate the contribution (sign=+1) or removal (sign=-1) of one activity."""
+    daily, labels = deltas
+    daily_key, label_key = rollup_keys(activity_type, details, created_at)
+    daily[(int(user_id),) + daily_key] += sign
+    if label_key is not None:
+        labels[(int(user_id),) + label_key] += sign
+
+def new_deltas():
+    return Counter(), Counter()
+
+def apply_deltas(cur, deltas):
+    """
+    Upsert accumulated deltas. Call inside the same transaction as the
+    user_activities write so the rollups can never drift from the table.
+    """
+    daily, labels = deltas
+    daily_rows = [key + (delta,) for key, delta in daily.items() if delta]
+    label_rows = [key + (delta,) for key, delta in labels.items() if delta]
+
+    if daily_rows:
+        cur.executemany(
+            '''INSERT INTO activity_daily_rollups (user_id, activity_type, day, count)
+               VALUES (?, ?, ?, ?)
+               ON CONFLICT (user_id, activity_type, day)
+               DO UPDATE SET count = count + excluded.count''',
+            daily_rows
+        )
+    if label_rows:
+        cur.executemany(
+            '''INSERT INTO activity_label_rollups (user_id, activity_type, region, label, count)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (user_id, activity_type, region, label)
+               DO UPDATE SET count = count + excluded.count''',
+            label_rows
+        )
+
+def apply_activity(cur, user_id, activity_type, details, created_at, sign=1):
+    """Shortcut for recording a single activity change."""
+    deltas = new_deltas()
+    add_activity(deltas, user_id, activity_type, details, created_at, sign)
+    apply_deltas(cur, deltas)
+
+def rebuild_rollups(conn):
+    """Recompute both rollup tables from user_activities in one transaction."""
+    ensure_rollup_tables(conn)
+    cur = conn.cursor()
+    deltas = new_deltas()
+    last_id = 0
+    scanned = 0
+
+    # Batches keep memory bounded by the number of buckets, not the number of rows
+    while True:
+        cur.execute(
+            '''SELECT id, user_id, activity_type, details, created_at
+               FROM user_activities WHERE id > ? ORDER BY id LIMIT ?''',
+            (last_id, REBUILD_BATCH_SIZE)
+        )
+        batch = cur.fetchall()
+        if not batch:
+            break
+        for activity_id, user_id, activity_type, details, created_at in batch:
+            add_activity(deltas, user_id, activity_type, details, created_at)
+        scanned += len(batch)
+        last_id = batch[-1][0]
+
+    try:
+        cur.execute('DELETE FROM activity_daily_rollups')
+        cur.execute('DELETE FROM activity_label_rollups')
+        apply_deltas(cur, deltas)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return scanned, len(deltas[0]), len(deltas[1])
+
+def main(argv):
+    if argv[1:] != ['rebuild']:
+        print("Usage: python -m activities.rollups rebuild")
+        return 1
+
+    from dotenv import load_dotenv
+    from activities.activities import get_activities_db
+
+    load_dotenv()
+    scanned, daily, labels = rebuild_rollups(get_activities_db())
+    print(f"Rebuilt rollups from {scanned} activities: {daily} daily buckets, {labels} label buckets")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
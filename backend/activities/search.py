@@ -0,0 +1,114 @@
+# Full-text search index over user_activities (SQLite/libsql FTS5).
+#
+# The index is kept in sync by triggers. To (re)build it for existing rows,
+# run from the backend directory:
+#   python -m activities.search rebuild
+
+import re
+import sys
+
+# Searchable text pulled out of the details JSON of each activity type
+_DETAILS_TEXT = '''CASE WHEN json_valid({row}.details) THEN
+        coalesce(json_extract({row}.details, '$.disease_name'), '') || ' ' ||
+        coalesce(json_extract({row}.details, '$.recommended_crop.name'), '') || ' ' ||
+        coalesce(json_extract({row}.details, '$.crop_name'), '') || ' ' ||
+        coalesce(json_extract({row}.details, '$.city'), '')
+    ELSE '' END'''
+
+SEARCH_SCHEMA = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS user_activities_fts USING fts5(
+        title, result, details, owner,
+        tokenize = 'porter unicode61', detail = column
+    )''',
+    f'''CREATE TRIGGER IF NOT EXISTS user_activities_fts_insert
+        AFTER INSERT ON user_activities BEGIN
+            INSERT INTO user_activities_fts (rowid, title, result, details, owner)
+            VALUES (new.id, new.title, coalesce(new.result, ''), {_DETAILS_TEXT.format(row='new')}, 'u' || new.user_id);
+        END''',
+    '''CREATE TRIGGER IF NOT EXISTS user_activities_fts_delete
+        AFTER DELETE ON user_activities BEGIN
+            DELETE FROM user_activities_fts WHERE rowid = old.id;
+        END''',
+    f'''CREATE TRIGGER IF NOT EXISTS user_activities_fts_update
+        AFTER UPDATE OF title, result, details ON user_activities BEGIN
+            DELETE FROM user_activities_fts WHERE rowid = old.id;
+            INSERT INTO user_activities_fts (rowid, title, result, details, owner)
+            VALUES (new.id, new.title, coalesce(new.result, ''), {_DETAILS_TEXT.format(row='new')}, 'u' || new.user_id);
+        END''',
+]
+
+REBUILD_SQL = f'''INSERT INTO user_activities_fts (rowid, title, result, details, owner)
+    SELECT id, title, coalesce(result, ''), {_DETAILS_TEXT.format(row='user_activities')}, 'u' || user_id
+    FROM user_activities'''
+
+# bm25 column weights: title, result, details, owner.
+# The owner token ('u<user_id>') is part of the MATCH expression so FTS5 intersects
+# posting lists and only ranks the current user's hits; filtering on an UNINDEXED
+# user_id column would rank every user's matches first.
+# Ranking happens inside the FTS table; only the requested page is joined back.
+SEARCH_SQL = '''SELECT a.*, hits.score FROM (
+        SELECT rowid, bm25(user_activities_fts, 10.0, 4.0, 6.0, 0.0) AS score
+        FROM user_activities_fts
+        WHERE user_activities_fts MATCH ?
+        ORDER BY score
+        LIMIT ? OFFSET ?
+    ) AS hits
+    JOIN user_activities a ON a.id = hits.rowid
+    WHERE a.user_id = ?
+    ORDER BY hits.score'''
+
+# Split on what unicode61 treats as separators, '_' included, so each quoted term is
+# one index token; a multi-token term is a phrase, which detail=column rejects
+_TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+def build_match_query(text, user_id):
+    """
+    Turn free text typed by a user into a safe FTS5 query scoped to user_id.
+    Every word must match (implicit AND) and the last one is treated as a
+    prefix so results update while the user is still typing.
+    Returns None when the text has no searchable words.
+    """
+    tokens = _TOKEN_RE.findall(text or '')
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return f'owner : "u{int(user_id)}" AND {{title result details}} : ({" ".join(terms)})'
+
+def ensure_search_index(conn):
+    """Create the FTS table and its sync triggers if they don't exist yet."""
+    cur = conn.cursor()
+    for statement in SEARCH_SCHEMA:
+        cur.execute(statement)
+    conn.commit()
+
+def rebuild_search_index(conn):
+    """Repopulate the FTS table from user_activities."""
+    ensure_search_index(conn)
+    cur = conn.cursor()
+    try:
+        cur.execute('DELETE FROM user_activities_fts')
+        cur.execute(REBUILD_SQL)
+        cur.execute("INSERT INTO user_activities_fts (user_activities_fts) VALUES ('optimize')")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    cur.execute('SELECT COUNT(*) FROM user_activities_fts')
+    return cur.fetchone()[0]
+
+def main(argv):
+    if argv[1:] != ['rebuild']:
+        print("Usage: python -m activities.search rebuild")
+        return 1
+
+    from dotenv import load_dotenv
+    from activities.activities import get_activities_db
+
+    load_dotenv()
+    indexed = rebuild_search_index(get_activities_db())
+    print(f"Indexed {indexed} activities")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
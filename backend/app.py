@@ -2,19 +2,17 @@
 
 import os
 from datetime import timedelta
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import requests
 import numpy as np
 import pandas as pd
 import pickle
 import io
-import torch
 from datetime import datetime
 # from torchvision import transforms
 from utils.fertilizer import fertilizer_dic
 from utils.disease import disease_dic
-from transformers import AutoImageProcessor, AutoModelForImageClassification
 from PIL import Image
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
@@ -22,15 +20,30 @@ from dotenv import load_dotenv
 from auth.auth import auth_bp
 from auth.google_oauth import oauth_bp, init_oauth
 from activities.activities import activities_bp
+from utils.metrics import Histogram, render as render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.request_metrics import init_request_metrics, uptime_seconds
+from utils.profiling import init_profiling
+from utils.model_registry import register_model, models_status, load_all, warm_up_in_background
+from utils.cascade import CascadeClassifier, resnet9_predict, hf_predict
+from utils.disease_classes import disease_classes, hf_class_names
+from utils.crop_ranges import get_crop_ranges
 
 load_dotenv()
 
 # -------------------------LOADING THE TRAINED MODELS -----------------------------------------------
 
+# Models are loaded on first use (see utils/model_registry.py), so importing this module
+# stays cheap. MODEL_WARMUP=background starts loading them in a thread at startup,
+# MODEL_WARMUP=eager loads them before the app is created; /api/ready reports progress.
+
 # Loading crop recommendation model
 crop_recommendation_model_path = './models/EnhancedRandomForest.pkl'
-crop_recommendation_model = pickle.load(
-    open(crop_recommendation_model_path, 'rb'))
+
+def _load_crop_recommendation_model():
+    with open(crop_recommendation_model_path, 'rb') as f:
+        return pickle.load(f)
+
+crop_recommendation_model = register_model('crop_recommendation', _load_crop_recommendation_model)
 
 # Loading plant disease classification model
 
@@ -81,10 +94,60 @@ crop_recommendation_model = pickle.load(
 #     disease_model_path, map_location=torch.device('cpu')))
 # disease_model.eval()
 model_name = "linkanjarad/mobilenet_v2_1.0_224-plant-disease-identification"
-processor = AutoImageProcessor.from_pretrained(model_name)
-disease_model = AutoModelForImageClassification.from_pretrained(model_name)
-disease_model.eval()
 
+def _load_disease_processor():
+    from transformers import AutoImageProcessor
+    return AutoImageProcessor.from_pretrained(model_name)
+
+def _load_disease_model():
+    from transformers import AutoModelForImageClassification
+    model = AutoModelForImageClassification.from_pretrained(model_name)
+    model.eval()
+    # Logit index -> disease_classes name; fails the load if id2label doesn't map onto them
+    model.plantvillage_classes = hf_class_names(model.config.id2label)
+    return model
+
+processor = register_model('disease_processor', _load_disease_processor)
+disease_model = register_model('disease', _load_disease_model)
+
+# DISEASE_CASCADE=true puts the legacy ResNet9 in front of the model above: it answers
+# alone when its confidence reaches DISEASE_CASCADE_THRESHOLD (see utils/cascade.py and
+# benchmarks/cascade_calibration.py for choosing the threshold).
+DISEASE_CASCADE = os.getenv('DISEASE_CASCADE', 'false').lower() in ('1', 'true', 'yes')
+DISEASE_CASCADE_THRESHOLD = float(os.getenv('DISEASE_CASCADE_THRESHOLD', 0.9))
+fast_disease_model_path = os.getenv('DISEASE_FAST_MODEL_PATH', './models/plant_disease_model.pth')
+
+def _load_fast_disease_model():
+    import torch
+    from utils.model import ResNet9
+    from utils.inference_opt import optimize_for_inference
+    model = ResNet9(3, len(disease_classes))
+    model.load_state_dict(torch.load(fast_disease_model_path, map_location=torch.device('cpu')))
+    return optimize_for_inference(model.eval())
+
+disease_cascade = None
+if DISEASE_CASCADE:
+    fast_disease_model = register_model('disease_fast', _load_fast_disease_model)
+    disease_cascade = CascadeClassifier(
+        fast=lambda image: resnet9_predict(fast_disease_model.get(), image),
+        slow=lambda image: hf_predict(processor.get(), disease_model.get(), image),
+        threshold=DISEASE_CASCADE_THRESHOLD
+    )
+
+# Stage timings for the handlers whose latency is dominated by model or upstream work
+DISEASE_INFERENCE_SECONDS = Histogram(
+    'farmalyze_disease_inference_seconds',
+    'Disease prediction time per stage (decode, preprocess, forward, cascade)',
+    ['stage']
+)
+WEATHER_UPSTREAM_SECONDS = Histogram(
+    'farmalyze_weather_upstream_seconds',
+    'Time spent waiting for OpenWeatherMap',
+    ['endpoint']
+)
+
+# Overridable so load tests can point at fakes/openweathermap.py
+OPENWEATHER_BASE_URL = os.getenv('OPENWEATHER_BASE_URL', 'http://api.openweathermap.org/data/2.5').rstrip('/')
 
 def weather_fetch(city_name):
     """
@@ -93,10 +156,11 @@ def weather_fetch(city_name):
     :return: temperature, humidity
     """
     weather_api_key=os.getenv("WEATHER_API_KEY")
-    base_url = "http://api.openweathermap.org/data/2.5/weather?"
+    base_url = f"{OPENWEATHER_BASE_URL}/weather?"
 
     complete_url = base_url + "appid=" + weather_api_key + "&q=" + city_name
-    response = requests.get(complete_url)
+    with WEATHER_UPSTREAM_SECONDS.time('weather_by_city'):
+        response = requests.get(complete_url)
     x = response.json()
 
     if x["cod"] != "404":
@@ -108,30 +172,53 @@ def weather_fetch(city_name):
     else:
         return None
 
-def predict_image(img, model=disease_model):
+def predict_image(img, model=None):
     """
     Transforms image to tensor and predicts disease label
-    :params: image bytes
+    :params: image bytes, optional model (defaults to the lazily loaded disease model)
     :return: prediction (string)
     """
+    import torch
+    if model is None:
+        model = disease_model.get()
+
     # Open image from bytes and convert to RGB
-    image = Image.open(io.BytesIO(img)).convert('RGB')
+    with DISEASE_INFERENCE_SECONDS.time('decode'):
+        image = Image.open(io.BytesIO(img)).convert('RGB')
     
     # Preprocess image
-    inputs = processor(images=image, return_tensors="pt")
+    with DISEASE_INFERENCE_SECONDS.time('preprocess'):
+        inputs = processor.get()(images=image, return_tensors="pt")
     
     # Get predictions
-    with torch.no_grad():
+    with DISEASE_INFERENCE_SECONDS.time('forward'), torch.no_grad():
         outputs = model(**inputs)
         logits = outputs.logits
     
-    # Get predicted class
+    # Get predicted class, as a disease_classes name like the cascade gives
     predicted_class_idx = logits.argmax(-1).item()
-    prediction = model.config.id2label[predicted_class_idx]
+    prediction = model.plantvillage_classes[predicted_class_idx]
     
     return prediction
 
+def predict_disease(img):
+    """
+    Disease label for image bytes, from the cascade when DISEASE_CASCADE is on
+    :params: image bytes
+    :return: prediction (string)
+    """
+    if disease_cascade is None:
+        return predict_image(img)
+
+    with DISEASE_INFERENCE_SECONDS.time('decode'):
+        image = Image.open(io.BytesIO(img)).convert('RGB')
+    with DISEASE_INFERENCE_SECONDS.time('cascade'):
+        prediction, _confidence, _stage = disease_cascade.predict(image)
+    return prediction
+
 app = Flask(__name__)
+# Registered first so its after_request hook runs last and times the whole request
+init_request_metrics(app)
 # CORS(app, supports_credentials=True)
 CORS(app, resources={
     r"/api/*": {
@@ -157,6 +244,13 @@ google_oauth = init_oauth(app) # initialize oauth
 app.register_blueprint(auth_bp)
 app.register_blueprint(oauth_bp)
 app.register_blueprint(activities_bp)
+init_profiling(app) # no-op unless PROFILING_ENABLED is set
+
+MODEL_WARMUP = os.getenv('MODEL_WARMUP', 'off').strip().lower()
+if MODEL_WARMUP == 'eager':
+    load_all()
+elif MODEL_WARMUP == 'background':
+    warm_up_in_background()
 
 @app.after_request
 def set_security_headers(response):
@@ -190,9 +284,18 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'uptime': 'active'
+        'uptime': 'active',
+        'uptime_seconds': round(uptime_seconds(), 1)
     })
     
+@app.route("/api/ready")
+def readiness_check():
+    ready, models = models_status()
+    return jsonify({
+        'ready': ready,
+        'models': models
+    }), 200 if ready else 503
+
 @app.route("/api/version")
 def get_version():
     import sys
@@ -200,6 +303,10 @@ def get_version():
         'python_version': sys.version
     })
 
+@app.route("/api/metrics")
+def get_metrics():
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
 # ===============================================================================================
 # FETCH DATA ROUTES
 
@@ -218,17 +325,19 @@ def get_weather_data():
             }), 400
             
         # Use coordinates for weather data
-        current_url = f"http://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={weather_api_key}"
-        forecast_url = f"http://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={weather_api_key}"
+        current_url = f"{OPENWEATHER_BASE_URL}/weather?lat={lat}&lon={lon}&appid={weather_api_key}"
+        forecast_url = f"{OPENWEATHER_BASE_URL}/forecast?lat={lat}&lon={lon}&appid={weather_api_key}"
 
 
         # Get current weather
-        current_response = requests.get(current_url)
+        with WEATHER_UPSTREAM_SECONDS.time('current'):
+            current_response = requests.get(current_url)
         current_data = current_response.json()
 
         if current_data["cod"] != "404":
             # Get forecast data
-            forecast_response = requests.get(forecast_url)
+            with WEATHER_UPSTREAM_SECONDS.time('forecast'):
+                forecast_response = requests.get(forecast_url)
             forecast_data = forecast_response.json()
 
             # Process current weather
@@ -302,7 +411,7 @@ def api_disease_prediction():
             }), 400
 
         img = file.read()
-        prediction = predict_image(img)
+        prediction = predict_disease(img)
         cleaned_prediction = prediction.replace("_", " ").title()
         
         disease_info = disease_dic.get(prediction, "")
@@ -339,13 +448,14 @@ def api_crop_prediction():
             input_data = np.array([[N, P, K, temperature, humidity, ph, rainfall]])
             
             # Get probability predictions for all crops
-            crop_probabilities = crop_recommendation_model.predict_proba(input_data)[0]
+            crop_model = crop_recommendation_model.get()
+            crop_probabilities = crop_model.predict_proba(input_data)[0]
             
             # Get indices of top 3 predictions
             top_indices = np.argsort(crop_probabilities)[::-1][:3]
             
             # Get the crop names for the top 3 predictions
-            top_crops = [crop_recommendation_model.classes_[i] for i in top_indices]
+            top_crops = [crop_model.classes_[i] for i in top_indices]
             
             # Get the probabilities for the top 3 predictions (convert to percentage)
             top_probabilities = [round(crop_probabilities[i] * 100, 2) for i in top_indices]
@@ -373,10 +483,13 @@ def api_crop_prediction():
                 'Fair': 'Your soil may need some amendments to improve crop yield. Consider pH adjustment and nutrient supplementation.'
             }
             
+            # Inputs outside each recommended crop's typical range (utils/crop_ranges.py)
+            out_of_range = get_crop_ranges().out_of_range(input_data[0], top_crops)
+            
             # Create list of recommendations with probabilities
             recommendations = [
-                {"crop": crop, "confidence": prob} 
-                for crop, prob in zip(top_crops, top_probabilities)
+                {"crop": crop, "confidence": prob, "out_of_range": outside} 
+                for crop, prob, outside in zip(top_crops, top_probabilities, out_of_range)
             ]
             
             # Create alternative crops list (the 2nd and 3rd recommendations)
@@ -384,9 +497,10 @@ def api_crop_prediction():
                 {
                     "name": crop, 
                     "confidence": prob,
-                    "reason": f"Alternative crop option with {prob}% suitability based on your soil parameters and local weather conditions."
+                    "reason": f"Alternative crop option with {prob}% suitability based on your soil parameters and local weather conditions.",
+                    "out_of_range": outside
                 } 
-                for crop, prob in zip(top_crops[1:], top_probabilities[1:])
+                for crop, prob, outside in zip(top_crops[1:], top_probabilities[1:], out_of_range[1:])
             ]
             
             # Return response in the format expected by the frontend
@@ -398,7 +512,8 @@ def api_crop_prediction():
                     'name': primary_crop.title(),
                     'confidence': primary_confidence,
                     'description': crop_descriptions.get(primary_crop.lower(), 
-                        f'{primary_crop.title()} is suitable for your soil and climate conditions.')
+                        f'{primary_crop.title()} is suitable for your soil and climate conditions.'),
+                    'outOfRange': out_of_range[0]
                 },
                 'recommendations': recommendations,
                 'alternatives': alternatives,
@@ -433,6 +548,44 @@ def api_crop_prediction():
             'error': str(e)
         }), 400
 
+# Crop -> required (N, P, K), read from Data/fertilizer.csv on first use
+_fertilizer_requirements = None
+
+def get_fertilizer_requirements():
+    global _fertilizer_requirements
+    if _fertilizer_requirements is None:
+        df = pd.read_csv('Data/fertilizer.csv')
+        requirements = {}
+        for crop, n, p, k in zip(df['Crop'], df['N'], df['P'], df['K']):
+            # First row wins, like the previous per-request lookup
+            requirements.setdefault(crop, (int(n), int(p), int(k)))
+        _fertilizer_requirements = requirements
+    return _fertilizer_requirements
+
+def fertilizer_recommendation_key(crop_name, N, P, K):
+    """
+    Key into fertilizer_dic for the nutrient furthest from the crop's requirement
+    :params: crop_name, measured N, P, K
+    :return: key such as 'NHigh' or 'Plow'
+    """
+    requirements = get_fertilizer_requirements().get(crop_name)
+    if requirements is None:
+        raise ValueError(f"Unknown crop '{crop_name}'")
+    nr, pr, kr = requirements
+
+    n = nr - N
+    p = pr - P
+    k = kr - K
+    temp = {abs(n): "N", abs(p): "P", abs(k): "K"}
+    max_value = temp[max(temp.keys())]
+
+    if max_value == "N":
+        return 'NHigh' if n < 0 else "Nlow"
+    elif max_value == "P":
+        return 'PHigh' if p < 0 else "Plow"
+    else:
+        return 'KHigh' if k < 0 else "Klow"
+
 # render fertilizer suggestion result page
 @app.route('/api/fertilizer-predict', methods=['POST'])
 # @login_required
@@ -444,24 +597,7 @@ def api_fertilizer_prediction():
         P = int(data['phosphorus'])
         K = int(data['potassium'])
 
-        df = pd.read_csv('Data/fertilizer.csv')
-
-        nr = df[df['Crop'] == crop_name]['N'].iloc[0]
-        pr = df[df['Crop'] == crop_name]['P'].iloc[0]
-        kr = df[df['Crop'] == crop_name]['K'].iloc[0]
-
-        n = nr - N
-        p = pr - P
-        k = kr - K
-        temp = {abs(n): "N", abs(p): "P", abs(k): "K"}
-        max_value = temp[max(temp.keys())]
-
-        if max_value == "N":
-            key = 'NHigh' if n < 0 else "Nlow"
-        elif max_value == "P":
-            key = 'PHigh' if p < 0 else "Plow"
-        else:
-            key = 'KHigh' if k < 0 else "Klow"
+        key = fertilizer_recommendation_key(crop_name, N, P, K)
 
         return jsonify({
             'success': True,
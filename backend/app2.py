@@ -23,11 +23,13 @@ import config
 import pickle
 import io
 import torch
-from torchvision import transforms
 from PIL import Image
 from utils.model import ResNet9
+from utils.inference_opt import optimize_for_inference
+from utils import resnet9_inference
 from utils.fertilizer import fertilizer_dic
 from utils.disease import disease_dic
+from utils.disease_classes import disease_classes
 
 # -------------------------LOADING THE TRAINED MODELS -----------------------------------------------
 
@@ -36,46 +38,7 @@ crop_recommendation_model_path = 'models/RandomForest.pkl'
 crop_recommendation_model = pickle.load(
     open(crop_recommendation_model_path, 'rb'))
 
-# Loading plant disease classification model
-
-disease_classes = ['Apple___Apple_scab',
-                   'Apple___Black_rot',
-                   'Apple___Cedar_apple_rust',
-                   'Apple___healthy',
-                   'Blueberry___healthy',
-                   'Cherry_(including_sour)___Powdery_mildew',
-                   'Cherry_(including_sour)___healthy',
-                   'Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot',
-                   'Corn_(maize)___Common_rust_',
-                   'Corn_(maize)___Northern_Leaf_Blight',
-                   'Corn_(maize)___healthy',
-                   'Grape___Black_rot',
-                   'Grape___Esca_(Black_Measles)',
-                   'Grape___Leaf_blight_(Isariopsis_Leaf_Spot)',
-                   'Grape___healthy',
-                   'Orange___Haunglongbing_(Citrus_greening)',
-                   'Peach___Bacterial_spot',
-                   'Peach___healthy',
-                   'Pepper,_bell___Bacterial_spot',
-                   'Pepper,_bell___healthy',
-                   'Potato___Early_blight',
-                   'Potato___Late_blight',
-                   'Potato___healthy',
-                   'Raspberry___healthy',
-                   'Soybean___healthy',
-                   'Squash___Powdery_mildew',
-                   'Strawberry___Leaf_scorch',
-                   'Strawberry___healthy',
-                   'Tomato___Bacterial_spot',
-                   'Tomato___Early_blight',
-                   'Tomato___Late_blight',
-                   'Tomato___Leaf_Mold',
-                   'Tomato___Septoria_leaf_spot',
-                   'Tomato___Spider_mites Two-spotted_spider_mite',
-                   'Tomato___Target_Spot',
-                   'Tomato___Tomato_Yellow_Leaf_Curl_Virus',
-                   'Tomato___Tomato_mosaic_virus',
-                   'Tomato___healthy']
+# Loading plant disease classification model (classes in utils/disease_classes.py)
 
 # disease prediction
 disease_model_path = 'models/plant_disease_model.pth'
@@ -84,6 +47,14 @@ disease_model.load_state_dict(torch.load(
     disease_model_path, map_location=torch.device('cpu')))
 disease_model.eval()
 
+# Fold the BatchNorms into the convs and use channels_last (utils/inference_opt.py)
+if os.getenv('DISEASE_MODEL_OPTIMIZE', 'true').lower() in ('1', 'true', 'yes'):
+    try:
+        disease_model = optimize_for_inference(
+            disease_model, jit=os.getenv('DISEASE_MODEL_JIT', 'false').lower() in ('1', 'true', 'yes'))
+    except Exception as e:
+        print(f"Serving the unoptimized disease model: {e}")
+
 
 
 def weather_fetch(city_name):
@@ -111,23 +82,12 @@ def weather_fetch(city_name):
 def predict_image(img, model=disease_model):
     """
     Transforms image to tensor and predicts disease label
+    (preprocessing and inference in utils/resnet9_inference.py)
     :params: image
     :return: prediction (string)
     """
-    transform = transforms.Compose([
-        transforms.Resize(256),
-        transforms.ToTensor(),
-    ])
-    image = Image.open(io.BytesIO(img))
-    img_t = transform(image)
-    img_u = torch.unsqueeze(img_t, 0)
-
-    # Get predictions from model
-    yb = model(img_u)
-    # Pick index with highest probability
-    _, preds = torch.max(yb, dim=1)
-    prediction = disease_classes[preds[0].item()]
-    # Retrieve the class label
+    image = Image.open(io.BytesIO(img)).convert('RGB')
+    prediction, _confidence = resnet9_inference.predict(model, image)
     return prediction
 
 
@@ -3,29 +3,48 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import (
     create_access_token, jwt_required, get_jwt_identity, unset_jwt_cookies
 )
-from werkzeug.security import generate_password_hash, check_password_hash
-import libsql
+from utils.db import connect_database
+from utils.metrics import Gauge, Histogram
+from utils.rate_limit import RateLimit, rate_limit, client_ip, json_field
+from auth.hashing import HashingBusy, hash_password, verify_password, needs_rehash, in_flight
+from auth.profile_cache import get_user_profile
 
 auth_bp = Blueprint('auth', __name__)
 
+# Split auth route latency into password hashing and database time
+AUTH_PHASE_SECONDS = Histogram(
+    'farmalyze_auth_phase_seconds',
+    'Time spent in each phase of the auth routes',
+    ['route', 'phase']
+)
+Gauge('farmalyze_password_hash_in_flight', 'Password hashes running or waiting for a worker', callback=in_flight)
+
+def _hashing_busy_response():
+    response = jsonify({'msg': 'Server busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+# Attempts per client IP and per target account, as 'capacity/seconds'
+LOGIN_LIMITS = (
+    RateLimit('login-ip', os.getenv('LOGIN_RATE_LIMIT_IP', '20/60'), client_ip),
+    RateLimit('login-email', os.getenv('LOGIN_RATE_LIMIT_EMAIL', '5/300'), json_field('email')),
+)
+REGISTER_LIMITS = (
+    RateLimit('register-ip', os.getenv('REGISTER_RATE_LIMIT_IP', '5/600'), client_ip),
+    RateLimit('register-email', os.getenv('REGISTER_RATE_LIMIT_EMAIL', '3/600'), json_field('email')),
+)
+
 # Global connection - reuse across requests
 _conn = None
 
 def get_auth_db():
     global _conn
     if _conn is None:
-        turso_url = os.getenv("TURSO_DATABASE_URL")
-        turso_auth_token = os.getenv("TURSO_AUTH_TOKEN")
-        
-        if not turso_url or not turso_auth_token:
-            raise RuntimeError("TURSO_DATABASE_URL and TURSO_AUTH_TOKEN must be set")
-        
-        # Remote-only connection to Turso (no local file)
-        _conn = libsql.connect(database=turso_url, auth_token=turso_auth_token)
-        
+        _conn = connect_database()
     return _conn
 
 @auth_bp.route('/api/auth/register', methods=['POST'])
+@rate_limit(*REGISTER_LIMITS)
 def register():
     try:
         data = request.get_json()
@@ -40,25 +59,32 @@ def register():
         cur = conn.cursor()
         
         # Check if user exists
-        cur.execute('SELECT * FROM users WHERE email = ?', (email,))
-        if cur.fetchone():
+        with AUTH_PHASE_SECONDS.time('register', 'db'):
+            cur.execute('SELECT id FROM users WHERE email = ?', (email,))
+            existing = cur.fetchone()
+        if existing:
             return jsonify({'msg': 'User already exists'}), 409
 
         # Create new user
-        hashed_pw = generate_password_hash(password)
-        cur.execute(
-            'INSERT INTO users (email, password, name) VALUES (?, ?, ?)',
-            (email, hashed_pw, name)
-        )
-        conn.commit()
+        with AUTH_PHASE_SECONDS.time('register', 'hash'):
+            hashed_pw = hash_password(password)
+        with AUTH_PHASE_SECONDS.time('register', 'db'):
+            cur.execute(
+                'INSERT INTO users (email, password, name) VALUES (?, ?, ?)',
+                (email, hashed_pw, name)
+            )
+            conn.commit()
         
         return jsonify({'msg': 'User registered successfully'}), 201
     
+    except HashingBusy:
+        return _hashing_busy_response()
     except Exception as e:
         print(f"Registration error: {e}")
         return jsonify({'msg': 'Registration failed'}), 500
 
 @auth_bp.route('/api/auth/login', methods=['POST'])
+@rate_limit(*LOGIN_LIMITS)
 def login():
     try:
         data = request.get_json()
@@ -70,15 +96,36 @@ def login():
 
         conn = get_auth_db()
         cur = conn.cursor()
-        cur.execute('SELECT id, password FROM users WHERE email = ?', (email,))
-        user = cur.fetchone()
-        
-        if user and check_password_hash(user[1], password):
-            access_token = create_access_token(identity=str(user[0]))
-            return jsonify({'access_token': access_token}), 200
-        else:
+        with AUTH_PHASE_SECONDS.time('login', 'db'):
+            cur.execute('SELECT id, password FROM users WHERE email = ?', (email,))
+            user = cur.fetchone()
+
+        if not user:
+            return jsonify({'msg': 'Invalid credentials'}), 401
+
+        with AUTH_PHASE_SECONDS.time('login', 'hash'):
+            valid = verify_password(user[1], password)
+        if not valid:
             return jsonify({'msg': 'Invalid credentials'}), 401
+
+        # Upgrade hashes made with older KDF parameters while we have the plain password
+        if needs_rehash(user[1]):
+            try:
+                with AUTH_PHASE_SECONDS.time('login', 'rehash'):
+                    new_hash = hash_password(password)
+                with AUTH_PHASE_SECONDS.time('login', 'db'):
+                    cur.execute('UPDATE users SET password = ? WHERE id = ?', (new_hash, user[0]))
+                    conn.commit()
+            except HashingBusy:
+                pass  # try again on the next login
+            except Exception as e:
+                print(f"Password rehash error: {e}")
+
+        access_token = create_access_token(identity=str(user[0]))
+        return jsonify({'access_token': access_token}), 200
     
+    except HashingBusy:
+        return _hashing_busy_response()
     except Exception as e:
         print(f"Login error: {e}")
         return jsonify({'msg': 'Login failed'}), 500
@@ -88,10 +135,7 @@ def login():
 def session():
     try:
         user_id = get_jwt_identity()
-        conn = get_auth_db()
-        cur = conn.cursor()
-        cur.execute('SELECT id, email, name FROM users WHERE id = ?', (int(user_id),))
-        user = cur.fetchone()
+        user = get_user_profile(get_auth_db(), user_id)
         
         if user:
             return jsonify({
@@ -120,12 +164,9 @@ def get_username():
     """
     try:
         user_id = get_jwt_identity()
-        conn = get_auth_db()
-        cur = conn.cursor()
-        cur.execute('SELECT name FROM users WHERE id = ?', (int(user_id),))
-        row = cur.fetchone()
-        if row:
-            return jsonify({'success': True, 'name': row[0]}), 200
+        user = get_user_profile(get_auth_db(), user_id)
+        if user:
+            return jsonify({'success': True, 'name': user[2]}), 200
         else:
             return jsonify({'success': False, 'msg': 'User not found'}), 404
     except Exception as e:
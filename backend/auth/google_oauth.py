@@ -1,10 +1,14 @@
 import os
 import requests
+from urllib.parse import urlencode
 from flask import Blueprint, request, jsonify, redirect
 from flask_jwt_extended import create_access_token
 from authlib.integrations.flask_client import OAuth
-from werkzeug.security import generate_password_hash
-import libsql
+from auth.hashing import hash_password
+from auth.profile_cache import invalidate_user
+from auth.oauth_state import create_state_store
+from auth.oauth_client import oauth_client, GOOGLE_DISCOVERY_URL
+from utils.db import connect_database
 import secrets
 
 oauth_bp = Blueprint('oauth', __name__)
@@ -15,14 +19,7 @@ _conn = None
 def get_oauth_db():
     global _conn
     if _conn is None:
-        turso_url = os.getenv("TURSO_DATABASE_URL")
-        turso_auth_token = os.getenv("TURSO_AUTH_TOKEN")
-        
-        if not turso_url or not turso_auth_token:
-            raise RuntimeError("TURSO_DATABASE_URL and TURSO_AUTH_TOKEN must be set")
-        
-        _conn = libsql.connect(database=turso_url, auth_token=turso_auth_token)
-        
+        _conn = connect_database()
     return _conn
 
 # Initialize OAuth
@@ -37,7 +34,7 @@ def init_oauth(app):
         name='google',
         client_id=os.getenv('GOOGLE_CLIENT_ID'),
         client_secret=os.getenv('GOOGLE_CLIENT_SECRET'),
-        server_metadata_url='https://accounts.google.com/.well-known/openid_configuration',
+        server_metadata_url=GOOGLE_DISCOVERY_URL,
         client_kwargs={
             'scope': 'openid email profile'
         }
@@ -45,8 +42,8 @@ def init_oauth(app):
     
     return google
 
-# Store for OAuth state (in production, use Redis or database)
-oauth_states = {}
+# Expiring store for OAuth state (see auth/oauth_state.py for the multi-worker backend)
+oauth_states = create_state_store()
 
 @oauth_bp.route('/api/auth/google/login', methods=['POST'])
 def google_login():
@@ -59,30 +56,19 @@ def google_login():
         data = request.get_json() or {}
         frontend_url = data.get('frontend_url', os.getenv('FRONTEND_URL', 'http://localhost:5173'))
         
-        # Store state with frontend URL for later verification
-        oauth_states[state] = {
-            'frontend_url': frontend_url,
-            'timestamp': requests.utils.get_environ_proxies('')  # Simple timestamp
-        }
-        
-        # Clean up old states (keep only last 100)
-        if len(oauth_states) > 100:
-            # Remove oldest entries
-            sorted_states = sorted(oauth_states.items(), key=lambda x: x[1].get('timestamp', 0))
-            for old_state, _ in sorted_states[:len(oauth_states)-100]:
-                del oauth_states[old_state]
+        # Store state with frontend URL for later verification; expired states are purged on insert
+        oauth_states.put(state, {'frontend_url': frontend_url})
         
-        # Build Google OAuth URL manually
-        google_oauth_url = (
-            "https://accounts.google.com/o/oauth2/auth"
-            f"?client_id={os.getenv('GOOGLE_CLIENT_ID')}"
-            f"&redirect_uri={os.getenv('GOOGLE_REDIRECT_URI', 'http://localhost:8000/api/auth/google/callback')}"
-            "&scope=openid email profile"
-            "&response_type=code"
-            f"&state={state}"
-            "&access_type=offline"
-            "&prompt=consent"
-        )
+        # Build Google OAuth URL from the (cached) discovery document
+        google_oauth_url = oauth_client.endpoint('authorization_endpoint') + '?' + urlencode({
+            'client_id': os.getenv('GOOGLE_CLIENT_ID'),
+            'redirect_uri': os.getenv('GOOGLE_REDIRECT_URI', 'http://localhost:8000/api/auth/google/callback'),
+            'scope': 'openid email profile',
+            'response_type': 'code',
+            'state': state,
+            'access_type': 'offline',
+            'prompt': 'consent',
+        })
         
         return jsonify({
             'success': True,
@@ -212,28 +198,18 @@ def google_callback():
             print("Missing code or state")
             return redirect(f"{os.getenv('FRONTEND_URL', 'http://localhost:5173')}/login?error=missing_params")
 
-        if state not in oauth_states:
+        state_data = oauth_states.pop(state)
+        if state_data is None:
             print("Invalid state:", state)
             return redirect(f"{os.getenv('FRONTEND_URL', 'http://localhost:5173')}/login?error=invalid_state")
 
-        frontend_url = oauth_states[state]['frontend_url']
-        del oauth_states[state]
+        frontend_url = state_data['frontend_url']
 
         # Exchange code for token
-        token_url = "https://oauth2.googleapis.com/token"
-        token_data = {
-            'client_id': os.getenv('GOOGLE_CLIENT_ID'),
-            'client_secret': os.getenv('GOOGLE_CLIENT_SECRET'),
-            'code': code,
-            'grant_type': 'authorization_code',
-            'redirect_uri': os.getenv('GOOGLE_REDIRECT_URI', 'http://localhost:8000/api/auth/google/callback')
-        }
-        print("Token data:", token_data)
-        token_response = requests.post(token_url, data=token_data)
-        token_json = token_response.json()
-        print("Token response:", token_json)
+        redirect_uri = os.getenv('GOOGLE_REDIRECT_URI', 'http://localhost:8000/api/auth/google/callback')
+        token_ok, token_json = oauth_client.exchange_code(code, redirect_uri)
 
-        if not token_response.ok:
+        if not token_ok:
             print(f"Token exchange error: {token_json}")
             return redirect(f"{frontend_url}/login?error=token_exchange_failed")
 
@@ -243,12 +219,10 @@ def google_callback():
             return redirect(f"{frontend_url}/login?error=no_access_token")
 
         # Get user info from Google
-        user_info_url = f"https://www.googleapis.com/oauth2/v2/userinfo?access_token={access_token}"
-        user_response = requests.get(user_info_url)
-        user_data = user_response.json()
+        user_ok, user_data = oauth_client.userinfo(access_token)
         print("User info:", user_data)
 
-        if not user_response.ok:
+        if not user_ok:
             print(f"User info error: {user_data}")
             return redirect(f"{frontend_url}/login?error=user_info_failed")
 
@@ -275,18 +249,25 @@ def google_callback():
                     (google_id, picture, user_id)
                 )
                 conn.commit()
+                invalidate_user(user_id)
         else:
             cur.execute(
                 'INSERT INTO users (email, name, google_id, profile_picture, password) VALUES (?, ?, ?, ?, ?)',
-                (email, name, google_id, picture, generate_password_hash(secrets.token_urlsafe(32)))
+                (email, name, google_id, picture, hash_password(secrets.token_urlsafe(32)))
             )
             conn.commit()
             user_id = cur.lastrowid
+            invalidate_user(user_id)
 
         jwt_token = create_access_token(identity=str(user_id))
         print("JWT token created, redirecting to frontend")
         return redirect(f"{frontend_url}/auth/callback?token={jwt_token}&success=true")
 
+    except requests.RequestException as e:
+        print(f"Google callback provider error: {e}")
+        frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:5173')
+        return redirect(f"{frontend_url}/login?error=provider_unavailable")
+
     except Exception as e:
         print(f"Google callback error: {e}")
         frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:5173')
@@ -307,30 +288,18 @@ def link_google_account():
             if not code:
                 return jsonify({'success': False, 'error': 'Authorization code required'}), 400
             
-            # Exchange code for token (similar to callback)
-            token_url = "https://oauth2.googleapis.com/token"
-            token_data = {
-                'client_id': os.getenv('GOOGLE_CLIENT_ID'),
-                'client_secret': os.getenv('GOOGLE_CLIENT_SECRET'),
-                'code': code,
-                'grant_type': 'authorization_code',
-                'redirect_uri': 'postmessage'  # For client-side flow
-            }
-            
-            token_response = requests.post(token_url, data=token_data)
-            token_json = token_response.json()
+            # Exchange code for token (similar to callback); 'postmessage' for client-side flow
+            token_ok, token_json = oauth_client.exchange_code(code, 'postmessage')
             
-            if not token_response.ok:
+            if not token_ok:
                 return jsonify({'success': False, 'error': 'Token exchange failed'}), 400
             
             access_token = token_json.get('access_token')
             
             # Get user info
-            user_info_url = f"https://www.googleapis.com/oauth2/v2/userinfo?access_token={access_token}"
-            user_response = requests.get(user_info_url)
-            user_data = user_response.json()
+            user_ok, user_data = oauth_client.userinfo(access_token)
             
-            if not user_response.ok:
+            if not user_ok:
                 return jsonify({'success': False, 'error': 'Failed to get user info'}), 400
             
             google_id = user_data.get('id')
@@ -352,11 +321,16 @@ def link_google_account():
                 (google_id, user_data.get('picture'), int(user_id))
             )
             conn.commit()
+            invalidate_user(user_id)
             
             return jsonify({'success': True, 'message': 'Google account linked successfully'}), 200
         
         return _link_account()
         
+    except requests.RequestException as e:
+        print(f"Link Google account provider error: {e}")
+        return jsonify({'success': False, 'error': 'Google is unavailable, try again'}), 502
+        
     except Exception as e:
         print(f"Link Google account error: {e}")
         return jsonify({'success': False, 'error': 'Failed to link Google account'}), 500
\ No newline at end of file
@@ -0,0 +1,83 @@
+# Password hashing off the request threads.
+#
+# The KDF is deliberately slow (hundreds of ms). Running it inline lets a burst of
+# logins occupy every worker thread and starve the prediction endpoints, so all
+# hashing goes through a small dedicated pool with a bounded backlog. When the
+# backlog is full we refuse immediately (HashingBusy -> 503) instead of queueing.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Any werkzeug method string, e.g. 'pbkdf2:sha256:600000' or 'scrypt:32768:8:1'
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+# Hashes allowed to wait for a free worker before new ones are rejected
+PASSWORD_HASH_BACKLOG = int(os.getenv('PASSWORD_HASH_BACKLOG', 8))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+# werkzeug 2.3 defaults, used to expand short method names like 'pbkdf2' or 'scrypt'
+_METHOD_DEFAULTS = {
+    'pbkdf2': ['sha256', '600000'],
+    'scrypt': ['32768', '8', '1'],
+}
+
+class HashingBusy(Exception):
+    """Raised when the hashing backlog is full."""
+
+def _normalize_method(method):
+    name, *params = method.split(':')
+    defaults = _METHOD_DEFAULTS.get(name)
+    if defaults is None:
+        return method
+    params = params + defaults[len(params):]
+    return ':'.join([name] + params)
+
+_current_method = _normalize_method(PASSWORD_HASH_METHOD)
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+_max_in_flight = PASSWORD_HASH_WORKERS + PASSWORD_HASH_BACKLOG
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+def _acquire_slot():
+    global _in_flight
+    with _in_flight_lock:
+        if _in_flight >= _max_in_flight:
+            return False
+        _in_flight += 1
+        return True
+
+def _release_slot(_future=None):
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+
+def _run(fn, *args):
+    if not _acquire_slot():
+        raise HashingBusy()
+    try:
+        future = _executor.submit(fn, *args)
+    except Exception:
+        _release_slot()
+        raise
+    # The slot is freed when the hash finishes, even if the caller timed out
+    future.add_done_callback(_release_slot)
+    return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+
+def hash_password(password):
+    """Hash a password with the configured KDF parameters."""
+    return _run(generate_password_hash, password, _current_method)
+
+def verify_password(password_hash, password):
+    """Check a password against a stored werkzeug hash."""
+    return _run(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with different KDF parameters than the configured ones."""
+    method = password_hash.split('$', 1)[0]
+    return _normalize_method(method) != _current_method
+
+def in_flight():
+    """Number of hashes running or waiting, for the metrics endpoint."""
+    return _in_flight
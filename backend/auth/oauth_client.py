@@ -0,0 +1,119 @@
+# Shared HTTP client for the Google OAuth token exchange and userinfo calls.
+#
+# One requests.Session per process keeps connections to Google's hosts alive between
+# logins, so only the first login pays the TCP + TLS handshakes. Every call has a
+# connect/read timeout. Connection failures are retried with backoff on every call;
+# 429/5xx responses are retried on GET only, because an authorization code can be
+# redeemed just once.
+#
+# Endpoints come from the OpenID discovery document, cached for OAUTH_DISCOVERY_TTL
+# seconds. Point GOOGLE_DISCOVERY_URL at fakes/google_oauth.py to run the whole
+# login flow locally.
+
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+GOOGLE_DISCOVERY_URL = os.getenv('GOOGLE_DISCOVERY_URL', 'https://accounts.google.com/.well-known/openid-configuration')
+OAUTH_CONNECT_TIMEOUT = float(os.getenv('OAUTH_CONNECT_TIMEOUT', 3))
+OAUTH_READ_TIMEOUT = float(os.getenv('OAUTH_READ_TIMEOUT', 5))
+OAUTH_HTTP_RETRIES = int(os.getenv('OAUTH_HTTP_RETRIES', 2))
+OAUTH_DISCOVERY_TTL = float(os.getenv('OAUTH_DISCOVERY_TTL', 3600))
+
+# Used until the discovery document has been fetched once (or if Google is unreachable)
+GOOGLE_DEFAULT_METADATA = {
+    'authorization_endpoint': 'https://accounts.google.com/o/oauth2/v2/auth',
+    'token_endpoint': 'https://oauth2.googleapis.com/token',
+    'userinfo_endpoint': 'https://openidconnect.googleapis.com/v1/userinfo',
+}
+
+class OAuthClient:
+    def __init__(self, discovery_url=GOOGLE_DISCOVERY_URL, retries=OAUTH_HTTP_RETRIES,
+                 timeout=(OAUTH_CONNECT_TIMEOUT, OAUTH_READ_TIMEOUT), discovery_ttl=OAUTH_DISCOVERY_TTL):
+        self.discovery_url = discovery_url
+        self.timeout = timeout
+        self.discovery_ttl = discovery_ttl
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=0.2,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._metadata = None
+        self._metadata_expires = 0.0
+        self._metadata_lock = threading.Lock()
+
+    def metadata(self):
+        """The provider's discovery document, refetched at most every discovery_ttl seconds."""
+        if self._metadata is not None and time.monotonic() < self._metadata_expires:
+            return self._metadata
+        with self._metadata_lock:
+            if self._metadata is not None and time.monotonic() < self._metadata_expires:
+                return self._metadata
+            try:
+                response = self.session.get(self.discovery_url, timeout=self.timeout)
+                response.raise_for_status()
+                self._metadata = response.json()
+                self._metadata_expires = time.monotonic() + self.discovery_ttl
+            except (requests.RequestException, ValueError) as e:
+                print(f"OAuth discovery fetch failed: {e}")
+                # Keep serving the last good document; retry the fetch in a minute
+                if self._metadata is None:
+                    self._metadata = dict(GOOGLE_DEFAULT_METADATA)
+                self._metadata_expires = time.monotonic() + 60
+            return self._metadata
+
+    def endpoint(self, name):
+        return self.metadata().get(name) or GOOGLE_DEFAULT_METADATA[name]
+
+    def exchange_code(self, code, redirect_uri):
+        """Redeem an authorization code. Returns (ok, token_json)."""
+        response = self.session.post(
+            self.endpoint('token_endpoint'),
+            data={
+                'client_id': os.getenv('GOOGLE_CLIENT_ID'),
+                'client_secret': os.getenv('GOOGLE_CLIENT_SECRET'),
+                'code': code,
+                'grant_type': 'authorization_code',
+                'redirect_uri': redirect_uri,
+            },
+            timeout=self.timeout,
+        )
+        return response.ok, _json_or_empty(response)
+
+    def userinfo(self, access_token):
+        """
+        Fetch the signed-in user's profile. Returns (ok, user_data); the OpenID
+        userinfo endpoint calls the account id 'sub', so it is copied to 'id'.
+        """
+        response = self.session.get(
+            self.endpoint('userinfo_endpoint'),
+            headers={'Authorization': f'Bearer {access_token}'},
+            timeout=self.timeout,
+        )
+        user_data = _json_or_empty(response)
+        if 'id' not in user_data and 'sub' in user_data:
+            user_data['id'] = user_data['sub']
+        return response.ok, user_data
+
+def _json_or_empty(response):
+    try:
+        return response.json()
+    except ValueError:
+        return {}
+
+# Shared by all requests in this process
+oauth_client = OAuthClient()
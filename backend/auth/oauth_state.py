@@ -0,0 +1,154 @@
+# Expiring store for the OAuth `state` parameter between /google/login and /google/callback.
+#
+# OAUTH_STATE_BACKEND=memory (default) keeps states in the worker process. With several
+# gunicorn workers the callback may land on a different worker than the login, so use
+# OAUTH_STATE_BACKEND=sqlite to share them through a local SQLite file instead.
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+from utils.db import ProcessLocalSQLite
+
+OAUTH_STATE_TTL = float(os.getenv('OAUTH_STATE_TTL', 600))
+OAUTH_STATE_MAX = int(os.getenv('OAUTH_STATE_MAX', 10000))
+
+class MemoryStateStore:
+    """
+    States ordered by insertion. Every state lives for the same TTL, so insertion
+    order is also expiry order and purging only ever looks at the oldest entries:
+    put() and pop() are O(1) amortised.
+    """
+
+    def __init__(self, ttl=OAUTH_STATE_TTL, maxsize=OAUTH_STATE_MAX):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purge(self, now):
+        states = self._states
+        while states:
+            oldest = next(iter(states))
+            if states[oldest][0] > now:
+                break
+            del states[oldest]
+
+    def put(self, state, data):
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            while len(self._states) >= self.maxsize:
+                self._states.popitem(last=False)
+            self._states[state] = (now + self.ttl, data)
+
+    def pop(self, state):
+        """Consume a state. Returns its data, or None if unknown or expired."""
+        with self._lock:
+            entry = self._states.pop(state, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def __len__(self):
+        return len(self._states)
+
+class SQLiteStateStore:
+    """
+    States shared by all workers on a host through a SQLite file.
+    Uses wall-clock expiry because monotonic clocks restart with the machine
+    while the file survives. The number of states is kept in oauth_state_count,
+    updated in the same transactions, so enforcing the cap never counts rows;
+    states expire in insertion order, so the cap and the purge both delete from
+    the low end of the expires_at index.
+    """
+
+    SCHEMA = (
+        'PRAGMA journal_mode=WAL',
+        '''CREATE TABLE IF NOT EXISTS oauth_states (
+            state TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_oauth_states_expires_at ON oauth_states(expires_at)',
+        '''CREATE TABLE IF NOT EXISTS oauth_state_count (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            count INTEGER NOT NULL
+        )''',
+        # Files from before the count table get it initialised once
+        'INSERT OR IGNORE INTO oauth_state_count (id, count) SELECT 0, COUNT(*) FROM oauth_states',
+    )
+
+    def __init__(self, path, ttl=OAUTH_STATE_TTL, maxsize=OAUTH_STATE_MAX):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._db = ProcessLocalSQLite(path, self.SCHEMA)
+
+    @staticmethod
+    def _add_count(cur, delta):
+        if delta:
+            cur.execute('UPDATE oauth_state_count SET count = count + ? WHERE id = 0', (delta,))
+
+    def put(self, state, data):
+        now = time.time()
+        with self._db.lock:
+            cur = self._db.connection().cursor()
+            cur.execute('BEGIN IMMEDIATE')
+            try:
+                cur.execute('DELETE FROM oauth_states WHERE expires_at <= ?', (now,))
+                delta = -max(cur.rowcount, 0)
+                cur.execute('SELECT 1 FROM oauth_states WHERE state = ?', (state,))
+                if cur.fetchone() is None:
+                    delta += 1
+                cur.execute(
+                    'INSERT OR REPLACE INTO oauth_states (state, data, expires_at) VALUES (?, ?, ?)',
+                    (state, json.dumps(data), now + self.ttl)
+                )
+                self._add_count(cur, delta)
+                cur.execute('SELECT count FROM oauth_state_count WHERE id = 0')
+                overflow = cur.fetchone()[0] - self.maxsize
+                if overflow > 0:
+                    cur.execute(
+                        '''DELETE FROM oauth_states WHERE state IN (
+                               SELECT state FROM oauth_states ORDER BY expires_at LIMIT ?)''',
+                        (overflow,)
+                    )
+                    self._add_count(cur, -max(cur.rowcount, 0))
+                cur.execute('COMMIT')
+            except Exception:
+                cur.execute('ROLLBACK')
+                raise
+
+    def pop(self, state):
+        """Consume a state. Returns its data, or None if unknown or expired."""
+        with self._db.lock:
+            cur = self._db.connection().cursor()
+            cur.execute('BEGIN IMMEDIATE')
+            try:
+                cur.execute('SELECT data, expires_at FROM oauth_states WHERE state = ?', (state,))
+                row = cur.fetchone()
+                if row:
+                    cur.execute('DELETE FROM oauth_states WHERE state = ?', (state,))
+                    self._add_count(cur, -1)
+                cur.execute('COMMIT')
+            except Exception:
+                cur.execute('ROLLBACK')
+                raise
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def __len__(self):
+        with self._db.lock:
+            return self._db.connection().execute('SELECT count FROM oauth_state_count WHERE id = 0').fetchone()[0]
+
+def create_state_store():
+    """Build the store selected by OAUTH_STATE_BACKEND."""
+    backend = os.getenv('OAUTH_STATE_BACKEND', 'memory').strip().lower()
+    if backend == 'sqlite':
+        return SQLiteStateStore(os.getenv('OAUTH_STATE_DB_PATH', 'farmalyze-oauth-states.db'))
+    if backend != 'memory':
+        raise RuntimeError(f"Unknown OAUTH_STATE_BACKEND '{backend}' (expected memory or sqlite)")
+    return MemoryStateStore()
@@ -0,0 +1,46 @@
+# Per-process cache of user profile rows shared by /api/auth/session and /api/auth/username.
+#
+# The frontend calls both on nearly every page load; without the cache each call is a
+# round trip to Turso. Writers that change a user row must call invalidate_user().
+# The cache is per worker process, so other workers only see such changes after
+# USER_CACHE_TTL seconds at most.
+
+import os
+from utils.cache import TTLCache
+from utils.metrics import Counter, Gauge
+
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 60))
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+
+_profiles = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+Gauge('farmalyze_user_cache_entries', 'User profiles currently cached', callback=lambda: len(_profiles))
+Gauge('farmalyze_user_cache_hit_ratio', 'Fraction of profile lookups served from cache',
+      callback=lambda: _profiles.hit_ratio())
+Counter('farmalyze_user_cache_lookups_total', 'Profile cache lookups since start', ['result'],
+      callback=lambda: {('hit',): _profiles.hits, ('miss',): _profiles.misses})
+
+def get_user_profile(conn, user_id):
+    """
+    Return (id, email, name) for a user, or None if the user doesn't exist.
+    Keyed by the JWT identity converted to int.
+    """
+    user_id = int(user_id)
+    profile = _profiles.get(user_id)
+    if profile is not None:
+        return profile
+
+    cur = conn.cursor()
+    cur.execute('SELECT id, email, name FROM users WHERE id = ?', (user_id,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+
+    profile = tuple(row)
+    _profiles.set(user_id, profile)
+    return profile
+
+def invalidate_user(user_id):
+    """Drop a cached profile after the user row was updated."""
+    _profiles.invalidate(int(user_id))
+
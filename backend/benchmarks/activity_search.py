@@ -0,0 +1,145 @@
+"""
+Activity search benchmark: FTS5 index vs LIKE '%...%' scan.
+
+Builds a synthetic user_activities table (1M rows by default) in a local SQLite
+file, indexes it with the same schema and triggers as activities/search.py and
+times the /api/activities/search query against the equivalent LIKE scan.
+
+Usage (from the backend directory):
+    python -m benchmarks.activity_search
+    python -m benchmarks.activity_search --rows 200000 --users 50 --db /tmp/activities_bench.db
+"""
+
+import os
+import json
+import random
+import sqlite3
+import argparse
+import tempfile
+
+from activities.search import SEARCH_SCHEMA, SEARCH_SQL, build_match_query, rebuild_search_index
+from benchmarks.common import time_call, summarize, print_table
+
+CROPS = ['rice', 'maize', 'chickpea', 'kidneybeans', 'pigeonpeas', 'mothbeans', 'mungbean',
+         'blackgram', 'lentil', 'pomegranate', 'banana', 'mango', 'grapes', 'watermelon',
+         'muskmelon', 'apple', 'orange', 'papaya', 'coconut', 'cotton', 'jute', 'coffee']
+DISEASES = ['Tomato Late Blight', 'Tomato Early Blight', 'Tomato Leaf Mold', 'Potato Late Blight',
+            'Potato Early Blight', 'Apple Apple Scab', 'Corn (Maize) Common Rust ',
+            'Grape Black Rot', 'Pepper, Bell Bacterial Spot', 'Tomato Healthy']
+CITIES = ['Pune', 'Nagpur', 'Kolkata', 'Chennai', 'Jaipur', 'Lucknow', 'Indore', 'Patna']
+
+QUERIES = ['tomato late blight', 'potato', 'rice pune', 'grape black rot', 'coffee']
+
+def _synthetic_row(rng, user_id):
+    kind = rng.random()
+    if kind < 0.4:
+        disease = rng.choice(DISEASES)
+        return (user_id, 'disease', 'Disease Detection Analysis', disease,
+                json.dumps({'disease_name': disease, 'confidence': rng.random()}))
+    if kind < 0.8:
+        crop, city = rng.choice(CROPS), rng.choice(CITIES)
+        return (user_id, 'crop', f'Crop Recommendation for {city}', f'Recommended crop: {crop.title()}',
+                json.dumps({'city': city, 'recommended_crop': {'name': crop.title()}}))
+    crop = rng.choice(CROPS)
+    return (user_id, 'fertilizer', f'Fertilizer Analysis for {crop}',
+            'The N value of your soil is low. <br/> Please consider the following suggestions',
+            json.dumps({'crop_name': crop}))
+
+def build_database(path, rows, users, seed=42):
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.execute('''CREATE TABLE IF NOT EXISTS user_activities (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        activity_type TEXT NOT NULL,
+        title TEXT NOT NULL,
+        status TEXT DEFAULT 'completed',
+        result TEXT,
+        details TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_user_activities_user_id ON user_activities(user_id)')
+
+    cur.execute('SELECT COUNT(*) FROM user_activities')
+    existing = cur.fetchone()[0]
+    if existing >= rows:
+        print(f"Reusing {existing} rows in {path}")
+        return conn
+
+    print(f"Generating {rows - existing} synthetic activities...")
+    rng = random.Random(seed)
+    batch = []
+    for i in range(existing, rows):
+        batch.append(_synthetic_row(rng, i % users + 1) + ('2026-01-01T00:00:00',))
+        if len(batch) == 50000:
+            cur.executemany('''INSERT INTO user_activities
+                (user_id, activity_type, title, result, details, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)''', batch)
+            batch = []
+    if batch:
+        cur.executemany('''INSERT INTO user_activities
+            (user_id, activity_type, title, result, details, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)''', batch)
+    conn.commit()
+
+    # Bulk (re)indexing is much faster than letting the triggers fire per row
+    print("Building FTS5 index...")
+    rebuild_search_index(conn)
+    return conn
+
+def like_query(text):
+    """Equivalent of build_match_query for a LIKE scan: every word must appear somewhere."""
+    words = text.split()
+    clause = ' AND '.join(['(title LIKE ? OR result LIKE ? OR details LIKE ?)'] * len(words))
+    params = []
+    for word in words:
+        params.extend([f'%{word}%'] * 3)
+    sql = f'''SELECT * FROM user_activities
+              WHERE user_id = ? AND {clause}
+              ORDER BY created_at DESC LIMIT ? OFFSET ?'''
+    return sql, params
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=100, help='rows are spread evenly over this many users')
+    parser.add_argument('--db', default=os.path.join(tempfile.gettempdir(), 'farmalyze_search_bench.db'))
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    conn = build_database(args.db, args.rows, args.users)
+    # Make sure a reused database has the triggers too
+    for statement in SEARCH_SCHEMA:
+        conn.execute(statement)
+    cur = conn.cursor()
+    user_id = 1
+
+    results = []
+    for text in QUERIES:
+        match = build_match_query(text, user_id)
+        fts = summarize(time_call(
+            lambda: cur.execute(SEARCH_SQL, (match, args.limit, 0, user_id)).fetchall(),
+            repeat=args.repeat
+        ))
+        sql, params = like_query(text)
+        like = summarize(time_call(
+            lambda: cur.execute(sql, [user_id] + params + [args.limit, 0]).fetchall(),
+            repeat=args.repeat
+        ))
+        results.append({
+            'query': text,
+            'fts_p50_ms': fts['p50_ms'],
+            'fts_p95_ms': fts['p95_ms'],
+            'like_p50_ms': like['p50_ms'],
+            'like_p95_ms': like['p95_ms'],
+            'speedup_p50': round(like['p50_ms'] / fts['p50_ms'], 1) if fts['p50_ms'] else '-'
+        })
+
+    print(f"\n{args.rows} rows, {args.rows // args.users} per user, limit {args.limit}\n")
+    print_table(results, ['query', 'fts_p50_ms', 'fts_p95_ms', 'like_p50_ms', 'like_p95_ms', 'speedup_p50'])
+    conn.close()
+
+if __name__ == "__main__":
+    main()
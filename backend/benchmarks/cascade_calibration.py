@@ -0,0 +1,110 @@
+"""
+Calibrate DISEASE_CASCADE_THRESHOLD for the disease cascade (utils/cascade.py).
+
+--data is a directory of labelled leaf images with one sub-directory per class, named
+as in utils/disease_classes.py (the PlantVillage layout). Both models run on every image,
+recording the ResNet9's confidence, whether each model was right, and how long each took.
+
+The images are split (seeded) into a calibration set, on which the lowest threshold that
+keeps the cascade at --target-accuracy is chosen, and a --holdout set, on which it is then
+evaluated. The report shows each model's accuracy alone, the cascade's accuracy, the
+fraction of images the fast path answered and the mean latency saved per request
+compared with always using the slow model.
+
+Usage (from the backend directory):
+    python -m benchmarks.cascade_calibration --data ~/plantvillage/valid --target-accuracy 0.97
+    python -m benchmarks.cascade_calibration --data ~/plantvillage/valid --per-class 50 --output cascade.json
+"""
+
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+
+from benchmarks.common import print_table
+from utils.cascade import resnet9_predict, hf_predict, calibrate_threshold, cascade_outcome
+from utils.disease_classes import disease_classes
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def labelled_images(root, per_class=None):
+    """(path, class name) pairs from a directory with one sub-directory per class."""
+    items = []
+    for name in disease_classes:
+        directory = os.path.join(root, name)
+        if not os.path.isdir(directory):
+            print(f"No images for {name}")
+            continue
+        files = sorted(f for f in os.listdir(directory) if f.lower().endswith(IMAGE_EXTENSIONS))
+        items.extend((os.path.join(directory, f), name) for f in files[:per_class])
+    return items
+
+def load_models(fast_weights):
+    import app
+    app.fast_disease_model_path = fast_weights
+    # The same loaders the API uses
+    return app._load_fast_disease_model(), app.processor.get(), app.disease_model.get()
+
+def run_models(items, fast, processor, slow):
+    """Per-image arrays: fast confidence, fast/slow correctness and fast/slow seconds."""
+    from PIL import Image
+    rows = []
+    for i, (path, label) in enumerate(items):
+        image = Image.open(path).convert('RGB')
+        start = time.perf_counter()
+        fast_label, confidence = resnet9_predict(fast, image)
+        fast_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        slow_label, _ = hf_predict(processor, slow, image)
+        slow_seconds = time.perf_counter() - start
+        rows.append((confidence, fast_label == label, slow_label == label, fast_seconds, slow_seconds))
+        if (i + 1) % 500 == 0:
+            print(f"{i + 1}/{len(items)} images")
+    return [np.array(column) for column in zip(*rows)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', required=True, help='directory with one sub-directory per class')
+    parser.add_argument('--fast-weights', default='models/plant_disease_model.pth')
+    parser.add_argument('--target-accuracy', type=float, default=0.97)
+    parser.add_argument('--per-class', type=int, help='use at most this many images per class')
+    parser.add_argument('--holdout', type=float, default=0.3, help='fraction of images kept for evaluation')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args()
+
+    items = labelled_images(args.data, args.per_class)
+    if not items:
+        raise SystemExit(f"No labelled images under {args.data}")
+    print(f"{len(items)} images; running both models")
+    columns = run_models(items, *load_models(args.fast_weights))
+
+    order = np.random.default_rng(args.seed).permutation(len(items))
+    split = max(1, int(len(items) * (1 - args.holdout)))
+    calibration = [column[order[:split]] for column in columns]
+    holdout = [column[order[split:]] for column in columns] if split < len(items) else calibration
+
+    threshold = calibrate_threshold(*calibration[:3], args.target_accuracy)
+    if threshold is None:
+        raise SystemExit(f"The slow model alone is below {args.target_accuracy:.1%} on these images")
+
+    report = {
+        'target_accuracy': args.target_accuracy,
+        'calibration': cascade_outcome(*calibration, threshold),
+        'holdout': cascade_outcome(*holdout, threshold),
+    }
+    rows = [dict(split=name, **{key: round(value, 4) if isinstance(value, float) else value
+                                for key, value in report[name].items()})
+            for name in ('calibration', 'holdout')]
+    print_table(rows, ['split', 'images', 'threshold', 'accuracy', 'fast_only_accuracy', 'slow_only_accuracy',
+                       'fast_path_fraction', 'slow_only_mean_ms', 'cascade_mean_ms', 'mean_ms_saved'])
+    print(f"\nDISEASE_CASCADE_THRESHOLD={threshold!r}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Shared helpers for the benchmark scripts in this package.
+
+import json
+import time
+import statistics
+
+def time_call(fn, repeat=20, warmup=3):
+    """Run fn() warmup + repeat times and return the timed samples in seconds."""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, round(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+def summarize(samples):
+    """Summary statistics of timing samples, converted to milliseconds."""
+    ordered = sorted(samples)
+    return {
+        'n': len(ordered),
+        'min_ms': round(ordered[0] * 1000, 4),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 4),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 4),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 4),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 4),
+        'max_ms': round(ordered[-1] * 1000, 4),
+    }
+
+def print_table(rows, columns):
+    """Print a list of dicts as an aligned plain-text table."""
+    widths = {col: max(len(col), *(len(str(row.get(col, ''))) for row in rows)) for col in columns}
+    print('  '.join(col.ljust(widths[col]) for col in columns))
+    print('  '.join('-' * widths[col] for col in columns))
+    for row in rows:
+        print('  '.join(str(row.get(col, '')).ljust(widths[col]) for col in columns))
+
+def save_results(path, results, meta=None):
+    """Write {name: summary} results (plus run metadata) as JSON for later comparison."""
+    with open(path, 'w') as f:
+        json.dump({'meta': meta or {}, 'results': results}, f, indent=2)
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+def compare_results(results, baseline, tolerance=0.10, metric='p50_ms'):
+    """
+    Rows comparing `metric` of every benchmark present in both runs, and whether any
+    got slower than the baseline by more than `tolerance` (relative).
+    """
+    rows, regressed = [], False
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if old is None or not old.get(metric):
+            continue
+        change = stats[metric] / old[metric] - 1
+        worse = change > tolerance
+        regressed = regressed or worse
+        rows.append({
+            'benchmark': name,
+            f'baseline_{metric}': old[metric],
+            metric: stats[metric],
+            'change': f'{change:+.1%}',
+            'verdict': 'REGRESSED' if worse else 'ok',
+        })
+    return rows, regressed
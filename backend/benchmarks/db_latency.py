@@ -0,0 +1,217 @@
+"""
+Database latency comparison: remote primary vs embedded replica.
+
+By default no Turso account is needed. The "primary" is a local SQLite file
+reached through a wrapper that adds --rtt-ms of simulated network latency to
+every statement and commit. The "replica" serves reads from a local copy and
+forwards writes to that primary, then refreshes the copy with SQLite's backup
+API, standing in for libsql's frame sync. The replica goes through the same
+ReplicaConnection wrapper as utils/db.py, so read-your-writes is measured too.
+
+With --turso the workload runs against the real database configured in .env,
+once with DATABASE_MODE=remote and once with DATABASE_MODE=replica.
+
+Usage (from the backend directory):
+    python -m benchmarks.db_latency --rtt-ms 40
+    python -m benchmarks.db_latency --turso --user-id 1
+"""
+
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+from datetime import datetime
+
+import utils.db
+from utils.db import ReplicaConnection, connect_database
+from benchmarks.common import time_call, summarize, print_table
+
+class _DelayedCursor:
+    def __init__(self, cursor, rtt):
+        self._cursor = cursor
+        self._rtt = rtt
+
+    def execute(self, *args):
+        time.sleep(self._rtt)
+        return self._cursor.execute(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class SimulatedRemote:
+    """A local SQLite file that pays one network round trip per statement and commit."""
+
+    def __init__(self, path, rtt):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.rtt = rtt
+
+    def cursor(self):
+        return _DelayedCursor(self.conn.cursor(), self.rtt)
+
+    def commit(self):
+        time.sleep(self.rtt)
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+class _SplitCursor:
+    """Sends reads to the local replica file and everything else to the primary."""
+
+    def __init__(self, local, remote):
+        self._local = local
+        self._remote = remote
+        self._last = local
+
+    def execute(self, sql, params=()):
+        target = self._local if sql.lstrip().upper().startswith('SELECT') else self._remote
+        self._last = target
+        return target.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._last, name)
+
+class StandInReplica:
+    """Local replica file synced from a SimulatedRemote primary."""
+
+    def __init__(self, primary, replica_path):
+        self.primary = primary
+        self.local = sqlite3.connect(replica_path, check_same_thread=False)
+        self.sync()
+
+    def cursor(self):
+        return _SplitCursor(self.local.cursor(), self.primary.cursor())
+
+    def commit(self):
+        self.primary.commit()
+
+    def rollback(self):
+        self.primary.rollback()
+
+    def sync(self):
+        # One round trip to pull the new frames, then apply them locally
+        time.sleep(self.primary.rtt)
+        self.primary.conn.backup(self.local)
+
+def _create_schema(path, users=100, activities_per_user=50):
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            name TEXT NOT NULL,
+            google_id TEXT,
+            profile_picture TEXT
+        );
+        CREATE TABLE IF NOT EXISTS user_activities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            activity_type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            status TEXT DEFAULT 'completed',
+            result TEXT,
+            details TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_user_activities_user_id ON user_activities(user_id);
+    ''')
+    conn.executemany(
+        'INSERT INTO users (email, password, name) VALUES (?, ?, ?)',
+        [(f'user{i}@example.com', 'x', f'User {i}') for i in range(users)]
+    )
+    conn.executemany(
+        '''INSERT INTO user_activities (user_id, activity_type, title, result, details, created_at)
+           VALUES (?, 'crop', 'Crop Recommendation', 'Recommended crop: Rice', '{}', ?)''',
+        [(i % users + 1, datetime.now().isoformat()) for i in range(users * activities_per_user)]
+    )
+    conn.commit()
+    conn.close()
+
+def run_workload(conn, user_id, repeat):
+    """Time the queries behind session, username, get_activities and create_activity."""
+    cur = conn.cursor()
+
+    def session():
+        cur.execute('SELECT id, email, name FROM users WHERE id = ?', (user_id,))
+        cur.fetchone()
+
+    def username():
+        cur.execute('SELECT name FROM users WHERE id = ?', (user_id,))
+        cur.fetchone()
+
+    def activities_page():
+        cur.execute('SELECT COUNT(*) FROM user_activities WHERE user_id = ?', (user_id,))
+        cur.fetchone()
+        cur.execute(
+            'SELECT * FROM user_activities WHERE user_id = ? ORDER BY created_at DESC LIMIT 10 OFFSET 0',
+            (user_id,)
+        )
+        cur.fetchall()
+
+    def write_then_read():
+        cur.execute(
+            '''INSERT INTO user_activities (user_id, activity_type, title, status, result, details, created_at)
+               VALUES (?, 'benchmark', 'db_latency', 'completed', '', '{}', ?)''',
+            (user_id, datetime.now().isoformat())
+        )
+        activity_id = cur.lastrowid
+        conn.commit()
+        cur.execute('SELECT id FROM user_activities WHERE id = ?', (activity_id,))
+        if cur.fetchone() is None:
+            raise AssertionError('read-your-writes violated: new activity not visible')
+
+    rows = {}
+    for name, fn in [('session', session), ('username', username),
+                     ('activities_page', activities_page), ('write_then_read', write_then_read)]:
+        rows[name] = summarize(time_call(fn, repeat=repeat, warmup=2))
+
+    # Remove the benchmark rows again
+    cur.execute("DELETE FROM user_activities WHERE activity_type = 'benchmark' AND title = 'db_latency'")
+    conn.commit()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rtt-ms', type=float, default=40.0, help='simulated round trip to the primary')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--turso', action='store_true', help='use the real Turso database from .env')
+    parser.add_argument('--user-id', type=int, default=1)
+    args = parser.parse_args()
+
+    results = {}
+    if args.turso:
+        from dotenv import load_dotenv
+        load_dotenv()
+        for mode in ('remote', 'replica'):
+            os.environ['DATABASE_MODE'] = mode
+            utils.db._replica = None
+            results[mode] = run_workload(connect_database(), args.user_id, args.repeat)
+    else:
+        with tempfile.TemporaryDirectory(prefix='farmalyze-db-latency-') as workdir:
+            primary_path = os.path.join(workdir, 'primary.db')
+            _create_schema(primary_path)
+            rtt = args.rtt_ms / 1000
+
+            results['remote'] = run_workload(SimulatedRemote(primary_path, rtt), args.user_id, args.repeat)
+            replica = ReplicaConnection(StandInReplica(SimulatedRemote(primary_path, rtt),
+                                                       os.path.join(workdir, 'replica.db')))
+            results['replica'] = run_workload(replica, args.user_id, args.repeat)
+        print(f"Stand-in primary with {args.rtt_ms} ms simulated round trip\n")
+
+    table = []
+    for operation in results['remote']:
+        remote, replica = results['remote'][operation], results['replica'][operation]
+        table.append({
+            'operation': operation,
+            'remote_p50_ms': remote['p50_ms'],
+            'remote_p95_ms': remote['p95_ms'],
+            'replica_p50_ms': replica['p50_ms'],
+            'replica_p95_ms': replica['p95_ms'],
+        })
+    print_table(table, ['operation', 'remote_p50_ms', 'remote_p95_ms', 'replica_p50_ms', 'replica_p95_ms'])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Microbenchmarks for the per-request hot paths of app.py.
+
+Groups (select with --only):
+    image       predict_image stages: decode, preprocess, forward, label map, and end to end
+    crop        crop_recommendation_model.predict_proba at batch sizes 1 .. 10000
+    fertilizer  fertilizer_recommendation_key, and the CSV read it used to do per request
+    json        jsonify() of representative crop, disease and activity-list responses
+
+All inputs are synthetic and generated from fixed seeds, so runs are comparable.
+Every benchmark gets --warmup untimed samples before --repeat timed ones; work that
+takes well under a millisecond is timed over many calls per sample. Groups whose
+model can't be loaded are skipped with a note.
+
+Save a run with --save-baseline, later compare with --baseline: the exit status
+is 1 if any benchmark's p50 is slower than the baseline by more than --tolerance.
+
+Usage (from the backend directory):
+    python -m benchmarks.hotpaths --save-baseline hotpaths-baseline.json
+    python -m benchmarks.hotpaths --only crop fertilizer --baseline hotpaths-baseline.json
+"""
+
+import io
+import sys
+import pickle
+import argparse
+import platform
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import time_call, summarize, print_table, save_results, load_results, compare_results
+
+GROUPS = ('image', 'crop', 'fertilizer', 'json')
+CROP_BATCH_SIZES = (1, 10, 100, 1000, 10000)
+
+# Feature order of the crop model: N, P, K, temperature, humidity, ph, rainfall
+CROP_FEATURE_RANGES = [(0, 140), (5, 145), (5, 205), (8, 44), (14, 100), (3.5, 9.9), (20, 300)]
+
+def synthetic_crop_inputs(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    low, high = zip(*CROP_FEATURE_RANGES)
+    return rng.uniform(low, high, size=(rows, len(CROP_FEATURE_RANGES)))
+
+def time_per_call(fn, calls, repeat, warmup):
+    """Like time_call, but each sample is the mean of `calls` back-to-back calls (for sub-µs work)."""
+    def loop():
+        for _ in range(calls):
+            fn()
+    return [sample / calls for sample in time_call(loop, repeat, warmup)]
+
+def synthetic_leaf_jpeg(size=512, seed=0):
+    """A noisy green image, so JPEG decode does real work."""
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    pixels = np.clip(rng.normal((80, 140, 60), 35, size=(size, size, 3)), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format='JPEG', quality=90)
+    return buf.getvalue()
+
+def bench_image(app, repeat, warmup):
+    import torch
+    from PIL import Image
+    processor, model = app.processor.get(), app.disease_model.get()
+    img = synthetic_leaf_jpeg()
+    image = Image.open(io.BytesIO(img)).convert('RGB')
+    inputs = processor(images=image, return_tensors="pt")
+    with torch.no_grad():
+        logits = model(**inputs).logits
+
+    def forward():
+        with torch.no_grad():
+            model(**inputs)
+
+    def label_map():
+        model.plantvillage_classes[logits.argmax(-1).item()]
+
+    return {
+        'image.decode': time_call(lambda: Image.open(io.BytesIO(img)).convert('RGB'), repeat, warmup),
+        'image.preprocess': time_call(lambda: processor(images=image, return_tensors="pt"), repeat, warmup),
+        'image.forward': time_call(forward, repeat, warmup),
+        'image.label_map': time_per_call(label_map, 100, repeat, warmup),
+        'image.predict_image': time_call(lambda: app.predict_image(img), repeat, warmup),
+    }
+
+def bench_crop(model_path, repeat, warmup):
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    X = synthetic_crop_inputs(max(CROP_BATCH_SIZES))
+    samples = {}
+    for batch in CROP_BATCH_SIZES:
+        rows = X[:batch]
+        # Big batches take seconds; fewer repetitions still give a stable median
+        n = repeat if batch <= 100 else max(3, repeat // 4)
+        samples[f'crop.predict_proba[{batch}]'] = time_call(lambda: model.predict_proba(rows), n, min(warmup, n))
+    return samples
+
+def bench_fertilizer(app, repeat, warmup):
+    crops = sorted(app.get_fertilizer_requirements())
+    rng = np.random.default_rng(0)
+    cases = [(crops[i % len(crops)], int(n), int(p), int(k))
+             for i, (n, p, k) in enumerate(rng.integers(0, 200, size=(1000, 3)))]
+
+    def lookup_all():
+        for crop, n, p, k in cases:
+            app.fertilizer_recommendation_key(crop, n, p, k)
+
+    return {
+        'fertilizer.lookup': [sample / len(cases) for sample in time_call(lookup_all, repeat, warmup)],
+        'fertilizer.read_csv': time_call(lambda: pd.read_csv('Data/fertilizer.csv'), repeat, warmup),
+    }
+
+def _sample_payloads(app):
+    crops = ['rice', 'maize', 'chickpea']
+    crop_payload = {
+        'success': True,
+        'prediction': 'rice',
+        'primary_recommendation': 'rice',
+        'recommendedCrop': {'name': 'Rice', 'confidence': 87.5, 'description': 'Rice is ideal for areas with high rainfall.'},
+        'recommendations': [{'crop': c, 'confidence': 87.5 - 20 * i} for i, c in enumerate(crops)],
+        'alternatives': [{'name': c, 'confidence': 40.0, 'reason': 'Alternative crop option.'} for c in crops[1:]],
+        'soilHealth': 'Good',
+        'soilHealthDescription': 'Your soil conditions are suitable for farming with minor adjustments needed.',
+        'conditions': {'temperature': 27.3, 'humidity': 81, 'soil_health': 'Good', 'location': 'Pune'},
+        'soil_data': {'nitrogen': 90, 'phosphorus': 42, 'potassium': 43, 'ph': 6.5, 'rainfall': 202.9,
+                      'temperature': 27.3, 'humidity': 81},
+    }
+    disease_key = sorted(app.disease_dic)[0]
+    disease_payload = {'success': True, 'prediction': disease_key.replace('_', ' ').title(),
+                       'disease_info': app.disease_dic[disease_key]}
+    activities_payload = {
+        'success': True,
+        'activities': [{
+            'id': i, 'activity_type': 'crop', 'title': 'Crop Recommendation', 'status': 'completed',
+            'result': 'Recommended crop: Rice',
+            'details': {'recommended_crop': {'name': 'Rice', 'confidence': 87.5}, 'city': 'Pune'},
+            'created_at': '2024-06-01T10:00:00', 'updated_at': '2024-06-01T10:00:00',
+        } for i in range(10)],
+        'pagination': {'page': 1, 'limit': 10, 'total': 120, 'pages': 12},
+    }
+    return {'json.crop_response': crop_payload, 'json.disease_response': disease_payload,
+            'json.activities_page': activities_payload}
+
+def bench_json(app, repeat, warmup):
+    from flask import jsonify
+    samples = {}
+    with app.app.test_request_context('/'):
+        for name, payload in _sample_payloads(app).items():
+            samples[name] = time_per_call(lambda: jsonify(payload), 100, repeat, warmup)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=GROUPS, default=list(GROUPS))
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--crop-model', default='./models/EnhancedRandomForest.pkl')
+    parser.add_argument('--save-baseline', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare against a file written by --save-baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative p50 slowdown')
+    args = parser.parse_args()
+
+    import app
+
+    samples = {}
+    for group in args.only:
+        try:
+            if group == 'image':
+                samples.update(bench_image(app, args.repeat, args.warmup))
+            elif group == 'crop':
+                samples.update(bench_crop(args.crop_model, args.repeat, args.warmup))
+            elif group == 'fertilizer':
+                samples.update(bench_fertilizer(app, args.repeat, args.warmup))
+            elif group == 'json':
+                samples.update(bench_json(app, args.repeat, args.warmup))
+        except Exception as e:
+            print(f"Skipping {group}: {e}")
+
+    if not samples:
+        sys.exit("Nothing to benchmark")
+    results = {name: summarize(values) for name, values in samples.items()}
+    table = []
+    for name, stats in results.items():
+        row = dict(benchmark=name, **stats)
+        if name.startswith('crop.predict_proba['):
+            row['us_per_row'] = round(stats['p50_ms'] * 1000 / int(name[len('crop.predict_proba['):-1]), 2)
+        table.append(row)
+    print_table(table, ['benchmark', 'n', 'min_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'us_per_row'])
+
+    if args.save_baseline:
+        save_results(args.save_baseline, results, {
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+        })
+        print(f"\nSaved to {args.save_baseline}")
+
+    if args.baseline:
+        rows, regressed = compare_results(results, load_results(args.baseline), args.tolerance)
+        print(f"\nCompared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+        print_table(rows, ['benchmark', 'baseline_p50_ms', 'p50_ms', 'change', 'verdict'])
+        if regressed:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
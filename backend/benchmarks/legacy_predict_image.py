@@ -0,0 +1,132 @@
+"""
+Latency and memory of app2.py's predict_image, before and after the rework:
+    before   a new transforms.Compose per call, short side resized to 256 (so the tensor
+             shape follows the photo's aspect ratio), ToTensor, model run with autograd on
+    after    utils/resnet9_inference.py: module-level resize + 256x256 center crop,
+             pixels written into a reused channels_last buffer, torch.inference_mode()
+
+Both run the same eager ResNet9 so only the input path and autograd differ. Images of
+several sizes and aspect ratios are decoded from JPEG bytes on every call, as in the app.
+
+Memory is measured two ways:
+    alloc_mb      bytes allocated by torch during one prediction (torch.profiler)
+    peak_rss_mb   growth of peak RSS over --calls predictions, in a fresh process per
+                  variant and image, i.e. the working set a worker needs on top of the model
+
+Without --weights (or if the file is missing) the model is randomly initialised; the
+predicted classes are then meaningless but the cost is the same.
+
+Usage (from the backend directory):
+    python -m benchmarks.legacy_predict_image --weights models/plant_disease_model.pth
+    python -m benchmarks.legacy_predict_image --sizes 640x480 --repeat 50 --threads 1
+"""
+
+import io
+import resource
+import argparse
+import multiprocessing
+
+import torch
+from PIL import Image
+from torchvision import transforms
+
+from benchmarks.common import time_call, summarize, print_table
+from benchmarks.hotpaths import synthetic_leaf_jpeg
+from benchmarks.resnet9_inference import load_model
+from utils import resnet9_inference
+from utils.disease_classes import disease_classes
+
+def predict_before(model, img):
+    """predict_image as app2.py had it."""
+    transform = transforms.Compose([
+        transforms.Resize(256),
+        transforms.ToTensor(),
+    ])
+    image = Image.open(io.BytesIO(img))
+    img_u = torch.unsqueeze(transform(image), 0)
+    yb = model(img_u)
+    _, preds = torch.max(yb, dim=1)
+    return preds[0].item()
+
+def predict_after(model, img):
+    image = Image.open(io.BytesIO(img)).convert('RGB')
+    return resnet9_inference.predict(model, image)[0]
+
+VARIANTS = {'before': predict_before, 'after': predict_after}
+
+def jpeg(size):
+    """A noisy JPEG of `size` (width, height)."""
+    square = Image.open(io.BytesIO(synthetic_leaf_jpeg(max(size))))
+    buf = io.BytesIO()
+    square.resize(size).save(buf, format='JPEG', quality=90)
+    return buf.getvalue()
+
+def allocated_bytes(fn):
+    from torch.profiler import profile, ProfilerActivity
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        fn()
+    return sum(event.self_cpu_memory_usage for event in prof.events() if event.self_cpu_memory_usage > 0)
+
+def _peak_rss_child(variant, weights, size, calls, threads, queue):
+    if threads:
+        torch.set_num_threads(threads)
+    model = load_model(weights)
+    img = jpeg(size)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for _ in range(calls):
+        VARIANTS[variant](model, img)
+    # ru_maxrss is in KiB on Linux
+    queue.put((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024)
+
+def peak_rss_mb(variant, weights, size, calls, threads):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=_peak_rss_child, args=(variant, weights, size, calls, threads, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def parse_size(text):
+    width, _, height = text.partition('x')
+    return int(width), int(height or width)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', default='models/plant_disease_model.pth')
+    parser.add_argument('--sizes', type=parse_size, nargs='+',
+                        default=[(256, 256), (640, 480), (1600, 1200)], help='WIDTHxHEIGHT')
+    parser.add_argument('--threads', type=int, help='torch intra-op threads (default: torch decides)')
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--calls', type=int, default=20, help='predictions per peak-RSS process')
+    parser.add_argument('--skip-rss', action='store_true', help='skip the per-process peak RSS runs')
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model = load_model(args.weights)
+
+    rows = []
+    for size in args.sizes:
+        img = jpeg(size)
+        labels = {}
+        for name, predict in VARIANTS.items():
+            labels[name] = predict(model, img)
+            stats = summarize(time_call(lambda: predict(model, img), args.repeat, args.warmup))
+            row = {
+                'image': f'{size[0]}x{size[1]}', 'variant': name,
+                'p50_ms': stats['p50_ms'], 'p95_ms': stats['p95_ms'], 'p99_ms': stats['p99_ms'],
+                'alloc_mb': round(allocated_bytes(lambda: predict(model, img)) / 2 ** 20, 2),
+            }
+            if not args.skip_rss:
+                row['peak_rss_mb'] = round(peak_rss_mb(name, args.weights, size, args.calls, args.threads), 1)
+            rows.append(row)
+        # Non-square photos are cropped now, so the two may legitimately disagree on those
+        if disease_classes[labels['before']] != labels['after']:
+            print(f"{size[0]}x{size[1]}: before predicted {disease_classes[labels['before']]}, after {labels['after']}")
+
+    print_table(rows, ['image', 'variant', 'p50_ms', 'p95_ms', 'p99_ms', 'alloc_mb', 'peak_rss_mb'])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+CPU latency of the ResNet9 disease model (utils/model.py, served by app2.py) with the
+rewrites in utils/inference_opt.py, at several input resolutions:
+    eager           the model as loaded, in eval mode
+    fused           BatchNorms folded into the preceding convs
+    fused_cl        fused, with channels_last weights and inputs
+    fused_cl_jit    fused_cl, traced and frozen with torch.jit
+
+Every variant is checked against eager at every resolution before it is timed; the
+max_abs_diff column is the largest logit difference seen. ResNet9 ends in a fixed
+MaxPool2d(4) + Linear(512), so inputs have to be between 256 and 511 pixels square.
+
+Without --weights (or if the file is missing) the model is randomly initialised, with
+random BatchNorm statistics so the fusion has something to fold.
+
+Usage (from the backend directory):
+    python -m benchmarks.resnet9_inference --weights models/plant_disease_model.pth
+    python -m benchmarks.resnet9_inference --resolutions 256 384 --batch 4 --threads 1
+"""
+
+import os
+import argparse
+
+import torch
+
+from benchmarks.common import time_call, summarize, print_table
+from utils.model import ResNet9
+from utils.inference_opt import fuse_conv_bn, ChannelsLast, count_batchnorms, check_equivalence, example_input
+
+NUM_CLASSES = 38
+
+def load_model(weights):
+    model = ResNet9(3, NUM_CLASSES)
+    if weights and os.path.exists(weights):
+        model.load_state_dict(torch.load(weights, map_location=torch.device('cpu')))
+    else:
+        print(f"No weights at {weights}; using a random model")
+        generator = torch.Generator().manual_seed(0)
+        for module in model.modules():
+            if isinstance(module, torch.nn.BatchNorm2d):
+                channels = module.num_features
+                module.running_mean.copy_(torch.randn(channels, generator=generator) * 0.1)
+                module.running_var.copy_(torch.rand(channels, generator=generator) + 0.5)
+                module.weight.data.copy_(torch.rand(channels, generator=generator) + 0.5)
+                module.bias.data.copy_(torch.randn(channels, generator=generator) * 0.1)
+    return model.eval()
+
+def build_variants(model, trace_input):
+    fused = fuse_conv_bn(model)
+    fused_cl = ChannelsLast(fuse_conv_bn(model))
+    with torch.no_grad():
+        fused_cl_jit = torch.jit.freeze(torch.jit.trace(ChannelsLast(fuse_conv_bn(model)).eval(), trace_input))
+    print(f"BatchNorm2d layers: {count_batchnorms(model)} before fusion, {count_batchnorms(fused)} after")
+    return {'eager': model, 'fused': fused, 'fused_cl': fused_cl, 'fused_cl_jit': fused_cl_jit}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', default='models/plant_disease_model.pth')
+    parser.add_argument('--resolutions', type=int, nargs='+', default=[256, 320, 384, 448])
+    parser.add_argument('--batch', type=int, default=1)
+    parser.add_argument('--threads', type=int, help='torch intra-op threads (default: torch decides)')
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    print(f"torch {torch.__version__}, {torch.get_num_threads()} threads")
+
+    model = load_model(args.weights)
+    variants = build_variants(model, example_input(args.resolutions[0], args.batch))
+
+    rows = []
+    for resolution in args.resolutions:
+        inputs = example_input(resolution, args.batch, seed=resolution)
+        baseline_p50 = None
+        for name, variant in variants.items():
+            max_diff = 0.0 if variant is model else check_equivalence(model, variant, inputs)
+
+            def run():
+                with torch.inference_mode():
+                    variant(inputs)
+
+            stats = summarize(time_call(run, args.repeat, args.warmup))
+            baseline_p50 = baseline_p50 or stats['p50_ms']
+            rows.append({
+                'resolution': resolution, 'variant': name,
+                'p50_ms': stats['p50_ms'], 'p95_ms': stats['p95_ms'], 'p99_ms': stats['p99_ms'],
+                'speedup': f"{baseline_p50 / stats['p50_ms']:.2f}x",
+                'max_abs_diff': f'{max_diff:.2e}',
+            })
+
+    print_table(rows, ['resolution', 'variant', 'p50_ms', 'p95_ms', 'p99_ms', 'speedup', 'max_abs_diff'])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Helpers for benchmarks that run the API under gunicorn (gunicorn.conf.py).
+
+import io
+import os
+import sys
+import time
+import signal
+import socket
+import subprocess
+import urllib.request
+from contextlib import contextmanager
+
+MULTIPART_BOUNDARY = 'farmalyzebenchmark'
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_ready(port, timeout, path='/api/ready'):
+    """Poll `path` until it returns 200; False on timeout."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=5) as response:
+                if response.status == 200:
+                    return True
+        except Exception:
+            pass
+        time.sleep(1)
+    return False
+
+def worker_pids(master_pid):
+    pids = []
+    for task in os.listdir(f'/proc/{master_pid}/task'):
+        with open(f'/proc/{master_pid}/task/{task}/children') as f:
+            pids.extend(int(child) for child in f.read().split())
+    return pids
+
+@contextmanager
+def gunicorn(workers, env=None, timeout=300, ready_path='/api/ready', log_path=None, port=None):
+    """
+    Run gunicorn with `workers` workers on `port` (default: a free one) until `ready_path`
+    answers 200; yields (port, master Popen). gunicorn's log goes to `log_path` if given.
+    """
+    port = port or free_port()
+    full_env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), **(env or {}))
+    log = open(log_path, 'ab') if log_path else subprocess.DEVNULL
+    master = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                              env=full_env, stdout=log, stderr=log)
+    try:
+        if not wait_ready(port, timeout, ready_path):
+            raise RuntimeError(f"{ready_path} did not return 200 within {timeout}s")
+        # Every worker has to be up, not just the one that answered
+        while len(worker_pids(master.pid)) < workers:
+            time.sleep(0.5)
+        yield port, master
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+        if log_path:
+            log.close()
+
+def leaf_jpeg(size=256):
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new('RGB', (size, size), (90, 140, 60)).save(buf, format='JPEG')
+    return buf.getvalue()
+
+def disease_predict_request(port, image_bytes):
+    """A urllib Request posting `image_bytes` to /api/disease-predict as multipart form data."""
+    body = (f'--{MULTIPART_BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="leaf.jpg"\r\n'
+            'Content-Type: image/jpeg\r\n\r\n').encode() + image_bytes + f'\r\n--{MULTIPART_BOUNDARY}--\r\n'.encode()
+    return urllib.request.Request(
+        f'http://127.0.0.1:{port}/api/disease-predict', data=body,
+        headers={'Content-Type': f'multipart/form-data; boundary={MULTIPART_BOUNDARY}'})
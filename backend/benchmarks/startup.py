@@ -0,0 +1,85 @@
+"""
+Startup cost of the API: time to import app.py and latency of the first requests.
+
+Each mode runs in a fresh interpreter so import caches don't carry over:
+    lazy   MODEL_WARMUP=off, models load on the first request that needs them
+    eager  MODEL_WARMUP=eager, models load while app.py is imported
+
+The first /api/health shows what an auth- or activity-only request waits for;
+the first /api/disease-predict includes loading the disease model when lazy.
+Needs the Hugging Face model (downloaded or cached); pass --skip-disease otherwise.
+
+Usage (from the backend directory):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 3 --skip-disease
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+from benchmarks.common import print_table
+
+CHILD = r'''
+import io, json, sys, time
+start = time.perf_counter()
+import app
+result = {'import_s': time.perf_counter() - start}
+
+client = app.app.test_client()
+
+start = time.perf_counter()
+client.get('/api/health')
+result['first_health_s'] = time.perf_counter() - start
+
+if not SKIP_DISEASE:
+    from PIL import Image
+    buf = io.BytesIO()
+    Image.new('RGB', (256, 256), (90, 140, 60)).save(buf, format='JPEG')
+    for key in ('first_disease_s', 'second_disease_s'):
+        start = time.perf_counter()
+        response = client.post('/api/disease-predict',
+                               data={'file': (io.BytesIO(buf.getvalue()), 'leaf.jpg')},
+                               content_type='multipart/form-data')
+        result[key] = time.perf_counter() - start
+        result['disease_status'] = response.status_code
+
+result['ready'] = client.get('/api/ready').get_json()['ready']
+print('RESULT ' + json.dumps(result))
+'''
+
+def run_child(mode, skip_disease):
+    env = dict(os.environ, MODEL_WARMUP=mode)
+    code = CHILD.replace('SKIP_DISEASE', repr(skip_disease))
+    out = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+    for line in out.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return json.loads(line[len('RESULT '):])
+    raise RuntimeError(f"{mode} run failed:\n{out.stderr[-2000:]}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3, help='fresh interpreters per mode (median is reported)')
+    parser.add_argument('--skip-disease', action='store_true', help='do not send disease predictions')
+    args = parser.parse_args()
+
+    columns = ['mode', 'import_s', 'first_health_s']
+    if not args.skip_disease:
+        columns += ['first_disease_s', 'second_disease_s']
+    columns.append('ready_after')
+
+    table = []
+    for label, mode in (('lazy', 'off'), ('eager', 'eager')):
+        runs = [run_child(mode, args.skip_disease) for _ in range(args.runs)]
+        row = {'mode': label, 'ready_after': runs[-1]['ready']}
+        for col in columns[1:-1]:
+            row[col] = round(statistics.median(run[col] for run in runs), 3)
+        table.append(row)
+
+    print_table(table, columns)
+
+if __name__ == "__main__":
+    main()
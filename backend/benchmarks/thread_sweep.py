@@ -0,0 +1,86 @@
+"""
+Throughput and tail latency of /api/disease-predict across workers x torch threads.
+
+For every combination of --workers and --threads, starts gunicorn (gunicorn.conf.py)
+with WEB_CONCURRENCY and TORCH_NUM_THREADS set accordingly, then keeps --clients
+concurrent clients (default: 2 per worker) posting the same leaf image for
+--duration seconds. Reports requests/s and latency percentiles per combination.
+
+Oversubscribed combinations (workers x threads > cores) usually keep similar
+throughput but show a much worse p99.
+
+Usage (from the backend directory):
+    python -m benchmarks.thread_sweep --workers 1 2 4 --threads 1 2 4
+    python -m benchmarks.thread_sweep --workers 2 4 --threads 1 2 --affinity auto --duration 30
+"""
+
+import time
+import argparse
+import threading
+import urllib.request
+
+from benchmarks.common import summarize, print_table
+from benchmarks.server import gunicorn, leaf_jpeg, disease_predict_request
+from utils.runtime import available_cpus
+
+def _client(port, image, deadline, samples, errors):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(disease_predict_request(port, image), timeout=60) as response:
+                response.read()
+            samples.append(time.perf_counter() - start)
+        except Exception:
+            errors.append(1)
+
+def run_combination(workers, threads, clients, duration, warmup, affinity, timeout):
+    env = {'TORCH_NUM_THREADS': str(threads), 'CPU_AFFINITY': affinity}
+    with gunicorn(workers, env, timeout) as (port, _master):
+        image = leaf_jpeg()
+        # Warm every worker's torch pools before measuring
+        _client(port, image, time.perf_counter() + warmup, [], [])
+
+        samples, errors = [], []
+        deadline = time.perf_counter() + duration
+        pool = [threading.Thread(target=_client, args=(port, image, deadline, samples, errors))
+                for _ in range(clients)]
+        start = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+    row = {'workers': workers, 'threads': threads, 'clients': clients,
+           'rps': round(len(samples) / elapsed, 2), 'errors': len(errors)}
+    if samples:
+        stats = summarize(samples)
+        row.update(p50_ms=stats['p50_ms'], p95_ms=stats['p95_ms'], p99_ms=stats['p99_ms'])
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=0, help='concurrent clients (0 = 2 per worker)')
+    parser.add_argument('--duration', type=float, default=20.0, help='measured seconds per combination')
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--affinity', choices=['off', 'auto'], default='off', help='CPU_AFFINITY for the workers')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds to wait for the models to load')
+    args = parser.parse_args()
+
+    cores = len(available_cpus())
+    table = []
+    for workers in args.workers:
+        for threads in args.threads:
+            clients = args.clients or 2 * workers
+            row = run_combination(workers, threads, clients, args.duration, args.warmup, args.affinity, args.timeout)
+            row['oversubscribed'] = 'yes' if workers * threads > cores else ''
+            table.append(row)
+            print(f"workers={workers} threads={threads}: {row['rps']} req/s, p99 {row.get('p99_ms')} ms")
+
+    print(f"\n{cores} cores available, affinity {args.affinity}\n")
+    print_table(table, ['workers', 'threads', 'clients', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'errors', 'oversubscribed'])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Per-worker memory of the gunicorn deployment, with and without preload_app.
+
+Starts gunicorn (gunicorn.conf.py) twice on a free port:
+    preload     GUNICORN_PRELOAD=true: models loaded once in the master, shared copy-on-write
+    no-preload  GUNICORN_PRELOAD=false, MODEL_WARMUP=eager: every worker loads its own copy
+waits for /api/ready, optionally sends --requests disease predictions so workers
+touch their pages as under real traffic, then reads /proc/<pid>/smaps_rollup of
+every worker:
+    USS  private (unshared) memory: what each additional worker really costs
+    PSS  proportional share, shared pages split between the processes using them
+    RSS  everything mapped in, shared pages counted in full
+
+Linux only. Needs the models available locally (see benchmarks/startup.py).
+
+Usage (from the backend directory):
+    python -m benchmarks.worker_memory --workers 4
+    python -m benchmarks.worker_memory --workers 8 --requests 50
+"""
+
+import argparse
+import urllib.request
+
+from benchmarks.common import print_table
+from benchmarks.server import gunicorn, worker_pids, leaf_jpeg, disease_predict_request
+
+def smaps_rollup_kb(pid):
+    """{'Rss': kB, 'Pss': kB, 'Private_Clean': kB, ...} for a process."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values
+
+def measure(label, workers, extra_env, requests, timeout):
+    with gunicorn(workers, extra_env, timeout) as (port, master):
+        image = leaf_jpeg()
+        for _ in range(requests):
+            with urllib.request.urlopen(disease_predict_request(port, image), timeout=60) as response:
+                response.read()
+
+        rows = []
+        for pid in [master.pid] + worker_pids(master.pid):
+            mem = smaps_rollup_kb(pid)
+            rows.append({
+                'mode': label,
+                'process': 'master' if pid == master.pid else f'worker {pid}',
+                'uss_mb': round((mem['Private_Clean'] + mem['Private_Dirty']) / 1024, 1),
+                'pss_mb': round(mem['Pss'] / 1024, 1),
+                'rss_mb': round(mem['Rss'] / 1024, 1),
+            })
+        return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=20, help='disease predictions sent before measuring')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds to wait for the models to load')
+    args = parser.parse_args()
+
+    modes = (
+        ('preload', {'GUNICORN_PRELOAD': 'true', 'MODEL_WARMUP': 'off'}),
+        ('no-preload', {'GUNICORN_PRELOAD': 'false', 'MODEL_WARMUP': 'eager'}),
+    )
+    table, totals = [], []
+    for label, extra_env in modes:
+        rows = measure(label, args.workers, extra_env, args.requests, args.timeout)
+        table.extend(rows)
+        worker_rows = [row for row in rows if row['process'] != 'master']
+        totals.append({
+            'mode': label,
+            'workers': len(worker_rows),
+            'mean_worker_uss_mb': round(sum(r['uss_mb'] for r in worker_rows) / len(worker_rows), 1),
+            'total_pss_mb': round(sum(r['pss_mb'] for r in rows), 1),
+        })
+
+    print_table(table, ['mode', 'process', 'uss_mb', 'pss_mb', 'rss_mb'])
+    print()
+    print_table(totals, ['mode', 'workers', 'mean_worker_uss_mb', 'total_pss_mb'])
+
+if __name__ == "__main__":
+    main()
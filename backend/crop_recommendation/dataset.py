@@ -0,0 +1,168 @@
+"""
+Cached, preprocessed form of Data/Crop_recommendation.csv for the training scripts.
+
+The CSV is parsed once into typed NumPy arrays (float64 features in model column order,
+string labels) and written to Data/.cache/crop-<hash>/ together with the summary the
+scripts print (describe(), missing values, duplicates, crop counts). The directory is
+named after the SHA-256 of the CSV, so editing the CSV starts a fresh cache, and a
+manifest holds the SHA-256 of every array file, which is checked on load; a cache that
+fails the check is rebuilt.
+
+Train/test splits are cached the same way, keyed by seed, test size and stratification.
+split(as_frame=False) returns their feature arrays as read-only memory maps of the
+cached files, which joblib hands to CV worker processes by file name rather than
+pickling a copy into each. The DataFrames split() returns by default are in memory:
+a DataFrame over a file memmap holds a transposed view of it, and joblib rebuilds
+such views wrongly in the workers (the rows come out scrambled), so frames must not
+be memory-mapped.
+
+    dataset = load_dataset()
+    X_train, X_test, y_train, y_test = dataset.split(test_size=0.2, random_state=42)
+"""
+
+import os
+import json
+import shutil
+import hashlib
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_PATH = os.path.join(BACKEND_DIR, 'Data', 'Crop_recommendation.csv')
+CACHE_DIR = os.path.join(BACKEND_DIR, 'Data', '.cache')
+
+FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+MANIFEST = 'manifest.json'
+
+def _sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _write_artifacts(directory, arrays, extra=None):
+    """Save `arrays` as .npy files in `directory` with a manifest of their hashes."""
+    tmp = directory + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    manifest = {'files': {}}
+    for name, array in arrays.items():
+        path = os.path.join(tmp, f'{name}.npy')
+        np.save(path, array)
+        manifest['files'][f'{name}.npy'] = _sha256(path)
+    manifest.update(extra or {})
+    with open(os.path.join(tmp, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    # Only a complete directory ever appears under the final name
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+def _read_manifest(directory, verify=True):
+    """The manifest of `directory`, or None if it is missing or an array fails its hash."""
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+        if verify:
+            for name, digest in manifest['files'].items():
+                if _sha256(os.path.join(directory, name)) != digest:
+                    print(f"{os.path.join(directory, name)} does not match its hash; rebuilding")
+                    return None
+        return manifest
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+def _summarize(df):
+    """What the training scripts print about the dataset, in a JSON-friendly form."""
+    return {
+        'shape': list(df.shape),
+        'describe': df.describe().to_dict(),
+        'missing_values': {column: int(count) for column, count in df.isnull().sum().items()},
+        'duplicates': int(df.duplicated().sum()),
+        'crop_counts': {crop: int(count) for crop, count in df['label'].value_counts().items()},
+        'crops': [str(crop) for crop in df['label'].unique()],
+    }
+
+class CropDataset:
+    """The cached dataset: `X` (memory-mapped float64, rows x 7), `y` (labels) and `summary`."""
+
+    def __init__(self, directory, verify=True):
+        self.directory = directory
+        self.verify = verify
+        self.X = np.load(os.path.join(directory, 'features.npy'), mmap_mode='r')
+        self.y = np.load(os.path.join(directory, 'labels.npy'))
+        self.summary = _read_manifest(directory, verify=False)['summary']
+        self.feature_names = list(FEATURES)
+
+    def frame(self):
+        """The dataset as the DataFrame pd.read_csv() would give (features, then 'label')."""
+        df = pd.DataFrame(np.array(self.X), columns=self.feature_names)
+        df['label'] = self.y
+        return df
+
+    def describe(self):
+        """df.describe() of the features, from the cache."""
+        return pd.DataFrame(self.summary['describe'])
+
+    def missing_values(self):
+        return pd.Series(self.summary['missing_values'])
+
+    def crop_counts(self):
+        return pd.Series(self.summary['crop_counts'], name='count')
+
+    def split_indices(self, test_size=0.2, random_state=42, stratify=True):
+        """(train, test) row indices, exactly as train_test_split on the CSV's rows gives them."""
+        return train_test_split(
+            np.arange(len(self.y)), test_size=test_size, random_state=random_state,
+            stratify=self.y if stratify else None
+        )
+
+    def split(self, test_size=0.2, random_state=42, stratify=True, as_frame=True):
+        """
+        X_train, X_test, y_train, y_test as DataFrames/Series indexed by CSV row, the
+        same as train_test_split(X, y, ...) on the CSV; built on first use. With
+        `as_frame=False`, the features are the split's cached files memory-mapped
+        read-only and the labels are arrays.
+        """
+        name = f"split-seed{random_state}-test{test_size}-{'stratified' if stratify else 'shuffled'}"
+        directory = os.path.join(self.directory, name)
+        if _read_manifest(directory, self.verify) is None:
+            train, test = self.split_indices(test_size, random_state, stratify)
+            _write_artifacts(directory, {
+                'train_index': train, 'test_index': test,
+                'X_train': np.asarray(self.X[train]), 'X_test': np.asarray(self.X[test]),
+            })
+
+        def load(array):
+            return np.load(os.path.join(directory, f'{array}.npy'), mmap_mode='r')
+
+        train, test = np.asarray(load('train_index')), np.asarray(load('test_index'))
+        if not as_frame:
+            return load('X_train'), load('X_test'), self.y[train], self.y[test]
+        X_train = pd.DataFrame(np.array(load('X_train')), columns=self.feature_names, index=train)
+        X_test = pd.DataFrame(np.array(load('X_test')), columns=self.feature_names, index=test)
+        y_train = pd.Series(self.y[train], index=train, name='label')
+        y_test = pd.Series(self.y[test], index=test, name='label')
+        return X_train, X_test, y_train, y_test
+
+def build_dataset(csv_path, directory):
+    """Parse the CSV with explicit dtypes and write its arrays and summary to `directory`."""
+    df = pd.read_csv(csv_path, dtype={**{feature: np.float64 for feature in FEATURES}, 'label': str})
+    missing = set(FEATURES + ['label']) - set(df.columns)
+    if missing:
+        raise ValueError(f"{csv_path} is missing columns: {sorted(missing)}")
+    _write_artifacts(directory, {
+        'features': np.ascontiguousarray(df[FEATURES].to_numpy(dtype=np.float64)),
+        'labels': df['label'].to_numpy(dtype=str),
+    }, extra={'source': os.path.basename(csv_path), 'source_sha256': _sha256(csv_path),
+              'summary': _summarize(df[FEATURES + ['label']])})
+
+def load_dataset(csv_path=CSV_PATH, cache_dir=CACHE_DIR, verify=True, rebuild=False):
+    """
+    The dataset from the cache for this version of the CSV, converting the CSV first if
+    there is none (or `rebuild`). `verify` checks the array files against the manifest.
+    """
+    directory = os.path.join(cache_dir, f'crop-{_sha256(csv_path)[:16]}')
+    if rebuild or _read_manifest(directory, verify) is None:
+        print(f"Converting {os.path.basename(csv_path)} to {directory}")
+        build_dataset(csv_path, directory)
+    return CropDataset(directory, verify)
@@ -18,6 +18,11 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
+
+# utils/ is in the backend directory, one level up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.crop_ranges import get_crop_ranges, FEATURES, FEATURE_NAMES, FEATURE_UNITS
 
 # Create directories if they don't exist
 os.makedirs('recommendations', exist_ok=True)
@@ -38,14 +43,16 @@ class CropRecommender:
         except FileNotFoundError:
             self.feature_importance = None
             
-        # Define optimal ranges for each crop (simplified example - would be more comprehensive in production)
-        # These ranges can be derived from the training data statistics
-        self.crop_optimal_ranges = {
-            'rice': {'temperature': (20, 30), 'humidity': (80, 100), 'ph': (5.5, 7.5), 'rainfall': (200, 300)},
-            'maize': {'temperature': (18, 28), 'humidity': (50, 75), 'ph': (5.5, 7.5), 'rainfall': (80, 150)},
-            'wheat': {'temperature': (15, 25), 'humidity': (50, 70), 'ph': (6.0, 7.5), 'rainfall': (60, 100)},
-            # Add more crops as needed
-        }
+        # Typical range of every feature for every crop, from the training data (utils/crop_ranges.py)
+        self.crop_ranges = get_crop_ranges()
+        
+        # Per-class lookups used by predict_many, computed once
+        self.classes = np.asarray(self.model.classes_)
+        self._range_ids = self.crop_ranges.class_ids(self.classes)
+        self._importance_note = ''
+        if self.feature_importance is not None:
+            top_feature = self.feature_importance.iloc[0]['Feature']
+            self._importance_note = f" The most important factor in this decision was {top_feature}."
     
     def _load_model(self, model_path):
         """Load the trained model from the specified path."""
@@ -63,9 +70,48 @@ class CropRecommender:
             except FileNotFoundError:
                 raise FileNotFoundError("No model file found. Please train the model first.")
     
+    def predict_many(self, X, top_n=3):
+        """
+        Top N crop recommendations for many samples with a single pass over the forest.
+        
+        Parameters:
+        -----------
+        X : array-like of shape (n, 7)
+            Rows of N, P, K, temperature, humidity, ph, rainfall (the FEATURES order)
+        top_n : int, optional (default=3)
+            Number of top recommendations per sample
+            
+        Returns:
+        --------
+        dict
+            'crop': (n,) best crop per sample,
+            'top_crops': (n, top_n) crops sorted by confidence,
+            'confidence': (n, top_n) confidences in percent, rounded to 2 decimals,
+            'details': (n, top_n) recommendation texts
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, len(FEATURES))
+        model_input = X
+        if hasattr(self.model, 'feature_names_in_'):
+            # Trained on a DataFrame; keep the column names so sklearn doesn't warn
+            model_input = pd.DataFrame(X, columns=self.model.feature_names_in_)
+        probabilities = self.model.predict_proba(model_input)
+        
+        # Stable sort, so ties keep class order and column 0 is what model.predict would return
+        top = np.argsort(-probabilities, axis=1, kind='stable')[:, :top_n]
+        top_crops = self.classes[top]
+        confidence = np.round(np.take_along_axis(probabilities, top, axis=1) * 100, 2)
+        
+        return {
+            'crop': top_crops[:, 0],
+            'top_crops': top_crops,
+            'confidence': confidence,
+            'details': self._generate_recommendation_details_many(top, top_crops, X),
+        }
+    
     def predict(self, nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall, top_n=3):
         """
         Predict top N crop recommendations based on soil and weather parameters.
+        Single-sample wrapper around predict_many.
         
         Parameters:
         -----------
@@ -91,63 +137,38 @@ class CropRecommender:
         tuple
             (top_crop, recommendations_df, input_data)
         """
-        # Create input DataFrame for prediction
-        input_data = pd.DataFrame({
-            'N': [nitrogen], 
-            'P': [phosphorus], 
-            'K': [potassium], 
-            'temperature': [temperature], 
-            'humidity': [humidity], 
-            'ph': [ph], 
-            'rainfall': [rainfall]
-        })
-        
-        # Make prediction
-        prediction = self.model.predict(input_data)
-        probabilities = self.model.predict_proba(input_data)[0]
-        
-        # Get top N predictions with probabilities
-        recommendations = pd.DataFrame({
-            'crop': self.model.classes_,
-            'confidence': probabilities * 100  # Convert to percentage
-        }).sort_values(by='confidence', ascending=False).head(top_n)
-        
-        # Round confidence scores to 2 decimal places
-        recommendations['confidence'] = recommendations['confidence'].round(2)
-        
-        # Add crop suitability analysis
-        recommendations['recommendation_details'] = recommendations['crop'].apply(
-            lambda crop: self._generate_recommendation_details(crop, input_data)
+        input_data = pd.DataFrame(
+            [[nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall]], columns=FEATURES
         )
+        result = self.predict_many(input_data.values, top_n)
         
-        # Rank the recommendations
-        recommendations['rank'] = range(1, len(recommendations) + 1)
+        recommendations = pd.DataFrame({
+            'crop': result['top_crops'][0],
+            'confidence': result['confidence'][0],
+            'recommendation_details': result['details'][0],
+            'rank': range(1, len(result['top_crops'][0]) + 1),
+        })
         
-        return prediction[0], recommendations, input_data
+        return result['crop'][0], recommendations, input_data
     
-    def _generate_recommendation_details(self, crop, input_data):
-        """Generate detailed explanation for the crop recommendation."""
-        # This would be more sophisticated in a production environment
-        # Here we're providing a simplified version
-        details = f"The model has identified {crop} as a suitable crop based on the provided soil and weather conditions."
-        
-        # Add feature importance insights if available
-        if self.feature_importance is not None:
-            top_feature = self.feature_importance.iloc[0]['Feature']
-            details += f" The most important factor in this decision was {top_feature}."
-        
-        # Add specific insights based on the crop
-        if crop.lower() in self.crop_optimal_ranges:
-            optimal_temp = self.crop_optimal_ranges[crop.lower()]['temperature']
-            actual_temp = input_data['temperature'].values[0]
-            
-            if optimal_temp[0] <= actual_temp <= optimal_temp[1]:
-                details += f" The temperature of {actual_temp}°C is optimal for {crop}."
-            elif actual_temp < optimal_temp[0]:
-                details += f" The temperature of {actual_temp}°C is slightly below the optimal range for {crop}."
-            else:
-                details += f" The temperature of {actual_temp}°C is slightly above the optimal range for {crop}."
+    def _generate_recommendation_details_many(self, top, top_crops, X):
+        """Detailed explanations for an (n, top_n) grid of recommended crops."""
+        deviations = self.crop_ranges.deviations(X, self._range_ids[top])
         
+        details = np.empty(top.shape, dtype=object)
+        for (i, j), crop in np.ndenumerate(top_crops):
+            text = f"The model has identified {crop} as a suitable crop based on the provided soil and weather conditions."
+            text += self._importance_note
+            outside = np.flatnonzero(deviations[i, j])
+            if len(outside) == 0:
+                text += f" All inputs are within the typical range for {crop}."
+            for f in outside:
+                low, high = self.crop_ranges.ranges[self._range_ids[top[i, j]], f]
+                unit = FEATURE_UNITS[f]
+                direction = 'below' if deviations[i, j, f] < 0 else 'above'
+                text += (f" The {FEATURE_NAMES[f]} of {X[i, f]:g}{unit} is {direction} the typical range"
+                         f" for {crop} ({low:.4g}-{high:.4g}{unit}).")
+            details[i, j] = text
         return details
     
     def visualize_recommendations(self, recommendations, input_data, filename='recommendations/crop_recommendation.png'):
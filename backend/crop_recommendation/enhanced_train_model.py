@@ -17,32 +17,42 @@ Requirements:
 Usage:
 1. Place the Crop_recommendation.csv file in the Data directory
 2. Run this script: python enhanced_train_model.py
+   (--no-plots skips the figures; see plotting.py for how they are rendered)
 3. The trained model will be saved as 'models/EnhancedRandomForest.pkl'
 """
 
 import os
+import sys
 import pickle
+import time
+import argparse
+import joblib
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold, RepeatedStratifiedKFold
+from sklearn.model_selection import cross_val_score, StratifiedKFold, RepeatedStratifiedKFold
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 from sklearn.model_selection import GridSearchCV
 
+# utils/ is in the backend directory, one level up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.crop_ranges import save_ranges, RANGES_PATH
+from plotting import exploratory_plot_jobs, evaluation_plot_jobs, render_plots
+from dataset import load_dataset, CSV_PATH
+
 # Create directories if they don't exist
 os.makedirs('models', exist_ok=True)
 os.makedirs('plots', exist_ok=True)
 
-def load_and_explore_data(data_path='../Data/Crop_recommendation.csv'):
+def load_and_explore_data(data_path=CSV_PATH):
     """Load and explore the dataset with detailed analysis."""
     print("Loading dataset...")
     
-    # Load the dataset
-    df = pd.read_csv(data_path)
+    # Load the dataset (parsed once into Data/.cache, see dataset.py)
+    dataset = load_dataset(data_path)
+    df = dataset.frame()
     
     # Display basic information
     print(f"Dataset shape: {df.shape}")
@@ -50,95 +60,33 @@ def load_and_explore_data(data_path='../Data/Crop_recommendation.csv'):
     print(df.head())
     
     print("\nStatistical summary:")
-    print(df.describe())
+    print(dataset.describe())
     
     print("\nChecking for missing values:")
-    missing_values = df.isnull().sum()
-    print(missing_values)
+    print(dataset.missing_values())
     
     # Check for duplicate rows
-    duplicates = df.duplicated().sum()
-    print(f"\nNumber of duplicate rows: {duplicates}")
+    print(f"\nNumber of duplicate rows: {dataset.summary['duplicates']}")
     
     # Data exploration
     print("\nUnique crops in dataset:")
-    unique_crops = df['label'].unique()
+    unique_crops = dataset.summary['crops']
     print(f"Number of unique crops: {len(unique_crops)}")
     print(unique_crops)
     
     # Distribution of crops
-    crop_counts = df['label'].value_counts()
     print("\nCrop distribution:")
-    print(crop_counts)
-    
-    # Generate exploratory plots
-    generate_exploratory_plots(df)
+    print(dataset.crop_counts())
     
-    return df
+    return dataset, df
 
-def generate_exploratory_plots(df):
-    """Generate detailed exploratory plots for data analysis."""
-    # Count plot for crops
-    plt.figure(figsize=(14, 7))
-    ax = sns.countplot(x='label', data=df)
-    plt.title('Crop Distribution', fontsize=16)
-    plt.xticks(rotation=90)
-    plt.tight_layout()
-    plt.savefig('plots/crop_distribution.png')
-    plt.close()
-    
-    # Feature correlation
-    plt.figure(figsize=(12, 10))
-    correlation = df.select_dtypes(include=[np.number]).corr()
-    mask = np.triu(np.ones_like(correlation, dtype=bool))
-    sns.heatmap(correlation, annot=True, cmap='coolwarm', fmt='.2f', mask=mask)
-    plt.title('Feature Correlation Matrix', fontsize=16)
-    plt.tight_layout()
-    plt.savefig('plots/feature_correlation.png')
-    plt.close()
-    
-    # Pairplot for key features
-    sns.pairplot(df[['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']].sample(500), height=2)
-    plt.suptitle('Pairwise Relationships Between Features', y=1.02, fontsize=16)
-    plt.tight_layout()
-    plt.savefig('plots/feature_pairplot.png')
-    plt.close()
-    
-    # Box plots for all features by crop (for top crops)
-    top_crops = df['label'].value_counts().nlargest(6).index
-    for feature in ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']:
-        plt.figure(figsize=(14, 7))
-        sns.boxplot(x='label', y=feature, data=df[df['label'].isin(top_crops)])
-        plt.title(f'{feature} Distribution by Top Crops', fontsize=16)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(f'plots/{feature}_by_crop.png')
-        plt.close()
-    
-    # Feature distribution with respect to crops
-    plt.figure(figsize=(18, 14))
-    features = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
-    for i, feature in enumerate(features):
-        plt.subplot(3, 3, i+1)
-        for crop in top_crops:
-            sns.kdeplot(df[df['label'] == crop][feature], label=crop)
-        plt.title(f'{feature} Distribution by Crop')
-        plt.legend(loc='best', fontsize='x-small')
-    
-    plt.tight_layout()
-    plt.savefig('plots/feature_distribution_by_crop.png')
-    plt.close()
-
-def prepare_data(df):
+def prepare_data(dataset):
     """Prepare data for modeling with proper stratification."""
     print("\nPreparing data for modeling...")
-    X = df.drop('label', axis=1)
-    y = df['label']
     
-    # Split data with stratification to ensure balanced representation of all crops
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    # Split data with stratification to ensure balanced representation of all crops;
+    # the split is cached with the dataset and its features are memory-mapped
+    X_train, X_test, y_train, y_test = dataset.split(test_size=0.2, random_state=42, stratify=True)
     
     print(f"Training set size: {X_train.shape}")
     print(f"Testing set size: {X_test.shape}")
@@ -154,8 +102,30 @@ def prepare_data(df):
     
     return X_train, X_test, y_train, y_test
 
-def train_optimized_model(X_train, y_train):
-    """Train an optimized model with extensive hyperparameter tuning."""
+# Arrays above this size are handed to CV worker processes through a memory-mapped file
+# rather than pickled into each one. The memory-mapped split from dataset.py is passed
+# by its own file; this covers what is in memory, such as the labels (joblib's default
+# threshold is 1 MB, more than this dataset's arrays).
+SHARE_BYTES = 1024
+
+def cv_parallelism(n_fits, label, cpus=None):
+    """
+    (cv_jobs, forest_jobs) for `n_fits` independent forest fits: as many CV jobs as
+    there are CPUs (or fits), and the CPUs left over per job go to each forest's trees,
+    so the two levels never ask for more threads than there are CPUs.
+    """
+    cpus = cpus or joblib.cpu_count()
+    cv_jobs = max(1, min(n_fits, cpus))
+    forest_jobs = max(1, cpus // cv_jobs)
+    print(f"{label}: {n_fits} fits on {cpus} CPUs -> {cv_jobs} CV jobs x {forest_jobs} forest threads each")
+    return cv_jobs, forest_jobs
+
+def train_optimized_model(X_train, y_train, cv_data=None):
+    """
+    Train an optimized model with extensive hyperparameter tuning. The cross-validation
+    loops run on `cv_data` (X, y) if given: the same training rows, e.g. memory-mapped.
+    """
+    X_cv, y_cv = cv_data if cv_data is not None else (X_train, y_train)
     print("\nTraining optimized Random Forest model...")
     
     # Define parameter grid for extensive search
@@ -172,23 +142,29 @@ def train_optimized_model(X_train, y_train):
     # Use StratifiedKFold for more robust cross-validation
     cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
     
-    # Initialize RandomForestClassifier
-    rf = RandomForestClassifier(random_state=42)
-    
     # Perform grid search with cross-validation
     print("\nPerforming extensive hyperparameter tuning...")
     print("This may take several minutes...")
     
+    n_candidates = int(np.prod([len(values) for values in param_grid.values()]))
+    cv_jobs, forest_jobs = cv_parallelism(n_candidates * cv.get_n_splits(), "Grid search")
+    
+    # Initialize RandomForestClassifier
+    rf = RandomForestClassifier(random_state=42, n_jobs=forest_jobs)
+    
     grid_search = GridSearchCV(
         estimator=rf,
         param_grid=param_grid,
         cv=cv,
         scoring='accuracy',
-        n_jobs=-1,
+        n_jobs=cv_jobs,
         verbose=2
     )
     
-    grid_search.fit(X_train, y_train)
+    start = time.perf_counter()
+    with joblib.parallel_config(max_nbytes=SHARE_BYTES):
+        grid_search.fit(X_cv, y_cv)
+    print(f"Grid search wall time: {time.perf_counter() - start:.1f}s")
     
     print(f"\nBest parameters: {grid_search.best_params_}")
     print(f"Best cross-validation score: {grid_search.best_score_:.4f}")
@@ -199,19 +175,27 @@ def train_optimized_model(X_train, y_train):
     # Additional cross-validation with repeated stratified k-fold
     print("\nPerforming additional cross-validation with repeated stratified k-fold...")
     repeated_cv = RepeatedStratifiedKFold(n_splits=10, n_repeats=3, random_state=42)
-    cv_scores = cross_val_score(best_rf, X_train, y_train, cv=repeated_cv, scoring='accuracy')
+    cv_jobs, forest_jobs = cv_parallelism(repeated_cv.get_n_splits(), "Repeated CV")
+    best_rf.set_params(n_jobs=forest_jobs)
+    start = time.perf_counter()
+    with joblib.parallel_config(max_nbytes=SHARE_BYTES):
+        cv_scores = cross_val_score(best_rf, X_cv, y_cv, cv=repeated_cv, scoring='accuracy', n_jobs=cv_jobs)
+    print(f"Repeated CV wall time: {time.perf_counter() - start:.1f}s")
     
     print(f"Cross-validation scores: {cv_scores}")
     print(f"Mean CV score: {cv_scores.mean():.4f}")
     print(f"Standard deviation: {cv_scores.std():.4f}")
     
-    # Retrain on full training set
+    # Retrain on full training set, one fit so all CPUs build its trees
+    best_rf.set_params(n_jobs=-1)
     best_rf.fit(X_train, y_train)
+    # The saved model predicts one row per request; threads would only add overhead
+    best_rf.set_params(n_jobs=None)
     
     return best_rf, grid_search.best_params_
 
 def evaluate_model(model, X_test, y_test, crop_names):
-    """Evaluate model with detailed metrics and visualizations."""
+    """Evaluate model with detailed metrics; returns the feature importances and the plot jobs."""
     print("\nEvaluating model on test set...")
     y_pred = model.predict(X_test)
     
@@ -220,31 +204,10 @@ def evaluate_model(model, X_test, y_test, crop_names):
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred))
     
-    # Confusion Matrix
-    plt.figure(figsize=(14, 12))
-    cm = confusion_matrix(y_test, y_pred)
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=crop_names, yticklabels=crop_names)
-    plt.xlabel('Predicted', fontsize=12)
-    plt.ylabel('Actual', fontsize=12)
-    plt.title('Confusion Matrix', fontsize=16)
-    plt.xticks(rotation=90)
-    plt.tight_layout()
-    plt.savefig('plots/confusion_matrix.png')
-    plt.close()
-    
-    # Feature importance
-    plt.figure(figsize=(12, 8))
-    importances = model.feature_importances_
-    indices = np.argsort(importances)[::-1]
+    # Confusion matrix, with rows and columns in the order of crop_names
+    cm = confusion_matrix(y_test, y_pred, labels=crop_names)
     features = X_test.columns
-    
-    plt.title('Feature Importance', fontsize=16)
-    plt.bar(range(X_test.shape[1]), importances[indices], align='center')
-    plt.xticks(range(X_test.shape[1]), [features[i] for i in indices], rotation=90)
-    plt.ylabel('Importance Score', fontsize=12)
-    plt.tight_layout()
-    plt.savefig('plots/feature_importance.png')
-    plt.close()
+    plot_jobs = evaluation_plot_jobs(cm, crop_names, model.feature_importances_, features)
     
     # Feature importance table
     importance_df = pd.DataFrame({
@@ -255,7 +218,7 @@ def evaluate_model(model, X_test, y_test, crop_names):
     print("\nFeature Importance:")
     print(importance_df)
     
-    return importance_df
+    return importance_df, plot_jobs
 
 def create_alternative_models(X_train, X_test, y_train, y_test):
     """Create and evaluate alternative models for comparison."""
@@ -275,19 +238,27 @@ def create_alternative_models(X_train, X_test, y_train, y_test):
 
 def main():
     """Main function to orchestrate the entire modeling process."""
+    parser = argparse.ArgumentParser(description='Train the crop recommendation model')
+    parser.add_argument('--no-plots', action='store_true', help='skip rendering the figures')
+    parser.add_argument('--plot-workers', type=int, help='processes for rendering figures (default: one per CPU)')
+    parser.add_argument('--force-plots', action='store_true', help='re-render figures even if their data is unchanged')
+    args = parser.parse_args()
+    
     print("Enhanced Crop Recommendation System Training\n")
     
     # Load and explore data
-    df = load_and_explore_data()
+    dataset, df = load_and_explore_data()
     
     # Prepare data
-    X_train, X_test, y_train, y_test = prepare_data(df)
+    X_train, X_test, y_train, y_test = prepare_data(dataset)
+    # The same training rows as read-only memory maps, shared by the CV worker processes
+    X_cv, _, y_cv, _ = dataset.split(test_size=0.2, random_state=42, stratify=True, as_frame=False)
     
     # Train optimized model
-    best_model, best_params = train_optimized_model(X_train, y_train)
+    best_model, best_params = train_optimized_model(X_train, y_train, cv_data=(X_cv, y_cv))
     
     # Evaluate model
-    importance_df = evaluate_model(best_model, X_test, y_test, df['label'].unique())
+    importance_df, evaluation_jobs = evaluate_model(best_model, X_test, y_test, df['label'].unique())
     
     # Train alternative model for comparison
     alt_model = create_alternative_models(X_train, X_test, y_train, y_test)
@@ -300,8 +271,18 @@ def main():
     # Save feature importance information
     importance_df.to_csv('models/feature_importance.csv', index=False)
     
+    # Per-crop typical ranges used to explain recommendations
+    save_ranges()
+    
     print("\nModel saved to models/EnhancedRandomForest.pkl")
     print("Feature importance saved to models/feature_importance.csv")
+    print(f"Crop ranges saved to {RANGES_PATH}")
+    
+    # Figures last, once the model is saved; unchanged ones are skipped
+    if not args.no_plots:
+        print("\nRendering plots...")
+        render_plots(exploratory_plot_jobs(df) + evaluation_jobs, workers=args.plot_workers, force=args.force_plots)
+    
     print("\nTraining complete!")
 
 if __name__ == "__main__":
@@ -0,0 +1,188 @@
+"""
+Figures for the crop recommendation training pipeline (enhanced_train_model.py).
+
+Each figure is a job (output file, plotting function, data). render_plots() renders the
+jobs in a process pool with the headless Agg backend and skips any figure whose data
+and plotting code hash the same as when it was last rendered, so a run where only
+the model changed redraws just the evaluation figures.
+"""
+
+import os
+import json
+import time
+import hashlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')  # no display needed, and safe in worker processes
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+
+# ----------------------------------------------------------------------------------
+# Figures. Each takes its data and the path to save to, and runs in a worker process.
+
+def plot_crop_distribution(df, path):
+    plt.figure(figsize=(14, 7))
+    sns.countplot(x='label', data=df)
+    plt.title('Crop Distribution', fontsize=16)
+    plt.xticks(rotation=90)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def plot_feature_correlation(df, path):
+    plt.figure(figsize=(12, 10))
+    correlation = df.corr()
+    mask = np.triu(np.ones_like(correlation, dtype=bool))
+    sns.heatmap(correlation, annot=True, cmap='coolwarm', fmt='.2f', mask=mask)
+    plt.title('Feature Correlation Matrix', fontsize=16)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def plot_feature_pairplot(df, path):
+    sns.pairplot(df, height=2)
+    plt.suptitle('Pairwise Relationships Between Features', y=1.02, fontsize=16)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def plot_feature_by_crop(df, path):
+    feature = df.columns[1]
+    plt.figure(figsize=(14, 7))
+    sns.boxplot(x='label', y=feature, data=df)
+    plt.title(f'{feature} Distribution by Top Crops', fontsize=16)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def plot_feature_distribution_by_crop(df, path):
+    plt.figure(figsize=(18, 14))
+    top_crops = df['label'].unique()
+    for i, feature in enumerate(FEATURES):
+        plt.subplot(3, 3, i+1)
+        for crop in top_crops:
+            sns.kdeplot(df[df['label'] == crop][feature], label=crop)
+        plt.title(f'{feature} Distribution by Crop')
+        plt.legend(loc='best', fontsize='x-small')
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def plot_confusion_matrix(data, path):
+    cm, crop_names = data
+    plt.figure(figsize=(14, 12))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=crop_names, yticklabels=crop_names)
+    plt.xlabel('Predicted', fontsize=12)
+    plt.ylabel('Actual', fontsize=12)
+    plt.title('Confusion Matrix', fontsize=16)
+    plt.xticks(rotation=90)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def plot_feature_importance(data, path):
+    importances, features = data
+    indices = np.argsort(importances)[::-1]
+    plt.figure(figsize=(12, 8))
+    plt.title('Feature Importance', fontsize=16)
+    plt.bar(range(len(features)), importances[indices], align='center')
+    plt.xticks(range(len(features)), [features[i] for i in indices], rotation=90)
+    plt.ylabel('Importance Score', fontsize=12)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+# ----------------------------------------------------------------------------------
+# Jobs for the two plotting steps of the pipeline
+
+def exploratory_plot_jobs(df):
+    """Jobs for the dataset figures; the data of each is only what it draws."""
+    top_crops = df['label'].value_counts().nlargest(6).index
+    top = df[df['label'].isin(top_crops)]
+    jobs = [
+        ('crop_distribution.png', plot_crop_distribution, df[['label']]),
+        ('feature_correlation.png', plot_feature_correlation, df.select_dtypes(include=[np.number])),
+        # Fixed seed, so the same data gives the same sample (and the cache can hit)
+        ('feature_pairplot.png', plot_feature_pairplot, df[FEATURES].sample(500, random_state=42)),
+    ]
+    jobs += [(f'{feature}_by_crop.png', plot_feature_by_crop, top[['label', feature]]) for feature in FEATURES]
+    jobs.append(('feature_distribution_by_crop.png', plot_feature_distribution_by_crop, top[['label'] + FEATURES]))
+    return jobs
+
+def evaluation_plot_jobs(cm, crop_names, importances, features):
+    return [
+        ('confusion_matrix.png', plot_confusion_matrix, (cm, list(crop_names))),
+        ('feature_importance.png', plot_feature_importance, (np.asarray(importances), list(features))),
+    ]
+
+# ----------------------------------------------------------------------------------
+
+def _update_hash(digest, data):
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        digest.update(repr(list(data.columns) if isinstance(data, pd.DataFrame) else data.name).encode())
+    elif isinstance(data, np.ndarray):
+        digest.update(repr((data.shape, data.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(data).tobytes())
+    elif isinstance(data, (list, tuple)):
+        for item in data:
+            _update_hash(digest, item)
+    else:
+        digest.update(repr(data).encode())
+
+def job_hash(func, data):
+    """Hash of a figure's data and of the code that draws it."""
+    digest = hashlib.sha256(inspect.getsource(func).encode())
+    _update_hash(digest, data)
+    return digest.hexdigest()
+
+def _render(func, data, path):
+    start = time.perf_counter()
+    func(data, path)
+    return time.perf_counter() - start
+
+def render_plots(jobs, out_dir='plots', workers=None, force=False):
+    """
+    Render `jobs` into `out_dir` in a pool of `workers` processes (default: one per CPU,
+    at most one per job). Figures unchanged since the last run are skipped unless `force`.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    cache_path = os.path.join(out_dir, '.plot_hashes.json')
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        cache = {}
+
+    start = time.perf_counter()
+    pending = []
+    for name, func, data in jobs:
+        path = os.path.join(out_dir, name)
+        digest = job_hash(func, data)
+        if not force and cache.get(name) == digest and os.path.exists(path):
+            continue
+        pending.append((name, func, data, path, digest))
+
+    if pending:
+        workers = min(len(pending), workers or os.cpu_count() or 1)
+        if workers == 1:
+            durations = [_render(func, data, path) for _, func, data, path, _ in pending]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_render, func, data, path) for _, func, data, path, _ in pending]
+                durations = [future.result() for future in futures]
+        for (name, _, _, _, digest), seconds in zip(pending, durations):
+            cache[name] = digest
+            print(f"  {name}: {seconds:.1f}s")
+        with open(cache_path, 'w') as f:
+            json.dump(cache, f, indent=2)
+
+    print(f"Plots: {len(pending)} rendered, {len(jobs) - len(pending)} unchanged, "
+          f"{time.perf_counter() - start:.1f}s wall time in {out_dir}/")
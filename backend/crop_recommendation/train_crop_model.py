@@ -23,19 +23,22 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.model_selection import train_test_split, GridSearchCV, cross_val_score
+from sklearn.model_selection import GridSearchCV, cross_val_score
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 from sklearn.preprocessing import StandardScaler
 
+from dataset import load_dataset
+
 # Create directories if they don't exist
 os.makedirs('models', exist_ok=True)
 os.makedirs('plots', exist_ok=True)
 
 print("Loading dataset...")
 
-# Load the dataset
-df = pd.read_csv('../Data/Crop_recommendation.csv')
+# Load the dataset (parsed once into Data/.cache, see dataset.py)
+dataset = load_dataset()
+df = dataset.frame()
 
 # Display basic information
 print(f"Dataset shape: {df.shape}")
@@ -43,14 +46,14 @@ print("\nFirst few rows:")
 print(df.head())
 
 print("\nStatistical summary:")
-print(df.describe())
+print(dataset.describe())
 
 print("\nChecking for missing values:")
-print(df.isnull().sum())
+print(dataset.missing_values())
 
 # Data exploration
 print("\nUnique crops in dataset:")
-unique_crops = df['label'].unique()
+unique_crops = dataset.summary['crops']
 print(f"Number of unique crops: {len(unique_crops)}")
 print(unique_crops)
 
@@ -86,10 +89,9 @@ for feature in ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']:
 # Prepare data for modeling
 print("\nPreparing data for modeling...")
 X = df.drop('label', axis=1)
-y = df['label']
 
-# Split data
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+# Split data (cached with the dataset)
+X_train, X_test, y_train, y_test = dataset.split(test_size=0.2, random_state=42, stratify=False)
 
 print(f"Training set size: {X_train.shape}")
 print(f"Testing set size: {X_test.shape}")
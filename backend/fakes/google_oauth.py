@@ -0,0 +1,104 @@
+# Local stand-in for Google's OAuth endpoints, for exercising the login flow without Google.
+#
+#   python -m fakes.google_oauth --port 9000
+#
+# then start the API with
+#
+#   GOOGLE_DISCOVERY_URL=http://127.0.0.1:9000/.well-known/openid-configuration
+#
+# The authorization endpoint approves immediately and redirects back with a code.
+# The signed-in account is picked with ?login_hint=<email> (default fake.farmer@example.com).
+# --fail-rate makes a share of userinfo/discovery calls return 503 to exercise retries,
+# and --latency-ms adds a delay to every call to mimic a remote provider.
+
+import time
+import random
+import hashlib
+import secrets
+import argparse
+import threading
+from urllib.parse import urlencode
+from flask import Flask, request, jsonify, redirect
+
+DEFAULT_EMAIL = 'fake.farmer@example.com'
+
+def create_app(latency_ms=0.0, fail_rate=0.0):
+    app = Flask(__name__)
+    lock = threading.Lock()
+    codes = {}    # code -> email
+    tokens = {}   # access token -> email
+
+    def simulate():
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+        return fail_rate and random.random() < fail_rate
+
+    @app.route('/.well-known/openid-configuration')
+    def discovery():
+        if simulate():
+            return jsonify({'error': 'unavailable'}), 503
+        base = request.host_url.rstrip('/')
+        return jsonify({
+            'issuer': base,
+            'authorization_endpoint': f'{base}/o/oauth2/v2/auth',
+            'token_endpoint': f'{base}/token',
+            'userinfo_endpoint': f'{base}/v1/userinfo',
+            'scopes_supported': ['openid', 'email', 'profile'],
+            'response_types_supported': ['code'],
+        })
+
+    @app.route('/o/oauth2/v2/auth')
+    def authorize():
+        redirect_uri = request.args.get('redirect_uri')
+        if not redirect_uri or request.args.get('response_type') != 'code':
+            return jsonify({'error': 'invalid_request'}), 400
+        code = secrets.token_urlsafe(16)
+        with lock:
+            codes[code] = request.args.get('login_hint', DEFAULT_EMAIL)
+        params = {'code': code}
+        if request.args.get('state'):
+            params['state'] = request.args['state']
+        return redirect(f'{redirect_uri}?{urlencode(params)}')
+
+    @app.route('/token', methods=['POST'])
+    def token():
+        simulate()  # never fail the token call: a code can only be redeemed once
+        if request.form.get('grant_type') != 'authorization_code':
+            return jsonify({'error': 'unsupported_grant_type'}), 400
+        with lock:
+            email = codes.pop(request.form.get('code', ''), None)
+            if email is None:
+                return jsonify({'error': 'invalid_grant'}), 400
+            access_token = secrets.token_urlsafe(24)
+            tokens[access_token] = email
+        return jsonify({'access_token': access_token, 'token_type': 'Bearer', 'expires_in': 3599})
+
+    @app.route('/v1/userinfo')
+    def userinfo():
+        if simulate():
+            return jsonify({'error': 'unavailable'}), 503
+        auth = request.headers.get('Authorization', '')
+        email = tokens.get(auth[len('Bearer '):]) if auth.startswith('Bearer ') else None
+        if email is None:
+            return jsonify({'error': 'invalid_token'}), 401
+        return jsonify({
+            'sub': str(int(hashlib.sha256(email.encode()).hexdigest()[:15], 16)),
+            'email': email,
+            'email_verified': True,
+            'name': email.split('@')[0].replace('.', ' ').title(),
+            'picture': None,
+        })
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Google OAuth provider')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='share of discovery/userinfo calls answered with 503')
+    args = parser.parse_args()
+    create_app(args.latency_ms, args.fail_rate).run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# Local stand-in for the OpenWeatherMap endpoints used by app.py (current weather and forecast).
+#
+#   python -m fakes.openweathermap --port 9001
+#
+# then start the API with OPENWEATHER_BASE_URL=http://127.0.0.1:9001/data/2.5
+#
+# Answers are deterministic per city or coordinates so load-test runs are comparable.
+# The city "nowhere" answers 404 like an unknown city does upstream.
+
+import time
+import zlib
+import argparse
+from datetime import datetime, timedelta
+from flask import Flask, request, jsonify
+
+def _weather_for(key):
+    seed = zlib.crc32(key.encode())
+    return {
+        'temp_k': 288.15 + seed % 20,
+        'humidity': 40 + seed % 50,
+        'wind': round((seed % 80) / 10, 1),
+        'rain': round((seed % 30) / 10, 1) if seed % 3 == 0 else None,
+    }
+
+def create_app(latency_ms=0.0):
+    app = Flask(__name__)
+
+    def location():
+        city = request.args.get('q')
+        if city:
+            return city.strip().lower()
+        lat, lon = request.args.get('lat'), request.args.get('lon')
+        if lat and lon:
+            return f'{float(lat):.2f},{float(lon):.2f}'
+        return None
+
+    @app.before_request
+    def simulate_latency():
+        if latency_ms:
+            time.sleep(latency_ms / 1000.0)
+
+    @app.route('/data/2.5/weather')
+    def current():
+        key = location()
+        if key is None:
+            return jsonify({'cod': '400', 'message': 'Nothing to geocode'}), 400
+        if key == 'nowhere':
+            return jsonify({'cod': '404', 'message': 'city not found'}), 404
+        w = _weather_for(key)
+        body = {
+            'cod': 200,
+            'name': key.title() if request.args.get('q') else 'Testville',
+            'sys': {'country': 'IN'},
+            'main': {'temp': w['temp_k'], 'humidity': w['humidity']},
+            'weather': [{'description': 'scattered clouds'}],
+            'wind': {'speed': w['wind']},
+        }
+        if w['rain'] is not None:
+            body['rain'] = {'1h': w['rain']}
+        return jsonify(body)
+
+    @app.route('/data/2.5/forecast')
+    def forecast():
+        key = location()
+        if key is None:
+            return jsonify({'cod': '400', 'message': 'Nothing to geocode'}), 400
+        w = _weather_for(key)
+        start = datetime(2024, 6, 1)
+        items = []
+        for i in range(40):
+            item = {
+                'dt_txt': (start + timedelta(hours=3 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+                'main': {'temp': w['temp_k'] + (i % 8) - 4, 'humidity': w['humidity']},
+                'weather': [{'description': 'light rain' if i % 5 == 0 else 'clear sky'}],
+            }
+            if i % 5 == 0:
+                item['rain'] = {'3h': 0.6}
+            items.append(item)
+        return jsonify({'cod': '200', 'list': items})
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake OpenWeatherMap API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9001)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+    create_app(args.latency_ms).run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == '__main__':
+    main()
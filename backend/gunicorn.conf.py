@@ -0,0 +1,70 @@
+# gunicorn settings for the API:  gunicorn -c gunicorn.conf.py app:app  (from the backend directory)
+#
+# With GUNICORN_PRELOAD (default on) the app is imported and all models are loaded once
+# in the master, then workers are forked and share those pages copy-on-write instead of
+# each loading its own copy. To keep the shared pages clean:
+#   - gc.freeze() after loading moves every existing object into the permanent
+#     generation, so the workers' cyclic GC never writes to their headers;
+#   - the master stays single-threaded and never runs inference, so torch's thread
+#     pools are created in the workers (OpenMP pools don't survive fork) and no
+#     activations are allocated in the shared heap;
+#   - each worker sets its own torch threads (and optionally CPU affinity) in post_fork,
+#     see utils/runtime.py.
+# Tensor and numpy data live outside the Python object headers, so reference count
+# updates in the workers only dirty the small header pages, not the weights.
+#
+# python -m benchmarks.worker_memory compares per-worker unique memory with and without preload.
+
+import os
+import gc
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+def when_ready(server):
+    # Build models/crop_ranges.npz here if needed, before any worker looks for it
+    # (with or without preload), so workers don't race to build it
+    from utils.crop_ranges import get_crop_ranges
+    try:
+        get_crop_ranges()
+    except Exception as e:
+        server.log.warning(f"Loading the crop range table failed: {e}; workers will build it")
+    if not preload_app:
+        return
+    from utils.model_registry import load_all, models_status
+    try:
+        import torch
+        # Keep the master single-threaded so no intra-op pool exists at fork time
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    # app.py was already imported by preload_app, which registered the models
+    load_all()
+    ready, models = models_status()
+    for name, status in models.items():
+        if status['state'] == 'loaded':
+            server.log.info(f"Preloaded model {name} in {status['load_seconds']}s")
+        else:
+            server.log.warning(f"Preloading model {name} failed: {status['error']}")
+    if not ready:
+        server.log.warning("Not all models loaded in the master; workers will load them lazily")
+    gc.collect()
+    gc.freeze()
+
+def pre_fork(server, worker):
+    # Give each worker a stable slot 0..workers-1 (reused when a worker is replaced)
+    # so it gets the same share of the cores
+    used = {getattr(w, 'runtime_slot', None) for w in server.WORKERS.values()}
+    free = [slot for slot in range(workers) if slot not in used]
+    worker.runtime_slot = free[0] if free else len(used) % workers
+
+def post_fork(server, worker):
+    from utils.runtime import configure_worker
+    settings = configure_worker(worker.runtime_slot, workers)
+    server.log.info(
+        f"Worker {worker.pid}: slot {settings['worker']}, {settings['torch_threads']} torch threads, "
+        f"{settings['interop_threads']} interop threads, cpus {settings['cpus'] or 'not pinned'}"
+    )
@@ -0,0 +1,114 @@
+# Local stand-ins for everything the API talks to, so load tests need no network or accounts:
+#   - a SQLite file with the production schema instead of Turso (DATABASE_MODE=local)
+#   - fakes/openweathermap.py instead of OpenWeatherMap
+#   - fakes/google_oauth.py instead of Google
+
+import os
+import sys
+import time
+import sqlite3
+import subprocess
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+from activities.rollups import ROLLUP_SCHEMA
+from activities.search import SEARCH_SCHEMA
+from benchmarks.server import free_port
+
+# Same tables as auth/README.md and activities/init_activities_db.py
+BASE_SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        name TEXT NOT NULL,
+        google_id TEXT,
+        profile_picture TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_users_google_id ON users(google_id)',
+    '''CREATE TABLE IF NOT EXISTS user_activities (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        activity_type TEXT NOT NULL,
+        title TEXT NOT NULL,
+        status TEXT DEFAULT 'completed',
+        result TEXT,
+        details TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_user_activities_user_id ON user_activities(user_id)',
+    'CREATE INDEX IF NOT EXISTS idx_user_activities_created_at ON user_activities(created_at DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_user_activities_type ON user_activities(activity_type)',
+]
+
+def create_database(path):
+    """Create an empty database with the full schema at `path`."""
+    conn = sqlite3.connect(path)
+    # Several workers write to it concurrently
+    conn.execute('PRAGMA journal_mode=WAL')
+    for statement in BASE_SCHEMA + ROLLUP_SCHEMA + SEARCH_SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+
+def _wait_for(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except urllib.error.HTTPError:
+            return  # it answered, even if with an error status
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+@contextmanager
+def fake_services(workdir, weather_latency_ms=0.0, oauth_latency_ms=0.0):
+    """Start the fake weather and OAuth servers; yields the env vars pointing the API at them."""
+    weather_port, oauth_port = free_port(), free_port()
+    processes = []
+    try:
+        for module, port, latency in (('fakes.openweathermap', weather_port, weather_latency_ms),
+                                      ('fakes.google_oauth', oauth_port, oauth_latency_ms)):
+            log = open(os.path.join(workdir, f"{module.split('.')[-1]}.log"), 'ab')
+            processes.append((subprocess.Popen(
+                [sys.executable, '-m', module, '--port', str(port), '--latency-ms', str(latency)],
+                stdout=log, stderr=log), log))
+
+        weather_url = f'http://127.0.0.1:{weather_port}/data/2.5'
+        discovery_url = f'http://127.0.0.1:{oauth_port}/.well-known/openid-configuration'
+        _wait_for(f'{weather_url}/weather?q=startup')
+        _wait_for(discovery_url)
+        yield {
+            'OPENWEATHER_BASE_URL': weather_url,
+            'WEATHER_API_KEY': 'loadtest',
+            'GOOGLE_DISCOVERY_URL': discovery_url,
+            'GOOGLE_CLIENT_ID': 'loadtest-client',
+            'GOOGLE_CLIENT_SECRET': 'loadtest-secret',
+        }
+    finally:
+        for process, log in processes:
+            process.terminate()
+            process.wait(timeout=10)
+            log.close()
+
+def app_env(workdir, services_env, port):
+    """Environment for the gunicorn under test, which will listen on `port`."""
+    database_path = os.path.join(workdir, 'farmalyze-loadtest.db')
+    create_database(database_path)
+    env = dict(services_env)
+    env.update({
+        'DATABASE_MODE': 'local',
+        'LOCAL_DATABASE_PATH': database_path,
+        # Shared across workers so the OAuth callback may land on any worker
+        'OAUTH_STATE_BACKEND': 'sqlite',
+        'OAUTH_STATE_DB_PATH': os.path.join(workdir, 'oauth-states.db'),
+        # All virtual users come from 127.0.0.1
+        'RATE_LIMIT_ENABLED': 'false',
+        'FRONTEND_URL': 'http://frontend.invalid',
+        'GOOGLE_REDIRECT_URI': f'http://127.0.0.1:{port}/api/auth/google/callback',
+    })
+    return env
@@ -0,0 +1,216 @@
+"""
+End-to-end load test of the API under gunicorn, with no external services.
+
+Starts the fake OpenWeatherMap and Google OAuth servers, creates a fresh SQLite
+database (DATABASE_MODE=local), starts gunicorn with gunicorn.conf.py, registers
+--users users with some seeded activities, then runs --clients concurrent virtual
+users for --duration seconds. Each request picks a scenario from --mix by weight:
+    disease, crop, fertilizer, activities, activity_stats, activity_write, oauth_login
+
+The JSON report (--output) has throughput, latency percentiles and error rates per
+scenario and in total. With --baseline, the run is compared against an earlier
+report and the exit status is 1 if any scenario regressed by more than --tolerance.
+
+Usage (from the backend directory):
+    python -m loadtest.run --duration 60 --clients 16 --workers 4 --output loadtest-report.json
+    python -m loadtest.run --mix crop=1,fertilizer=1 --baseline loadtest-report.json
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+import requests
+
+from benchmarks.common import summarize, print_table
+from benchmarks.server import gunicorn, leaf_jpeg, free_port
+from loadtest.environment import fake_services, app_env
+from loadtest.scenarios import SCENARIOS, DEFAULT_MIX, Context, parse_mix, pick_scenario, new_rng, seed_activities
+
+def _fertilizer_crops():
+    with open('Data/fertilizer.csv', newline='') as f:
+        return sorted({row['Crop'] for row in csv.DictReader(f)})
+
+def setup_users(base_url, count, activities_per_user, seed):
+    """Register and log in `count` users; returns their access tokens."""
+    rng = new_rng(seed)
+    session = requests.Session()
+    tokens = []
+    for i in range(count):
+        credentials = {'email': f'loadtest{i}@example.com', 'password': f'loadtest-password-{i}'}
+        session.post(f'{base_url}/api/auth/register', json=dict(credentials, name=f'Load Test {i}'))
+        response = session.post(f'{base_url}/api/auth/login', json=credentials)
+        response.raise_for_status()
+        token = response.json()['access_token']
+        if activities_per_user:
+            seed_activities(session, base_url, token, activities_per_user, rng)
+        tokens.append(token)
+    return tokens
+
+def virtual_user(ctx, mix, deadline, seed, results):
+    rng = new_rng(seed)
+    session = requests.Session()
+    samples = []
+    while time.perf_counter() < deadline:
+        name = pick_scenario(rng, mix)
+        start = time.perf_counter()
+        try:
+            status = SCENARIOS[name](session, ctx, rng)
+        except requests.RequestException:
+            status = 0
+        samples.append((name, time.perf_counter() - start, status))
+    results.extend(samples)
+
+def _scenario_report(samples, elapsed):
+    latencies = [latency for _, latency, _ in samples]
+    statuses = {}
+    for _, _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(count for status, count in statuses.items() if not 0 < int(status) < 400)
+    report = {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'rps': round(len(samples) / elapsed, 2),
+        'statuses': statuses,
+    }
+    if latencies:
+        report.update(summarize(latencies))
+    return report
+
+def build_report(samples, elapsed, meta):
+    by_scenario = {}
+    for sample in samples:
+        by_scenario.setdefault(sample[0], []).append(sample)
+    return {
+        'meta': meta,
+        'total': _scenario_report(samples, elapsed),
+        'scenarios': {name: _scenario_report(rows, elapsed) for name, rows in sorted(by_scenario.items())},
+    }
+
+def compare(report, baseline, tolerance):
+    """Rows comparing two reports, and whether any scenario regressed beyond `tolerance`."""
+    rows, regressed = [], False
+    names = ['total'] + sorted(set(report['scenarios']) & set(baseline['scenarios']))
+    for name in names:
+        new = report['total'] if name == 'total' else report['scenarios'][name]
+        old = baseline['total'] if name == 'total' else baseline['scenarios'][name]
+        if 'p95_ms' not in new or 'p95_ms' not in old:
+            continue
+        p95_change = new['p95_ms'] / old['p95_ms'] - 1 if old['p95_ms'] else 0.0
+        rps_change = new['rps'] / old['rps'] - 1 if old['rps'] else 0.0
+        error_change = new['error_rate'] - old['error_rate']
+        worse = p95_change > tolerance or rps_change < -tolerance or error_change > 0.01
+        regressed = regressed or worse
+        rows.append({
+            'scenario': name,
+            'rps': f"{old['rps']} -> {new['rps']} ({rps_change:+.1%})",
+            'p95_ms': f"{old['p95_ms']} -> {new['p95_ms']} ({p95_change:+.1%})",
+            'p99_ms': f"{old['p99_ms']} -> {new['p99_ms']}",
+            'error_rate': f"{old['error_rate']} -> {new['error_rate']}",
+            'verdict': 'REGRESSED' if worse else 'ok',
+        })
+    return rows, regressed
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=60.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5.0, help='unmeasured seconds before the run')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='scenario weights, e.g. crop=3,fertilizer=1')
+    parser.add_argument('--users', type=int, default=10, help='registered users the virtual users act as')
+    parser.add_argument('--activities-per-user', type=int, default=50)
+    parser.add_argument('--weather-latency-ms', type=float, default=50.0, help='delay added by the fake weather API')
+    parser.add_argument('--oauth-latency-ms', type=float, default=30.0, help='delay added by the fake OAuth provider')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=300, help='seconds to wait for the models to load')
+    parser.add_argument('--skip-ready', action='store_true',
+                        help='only wait for /api/health (when the models are unavailable)')
+    parser.add_argument('--output', default='loadtest-report.json')
+    parser.add_argument('--baseline', help='earlier report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative p95/throughput change')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory(prefix='farmalyze-loadtest-') as workdir:
+        with fake_services(workdir, args.weather_latency_ms, args.oauth_latency_ms) as services_env:
+            port = free_port()
+            env = app_env(workdir, services_env, port)
+            ready_path = '/api/health' if args.skip_ready else '/api/ready'
+            log_path = os.path.join(workdir, 'gunicorn.log')
+            try:
+                with gunicorn(args.workers, env, args.timeout, ready_path, log_path, port) as (port, _master):
+                    base_url = f'http://127.0.0.1:{port}'
+                    print(f"API up on {base_url}; registering {args.users} users")
+                    ctx = Context(base_url, setup_users(base_url, args.users, args.activities_per_user, args.seed),
+                                  _fertilizer_crops(), leaf_jpeg())
+
+                    if args.warmup:
+                        virtual_user(ctx, mix, time.perf_counter() + args.warmup, args.seed, [])
+
+                    print(f"Running {args.clients} virtual users for {args.duration}s")
+                    samples = []
+                    deadline = time.perf_counter() + args.duration
+                    threads = [threading.Thread(target=virtual_user, args=(ctx, mix, deadline, args.seed + i, samples))
+                               for i in range(args.clients)]
+                    start = time.perf_counter()
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    elapsed = time.perf_counter() - start
+            except Exception:
+                if os.path.exists(log_path):
+                    with open(log_path, errors='replace') as f:
+                        print(f.read()[-4000:], file=sys.stderr)
+                raise
+
+    report = build_report(samples, elapsed, {
+        'started_at': datetime.now().isoformat(),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'duration_s': round(elapsed, 2),
+        'clients': args.clients,
+        'workers': args.workers,
+        'mix': mix,
+        'weather_latency_ms': args.weather_latency_ms,
+        'oauth_latency_ms': args.oauth_latency_ms,
+    })
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    table = [dict(scenario=name, **stats) for name, stats in report['scenarios'].items()]
+    table.append(dict(scenario='total', **report['total']))
+    print_table(table, ['scenario', 'requests', 'rps', 'error_rate', 'p50_ms', 'p95_ms', 'p99_ms'])
+    print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ('mix', 'clients', 'workers', 'cpus'):
+            if baseline['meta'].get(key) != report['meta'].get(key):
+                print(f"Warning: {key} differs from the baseline ({baseline['meta'].get(key)} vs {report['meta'].get(key)})")
+        rows, regressed = compare(report, baseline, args.tolerance)
+        print(f"\nCompared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+        print_table(rows, ['scenario', 'rps', 'p95_ms', 'p99_ms', 'error_rate', 'verdict'])
+        if regressed:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
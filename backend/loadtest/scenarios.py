@@ -0,0 +1,120 @@
+# Request scenarios for the load test. Each one sends the requests of one user action
+# with a requests.Session and returns the HTTP status that decides success.
+
+import random
+from urllib.parse import urlparse, parse_qs
+
+CITIES = ['Pune', 'Nagpur', 'Ludhiana', 'Guntur', 'Nashik', 'Indore', 'Mysuru', 'Hisar']
+
+class Context:
+    """Shared, read-only inputs for all virtual users."""
+
+    def __init__(self, base_url, tokens, fertilizer_crops, image):
+        self.base_url = base_url
+        self.tokens = tokens
+        self.fertilizer_crops = fertilizer_crops
+        self.image = image
+
+    def auth_headers(self, rng):
+        return {'Authorization': f'Bearer {rng.choice(self.tokens)}'}
+
+def disease(session, ctx, rng):
+    response = session.post(f'{ctx.base_url}/api/disease-predict',
+                            files={'file': ('leaf.jpg', ctx.image, 'image/jpeg')})
+    return response.status_code
+
+def crop(session, ctx, rng):
+    response = session.post(f'{ctx.base_url}/api/crop-predict', json={
+        'nitrogen': rng.randint(0, 140),
+        'phosphorus': rng.randint(5, 145),
+        'potassium': rng.randint(5, 205),
+        'ph': round(rng.uniform(4.5, 8.5), 1),
+        'rainfall': round(rng.uniform(20, 300), 1),
+        'city': rng.choice(CITIES),
+    })
+    return response.status_code
+
+def fertilizer(session, ctx, rng):
+    response = session.post(f'{ctx.base_url}/api/fertilizer-predict', json={
+        'cropname': rng.choice(ctx.fertilizer_crops),
+        'nitrogen': rng.randint(0, 140),
+        'phosphorus': rng.randint(5, 145),
+        'potassium': rng.randint(5, 205),
+    })
+    return response.status_code
+
+def activities(session, ctx, rng):
+    response = session.get(f'{ctx.base_url}/api/activities', params={'page': 1, 'limit': 10},
+                           headers=ctx.auth_headers(rng))
+    return response.status_code
+
+def activity_stats(session, ctx, rng):
+    response = session.get(f'{ctx.base_url}/api/activities/stats', headers=ctx.auth_headers(rng))
+    return response.status_code
+
+def activity_write(session, ctx, rng):
+    city = rng.choice(CITIES)
+    response = session.post(f'{ctx.base_url}/api/activities/create', headers=ctx.auth_headers(rng), json={
+        'activity_type': 'fertilizer',
+        'title': 'Fertilizer Recommendation',
+        'result': 'Nitrogen is low',
+        'details': {'crop_name': rng.choice(ctx.fertilizer_crops), 'city': city},
+    })
+    return response.status_code
+
+def oauth_login(session, ctx, rng):
+    """The whole Google sign-in round trip against the fake provider."""
+    response = session.post(f'{ctx.base_url}/api/auth/google/login', json={})
+    if response.status_code != 200:
+        return response.status_code
+    auth_url = response.json()['auth_url'] + f'&login_hint=loadtest{rng.randint(1, 50)}@example.com'
+    response = session.get(auth_url, allow_redirects=False)
+    if response.status_code != 302:
+        return response.status_code
+    # The fake provider redirects to our callback, which redirects to the frontend with a token
+    response = session.get(response.headers['Location'], allow_redirects=False)
+    location = response.headers.get('Location', '')
+    if response.status_code != 302 or 'token' not in parse_qs(urlparse(location).query):
+        return 502
+    return 200
+
+SCENARIOS = {
+    'disease': disease,
+    'crop': crop,
+    'fertilizer': fertilizer,
+    'activities': activities,
+    'activity_stats': activity_stats,
+    'activity_write': activity_write,
+    'oauth_login': oauth_login,
+}
+
+DEFAULT_MIX = 'disease=2,crop=3,fertilizer=3,activities=3,activity_stats=1,activity_write=1,oauth_login=0.2'
+
+def parse_mix(text):
+    """'disease=2,crop=3' -> {'disease': 2.0, 'crop': 3.0}"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+def seed_activities(session, base_url, token, count, rng):
+    """Give a user some history so list/stats requests have rows to read."""
+    items = [{
+        'activity_type': rng.choice(['crop', 'disease', 'fertilizer']),
+        'title': 'Seeded activity',
+        'result': 'seeded',
+        'details': {'city': rng.choice(CITIES)},
+    } for _ in range(count)]
+    response = session.post(f'{base_url}/api/activities/bulk', json={'activities': items},
+                            headers={'Authorization': f'Bearer {token}'})
+    response.raise_for_status()
+
+def pick_scenario(rng, mix):
+    return rng.choices(list(mix), weights=list(mix.values()))[0]
+
+def new_rng(seed):
+    return random.Random(seed)
@@ -0,0 +1,7 @@
+# Tests import the backend packages (auth, utils, fakes, ...) from the backend directory:
+#     cd backend && python -m pytest tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
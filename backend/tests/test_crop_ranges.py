@@ -0,0 +1,41 @@
+# utils/crop_ranges.py: the saved table is replaced atomically and rebuilt when unusable.
+
+import os
+
+import numpy as np
+
+from utils.crop_ranges import CropRanges, save_ranges, build_ranges, DATA_PATH
+
+def test_save_leaves_only_the_table(tmp_path):
+    path = str(tmp_path / 'crop_ranges.npz')
+    labels, ranges = save_ranges(path)
+    assert os.listdir(tmp_path) == ['crop_ranges.npz']
+    table = CropRanges.load(path)
+    assert list(table.labels) == list(labels)
+    assert np.array_equal(table.ranges, ranges)
+
+def test_corrupt_table_is_rebuilt(tmp_path):
+    path = tmp_path / 'crop_ranges.npz'
+    save_ranges(str(path))
+    path.write_bytes(path.read_bytes()[:100])
+    table = CropRanges.load(str(path))
+    labels, ranges = build_ranges()
+    assert np.array_equal(table.ranges, ranges)
+    # ... and saved again, readable this time
+    assert np.array_equal(CropRanges.load(str(path)).ranges, ranges)
+
+def test_table_without_arrays_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'crop_ranges.npz')
+    np.savez(path, labels=np.array(['rice']))
+    assert len(CropRanges.load(path).labels) == len(build_ranges()[0])
+
+def test_stale_table_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'crop_ranges.npz')
+    csv_path = str(tmp_path / 'crops.csv')
+    with open(DATA_PATH) as src, open(csv_path, 'w') as dst:
+        dst.write(src.read())
+    save_ranges(path, csv_path)
+    with open(csv_path, 'a') as f:
+        f.write('300,300,300,20,80,6.5,200,rice\n')
+    table = CropRanges.load(path, csv_path)
+    assert np.array_equal(table.ranges, build_ranges(csv_path)[1])
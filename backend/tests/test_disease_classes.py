@@ -0,0 +1,36 @@
+# hf_class_names(): the Hugging Face disease model's id2label mapped onto disease_classes.
+
+import pytest
+
+from utils.disease_classes import disease_classes, HF_LABEL_TO_CLASS, hf_class_names
+
+def hf_id2label(labels=None):
+    """An id2label as transformers loads it (int keys), in a different order than disease_classes."""
+    labels = list(HF_LABEL_TO_CLASS) if labels is None else labels
+    return {index: label for index, label in enumerate(reversed(labels))}
+
+def test_maps_by_label_not_position():
+    id2label = hf_id2label()
+    names = hf_class_names(id2label)
+    assert names == [HF_LABEL_TO_CLASS[id2label[i]] for i in range(len(id2label))]
+    assert names == list(reversed(disease_classes))
+
+def test_accepts_string_keys_and_case_differences():
+    id2label = {str(i): label.upper() for i, label in hf_id2label().items()}
+    assert hf_class_names(id2label) == list(reversed(disease_classes))
+
+def test_rejects_wrong_length():
+    with pytest.raises(RuntimeError, match='labels, expected'):
+        hf_class_names(hf_id2label(list(HF_LABEL_TO_CLASS)[:-1]))
+
+def test_rejects_unknown_label():
+    labels = list(HF_LABEL_TO_CLASS)
+    labels[0] = 'Banana with Sigatoka'
+    with pytest.raises(RuntimeError, match='Banana with Sigatoka'):
+        hf_class_names(hf_id2label(labels))
+
+def test_rejects_duplicate_class():
+    labels = list(HF_LABEL_TO_CLASS)
+    labels[1] = labels[0]
+    with pytest.raises(RuntimeError, match='do not cover'):
+        hf_class_names(hf_id2label(labels))
@@ -0,0 +1,140 @@
+# auth/oauth_client.py against the fake provider in fakes/google_oauth.py, served on a
+# local port. Failures are injected per path with a before_request hook on the fake.
+
+import threading
+from collections import Counter
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from flask import request, jsonify
+from werkzeug.serving import make_server
+
+from auth.oauth_client import OAuthClient, GOOGLE_DEFAULT_METADATA
+from fakes.google_oauth import create_app, DEFAULT_EMAIL
+
+DISCOVERY_PATH = '/.well-known/openid-configuration'
+
+class FakeProvider:
+    """The fake on a free port; counts calls per path and answers 503 to the next `fail[path]`."""
+
+    def __init__(self):
+        self.app = create_app()
+        self.calls = Counter()
+        self.fail = Counter()
+        self.app.before_request(self._before_request)
+        self.server = make_server('127.0.0.1', 0, self.app, threaded=True)
+        self.base = f'http://127.0.0.1:{self.server.server_port}'
+        self.discovery_url = self.base + DISCOVERY_PATH
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+
+    def _before_request(self):
+        self.calls[request.path] += 1
+        if self.fail[request.path] > 0:
+            self.fail[request.path] -= 1
+            return jsonify({'error': 'unavailable'}), 503
+
+    def authorization_code(self, client, email=DEFAULT_EMAIL):
+        """Run the authorization step the browser would and return the issued code."""
+        response = client.session.get(
+            client.endpoint('authorization_endpoint'),
+            params={'response_type': 'code', 'redirect_uri': 'http://app.test/callback', 'login_hint': email},
+            allow_redirects=False,
+            timeout=client.timeout,
+        )
+        assert response.status_code == 302
+        return parse_qs(urlparse(response.headers['Location']).query)['code'][0]
+
+    def close(self):
+        self.server.shutdown()
+        self._thread.join()
+
+@pytest.fixture
+def provider():
+    fake = FakeProvider()
+    yield fake
+    fake.close()
+
+def make_client(provider, retries=2, discovery_ttl=3600):
+    return OAuthClient(discovery_url=provider.discovery_url, retries=retries,
+                       timeout=(2, 5), discovery_ttl=discovery_ttl)
+
+def test_discovery_document_is_cached(provider):
+    client = make_client(provider)
+    assert client.endpoint('token_endpoint') == provider.base + '/token'
+    assert client.endpoint('userinfo_endpoint') == provider.base + '/v1/userinfo'
+    client.metadata()
+    assert provider.calls[DISCOVERY_PATH] == 1
+
+def test_discovery_is_refetched_after_ttl(provider):
+    client = make_client(provider, discovery_ttl=0)
+    client.metadata()
+    client.metadata()
+    assert provider.calls[DISCOVERY_PATH] == 2
+
+def test_discovery_falls_back_to_google_defaults(provider):
+    client = make_client(provider, retries=0)
+    provider.fail[DISCOVERY_PATH] = 1
+    assert client.metadata() == GOOGLE_DEFAULT_METADATA
+    # The failure is not retried on every call, only after the back-off minute
+    client.metadata()
+    assert provider.calls[DISCOVERY_PATH] == 1
+
+def test_discovery_failure_keeps_last_good_document(provider):
+    client = make_client(provider, retries=0, discovery_ttl=0)
+    good = client.metadata()
+    provider.fail[DISCOVERY_PATH] = 1
+    assert client.metadata() == good
+    assert provider.calls[DISCOVERY_PATH] == 2
+
+def test_exchange_code(provider):
+    client = make_client(provider)
+    ok, token = client.exchange_code(provider.authorization_code(client), 'http://app.test/callback')
+    assert ok
+    assert token['token_type'] == 'Bearer' and token['access_token']
+
+def test_exchange_code_rejects_reused_code(provider):
+    client = make_client(provider)
+    code = provider.authorization_code(client)
+    assert client.exchange_code(code, 'http://app.test/callback')[0]
+    ok, error = client.exchange_code(code, 'http://app.test/callback')
+    assert not ok
+    assert error == {'error': 'invalid_grant'}
+
+def test_exchange_code_is_not_retried(provider):
+    client = make_client(provider)
+    code = provider.authorization_code(client)
+    provider.fail['/token'] = 1
+    ok, _ = client.exchange_code(code, 'http://app.test/callback')
+    assert not ok
+    assert provider.calls['/token'] == 1
+
+def test_userinfo_maps_sub_to_id(provider):
+    client = make_client(provider)
+    _, token = client.exchange_code(provider.authorization_code(client, 'asha.rao@example.com'),
+                                    'http://app.test/callback')
+    ok, user = client.userinfo(token['access_token'])
+    assert ok
+    assert user['id'] == user['sub']
+    assert user['email'] == 'asha.rao@example.com'
+
+def test_userinfo_rejects_unknown_token(provider):
+    ok, user = make_client(provider).userinfo('not-a-token')
+    assert not ok
+    assert 'id' not in user
+
+def test_userinfo_retries_503(provider):
+    client = make_client(provider, retries=2)
+    _, token = client.exchange_code(provider.authorization_code(client), 'http://app.test/callback')
+    provider.fail['/v1/userinfo'] = 2
+    ok, user = client.userinfo(token['access_token'])
+    assert ok and user['email'] == DEFAULT_EMAIL
+    assert provider.calls['/v1/userinfo'] == 3
+
+def test_userinfo_gives_up_after_retries(provider):
+    client = make_client(provider, retries=1)
+    _, token = client.exchange_code(provider.authorization_code(client), 'http://app.test/callback')
+    provider.fail['/v1/userinfo'] = 5
+    ok, _ = client.userinfo(token['access_token'])
+    assert not ok
+    assert provider.calls['/v1/userinfo'] == 2
@@ -0,0 +1,57 @@
+# activities/rollups.py: rollup tables are created and filled on a database that lacks them.
+
+import json
+import sqlite3
+
+from activities.rollups import ensure_rollups, apply_activity
+from loadtest.environment import BASE_SCHEMA
+
+def activities_db(path):
+    """A database from before the rollups: user_activities only, with a few rows."""
+    conn = sqlite3.connect(path)
+    for statement in BASE_SCHEMA:
+        conn.execute(statement)
+    conn.executemany(
+        '''INSERT INTO user_activities (user_id, activity_type, title, details, created_at)
+           VALUES (?, ?, ?, ?, ?)''',
+        [
+            (1, 'disease', 'Leaf scan', json.dumps({'disease_name': 'Tomato___Late_blight'}), '2025-03-01T10:00:00'),
+            (1, 'disease', 'Leaf scan', json.dumps({'disease_name': 'Tomato___Late_blight'}), '2025-03-01T11:00:00'),
+            (2, 'crop', 'Crop advice', json.dumps({'recommended_crop': {'name': 'Rice'}}), '2025-03-02T09:00:00'),
+        ]
+    )
+    conn.commit()
+    return conn
+
+def test_missing_rollups_are_built_from_existing_activities(tmp_path):
+    conn = activities_db(str(tmp_path / 'activities.db'))
+    assert ensure_rollups(conn)
+    assert conn.execute(
+        'SELECT user_id, activity_type, day, count FROM activity_daily_rollups ORDER BY user_id'
+    ).fetchall() == [(1, 'disease', '2025-03-01', 2), (2, 'crop', '2025-03-02', 1)]
+    assert conn.execute(
+        'SELECT user_id, label, count FROM activity_label_rollups ORDER BY user_id'
+    ).fetchall() == [(1, 'Tomato___Late_blight', 2), (2, 'rice', 1)]
+
+def test_existing_rollups_are_left_alone(tmp_path):
+    conn = activities_db(str(tmp_path / 'activities.db'))
+    ensure_rollups(conn)
+    apply_activity(conn.cursor(), 3, 'fertilizer', {'crop_name': 'Maize'}, '2025-03-03T08:00:00')
+    conn.commit()
+    assert not ensure_rollups(conn)
+    assert conn.execute('SELECT COUNT(*) FROM activity_daily_rollups').fetchone()[0] == 3
+
+def test_activity_writes_work_on_an_unmigrated_database(tmp_path, monkeypatch):
+    path = str(tmp_path / 'activities.db')
+    activities_db(path).close()
+    monkeypatch.setenv('DATABASE_MODE', 'local')
+    monkeypatch.setenv('LOCAL_DATABASE_PATH', path)
+    from activities import activities
+    monkeypatch.setattr(activities, '_activities_conn', None)
+    conn = activities.get_activities_db()
+    cur = conn.cursor()
+    apply_activity(cur, 1, 'disease', {'disease_name': 'Tomato___Late_blight'}, '2025-03-01T12:00:00')
+    conn.commit()
+    assert cur.execute(
+        "SELECT count FROM activity_daily_rollups WHERE user_id = 1 AND day = '2025-03-01'"
+    ).fetchone()[0] == 3
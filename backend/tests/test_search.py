@@ -0,0 +1,45 @@
+# activities/search.py: build_match_query() against the real FTS5 table (detail=column).
+
+import json
+import sqlite3
+
+import pytest
+
+from activities.search import SEARCH_SCHEMA, SEARCH_SQL, build_match_query
+from loadtest.environment import BASE_SCHEMA
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    for statement in BASE_SCHEMA + SEARCH_SCHEMA:
+        conn.execute(statement)
+    conn.executemany(
+        '''INSERT INTO user_activities (user_id, activity_type, title, result, details, created_at)
+           VALUES (?, ?, ?, ?, ?, ?)''',
+        [
+            (1, 'disease', 'Leaf scan', 'Tomato Late Blight',
+             json.dumps({'disease_name': 'Tomato___Late_blight'}), '2025-03-01T10:00:00'),
+            (1, 'crop', 'Crop advice', 'Rice', json.dumps({'recommended_crop': {'name': 'Rice'}}),
+             '2025-03-02T09:00:00'),
+            (2, 'disease', 'Leaf scan', 'Tomato Late Blight',
+             json.dumps({'disease_name': 'Tomato___Late_blight'}), '2025-03-01T10:00:00'),
+        ]
+    )
+    return conn
+
+def search(conn, text, user_id=1):
+    return [row[0] for row in conn.execute(SEARCH_SQL, (build_match_query(text, user_id), 10, 0, user_id))]
+
+@pytest.mark.parametrize('text', ['late', 'late blight', 'late_blight', 'Tomato___Late_blight', 'tomato___late_bl'])
+def test_underscore_disease_names_match(conn, text):
+    assert search(conn, text) == [1]
+
+def test_terms_are_single_tokens():
+    assert build_match_query('Tomato___Late_blight', 7) == \
+        'owner : "u7" AND {title result details} : ("Tomato" "Late" "blight"*)'
+
+def test_only_separators_is_not_a_query():
+    assert build_match_query('___ --', 1) is None
+
+def test_results_are_scoped_to_the_user(conn):
+    assert search(conn, 'rice', user_id=2) == []
@@ -0,0 +1,109 @@
+# Two-tier disease classification.
+#
+# The ResNet9 (utils/model.py) is much cheaper than the Hugging Face MobileNetV2 in
+# app.py and is right on most clear images. CascadeClassifier asks it first and only
+# sends the image on to the second model when the first one's top softmax probability
+# is below a threshold. Both models predict the 38 classes of utils/disease_classes.py;
+# the second one's labels are mapped onto those names (HF_LABEL_TO_CLASS), so answers
+# are reported as the same class names either way.
+#
+# The threshold trades accuracy for latency; calibrate_threshold() picks it offline
+# from labelled images (see benchmarks/cascade_calibration.py).
+
+import numpy as np
+
+from utils.metrics import Counter
+from utils.disease_classes import disease_classes, hf_class_names
+
+CASCADE_RESOLVED = Counter(
+    'farmalyze_disease_cascade_total',
+    'Disease predictions by the cascade stage that answered (fast or slow)',
+    ['stage']
+)
+
+class CascadeClassifier:
+    """
+    `fast` and `slow` take a PIL image and return (label, confidence). `fast` answers
+    when its confidence is at least `threshold`, otherwise `slow` does.
+    """
+
+    def __init__(self, fast, slow, threshold):
+        self.fast = fast
+        self.slow = slow
+        self.threshold = threshold
+
+    def predict(self, image):
+        """(label, confidence, stage) for a PIL image; stage is 'fast' or 'slow'."""
+        label, confidence = self.fast(image)
+        if confidence >= self.threshold:
+            CASCADE_RESOLVED.inc('fast')
+            return label, confidence, 'fast'
+        label, confidence = self.slow(image)
+        CASCADE_RESOLVED.inc('slow')
+        return label, confidence, 'slow'
+
+def _top_class(logits, classes):
+    import torch
+    confidence, index = torch.softmax(logits, dim=-1)[0].max(0)
+    return classes[index.item()], confidence.item()
+
+def resnet9_predict(model, image, classes=disease_classes):
+    """(label, confidence) of the ResNet9 for an RGB PIL image."""
+    from utils import resnet9_inference
+    return resnet9_inference.predict(model, image, classes)
+
+def hf_predict(processor, model, image):
+    """(label, confidence) of the Hugging Face disease model, the label a disease_classes name."""
+    import torch
+    with torch.inference_mode():
+        logits = model(**processor(images=image, return_tensors="pt")).logits
+    classes = getattr(model, 'plantvillage_classes', None) or hf_class_names(model.config.id2label)
+    return _top_class(logits, classes)
+
+def cascade_outcome(confidences, fast_correct, slow_correct, fast_seconds, slow_seconds, threshold):
+    """
+    What a cascade with `threshold` would have done on a labelled set, from per-image
+    arrays of fast-model confidence, correctness of each model and time of each model.
+    """
+    confidences = np.asarray(confidences, dtype=float)
+    fast_path = confidences >= threshold
+    correct = np.where(fast_path, fast_correct, slow_correct)
+    cascade_seconds = np.asarray(fast_seconds) + np.where(fast_path, 0.0, slow_seconds)
+    slow_mean = float(np.mean(slow_seconds))
+    return {
+        'threshold': threshold,
+        'images': len(confidences),
+        'accuracy': float(np.mean(correct)),
+        'fast_only_accuracy': float(np.mean(fast_correct)),
+        'slow_only_accuracy': float(np.mean(slow_correct)),
+        'fast_path_fraction': float(np.mean(fast_path)),
+        'slow_only_mean_ms': slow_mean * 1000,
+        'cascade_mean_ms': float(np.mean(cascade_seconds)) * 1000,
+        'mean_ms_saved': (slow_mean - float(np.mean(cascade_seconds))) * 1000,
+    }
+
+def calibrate_threshold(confidences, fast_correct, slow_correct, target_accuracy):
+    """
+    Lowest threshold (so the most traffic on the fast path) at which the cascade is at
+    least `target_accuracy` accurate on the given labelled images. Returns None if even
+    sending everything to the slow model misses the target.
+    """
+    confidences = np.asarray(confidences, dtype=float)
+    fast_correct = np.asarray(fast_correct, dtype=float)
+    slow_correct = np.asarray(slow_correct, dtype=float)
+    order = np.argsort(-confidences, kind='stable')
+    confidences, fast_correct, slow_correct = confidences[order], fast_correct[order], slow_correct[order]
+
+    # Accuracy when the k most confident images (k = 0..n) take the fast path
+    fast_hits = np.concatenate([[0.0], np.cumsum(fast_correct)])
+    slow_hits = slow_correct.sum() - np.concatenate([[0.0], np.cumsum(slow_correct)])
+    accuracy = (fast_hits + slow_hits) / len(confidences)
+
+    # A threshold can't split images with equal confidence, so only k at a change count
+    n = len(confidences)
+    for k in range(n, -1, -1):
+        at_boundary = k == 0 or k == n or confidences[k - 1] > confidences[k]
+        if at_boundary and accuracy[k] >= target_accuracy:
+            # Nothing on the fast path: a threshold above any softmax probability
+            return float(confidences[k - 1]) if k else float(np.nextafter(1.0, 2.0))
+    return None
@@ -0,0 +1,147 @@
+# Typical growing conditions per crop, derived from Data/Crop_recommendation.csv.
+#
+# For each of the 22 labels and each of the 7 model features, the [low, high] quantiles
+# of the training rows form that crop's typical range. build_ranges() computes them into
+# a (crops, features, 2) array indexed by class id (labels sorted, the same order as
+# the model's classes_); save_ranges() stores it in models/crop_ranges.npz together with
+# a hash of the CSV, so a stale table is rebuilt rather than used. The file is written
+# under a temporary name and renamed into place, so readers never see half of it; a
+# file that can't be read anyway is rebuilt too. gunicorn.conf.py loads the table in
+# the master, so workers find it built instead of all building it at once.
+#
+# Build step (from the backend directory; enhanced_train_model.py also runs it):
+#     python -m utils.crop_ranges [--low 0.05] [--high 0.95]
+
+import os
+import zipfile
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(BACKEND_DIR, 'Data', 'Crop_recommendation.csv')
+RANGES_PATH = os.path.join(BACKEND_DIR, 'models', 'crop_ranges.npz')
+
+# Column order of the crop model's input
+FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+FEATURE_NAMES = ['nitrogen', 'phosphorus', 'potassium', 'temperature', 'humidity', 'pH', 'rainfall']
+FEATURE_UNITS = [' kg/ha', ' kg/ha', ' kg/ha', '°C', '%', '', ' mm']
+
+def _file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def build_ranges(csv_path=DATA_PATH, low=0.05, high=0.95):
+    """(labels, ranges): sorted crop labels and a float32 (crops, 7, 2) array of [low, high] quantiles."""
+    df = pd.read_csv(csv_path)
+    grouped = df.groupby('label')[FEATURES]
+    lows, highs = grouped.quantile(low), grouped.quantile(high)
+    labels = lows.index.to_numpy(dtype=str)
+    ranges = np.stack([lows.to_numpy(), highs.to_numpy()], axis=-1).astype(np.float32)
+    return labels, ranges
+
+def save_ranges(path=RANGES_PATH, csv_path=DATA_PATH, low=0.05, high=0.95):
+    labels, ranges = build_ranges(csv_path, low, high)
+    # Same directory, so the rename is atomic; a file object so savez keeps the name
+    tmp = os.path.join(os.path.dirname(os.path.abspath(path)), f'.{os.path.basename(path)}.{os.getpid()}.tmp')
+    try:
+        with open(tmp, 'wb') as f:
+            np.savez(f, labels=labels, ranges=ranges, quantiles=np.array([low, high]),
+                     source_sha256=np.array(_file_sha256(csv_path)))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return labels, ranges
+
+class CropRanges:
+    """The per-crop range table and a vectorized check of inputs against it."""
+
+    def __init__(self, labels, ranges):
+        self.labels = np.asarray(labels, dtype=str)
+        self.ranges = np.asarray(ranges, dtype=np.float32)
+        self._ids = {label: i for i, label in enumerate(self.labels)}
+
+    @classmethod
+    def load(cls, path=RANGES_PATH, csv_path=DATA_PATH):
+        """Load the table, rebuilding it first if it is missing, unreadable or older than the CSV."""
+        try:
+            with np.load(path) as table:
+                if str(table['source_sha256']) == _file_sha256(csv_path):
+                    return cls(table['labels'], table['ranges'])
+            print(f"{path} was built from a different {os.path.basename(csv_path)}; rebuilding")
+        except FileNotFoundError:
+            print(f"{path} not found; building it")
+        except (zipfile.BadZipFile, ValueError, KeyError, EOFError, OSError) as e:
+            # Truncated or corrupt file, or one without the expected arrays
+            print(f"Could not read {path} ({e!r}); rebuilding")
+        try:
+            return cls(*save_ranges(path, csv_path))
+        except OSError as e:
+            print(f"Could not save {path} ({e}); using an in-memory table")
+            return cls(*build_ranges(csv_path))
+
+    def class_ids(self, crops):
+        """Ids in this table of crop names (e.g. a model's classes_), in the same shape."""
+        crops = np.asarray(crops, dtype=str)
+        return np.array([self._ids[crop] for crop in crops.ravel()], dtype=np.intp).reshape(crops.shape)
+
+    def deviations(self, X, class_ids):
+        """
+        Where each input falls relative to the ranges of its candidate crops.
+        X: (n, 7) inputs; class_ids: (n, k) crop ids per input, or (k,) for all of them.
+        Returns an int8 (n, k, 7) array: -1 below the crop's range, 1 above, 0 inside.
+        """
+        X = np.asarray(X, dtype=np.float32).reshape(-1, 1, len(FEATURES))
+        bounds = self.ranges[np.asarray(class_ids)]
+        if bounds.ndim == 3:
+            bounds = bounds[np.newaxis]
+        return (X > bounds[..., 1]).astype(np.int8) - (X < bounds[..., 0])
+
+    def out_of_range(self, values, crops):
+        """
+        For one input of 7 values, a list per crop in `crops` of the features outside
+        that crop's range: [{feature, value, low, high, direction}, ...].
+        """
+        values = np.asarray(values, dtype=float)
+        ids = self.class_ids(crops)
+        deviation = self.deviations(values, ids)[0]
+        return [
+            [
+                {
+                    'feature': FEATURE_NAMES[f],
+                    'value': float(values[f]),
+                    'low': round(float(self.ranges[crop_id, f, 0]), 2),
+                    'high': round(float(self.ranges[crop_id, f, 1]), 2),
+                    'direction': 'below' if deviation[j, f] < 0 else 'above',
+                }
+                for f in np.flatnonzero(deviation[j])
+            ]
+            for j, crop_id in enumerate(ids)
+        ]
+
+_crop_ranges = None
+
+def get_crop_ranges():
+    """The table from RANGES_PATH, loaded once per process."""
+    global _crop_ranges
+    if _crop_ranges is None:
+        _crop_ranges = CropRanges.load()
+    return _crop_ranges
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the per-crop typical range table')
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--output', default=RANGES_PATH)
+    parser.add_argument('--low', type=float, default=0.05, help='lower quantile')
+    parser.add_argument('--high', type=float, default=0.95, help='upper quantile')
+    args = parser.parse_args()
+
+    labels, ranges = save_ranges(args.output, args.data, args.low, args.high)
+    print(f"Saved {ranges.shape[0]} crops x {ranges.shape[1]} features ranges to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# Shared database connection factory for the auth, oauth and activities blueprints.
+#
+# DATABASE_MODE selects how we talk to Turso:
+#   remote  (default) every query goes over the network to TURSO_DATABASE_URL
+#   replica embedded replica: a local file synced from the primary. Reads are served
+#           locally, writes are forwarded to the primary.
+#   local   plain SQLite file at LOCAL_DATABASE_PATH (development / load testing)
+#
+# Connections are wrapped so every execute/commit is counted per thread; the request
+# metrics hooks read the count to report DB round trips per request.
+
+import os
+import time
+import sqlite3
+import threading
+
+DEFAULT_REPLICA_PATH = 'farmalyze-replica.db'
+DEFAULT_LOCAL_PATH = 'farmalyze-local.db'
+
+_replica = None
+_replica_lock = threading.Lock()
+_round_trips = threading.local()
+
+def reset_db_round_trips():
+    _round_trips.count = 0
+
+def db_round_trips():
+    """Statements and commits issued by the current thread since the last reset."""
+    return getattr(_round_trips, 'count', 0)
+
+def _count_round_trip():
+    _round_trips.count = getattr(_round_trips, 'count', 0) + 1
+
+class CountingCursor:
+    __slots__ = ('_cursor',)
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args):
+        _count_round_trip()
+        self._cursor.execute(*args)
+        return self
+
+    def executemany(self, *args):
+        _count_round_trip()
+        self._cursor.executemany(*args)
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class CountingConnection:
+    """Counts statements and commits; everything else goes to the wrapped connection."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return CountingCursor(self._conn.cursor())
+
+    def execute(self, *args):
+        _count_round_trip()
+        return self._conn.execute(*args)
+
+    def commit(self):
+        _count_round_trip()
+        return self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+class ProcessLocalSQLite:
+    """
+    A SQLite file opened lazily, once per process, for stores shared by the workers of
+    a host (OAuth states, rate limit buckets). Such stores are created at import, which
+    with gunicorn's preload_app happens in the master; a connection inherited across
+    fork is not safe to use in SQLite, so none is opened until a process needs one and
+    a forked child drops whatever it inherited. `setup` statements run on every open.
+    Use connection() with `lock` held.
+    """
+
+    def __init__(self, path, setup=()):
+        self.path = path
+        self.setup = tuple(setup)
+        self.lock = threading.Lock()
+        self._conn = None
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Another thread may have held the lock when the parent forked
+        self.lock = threading.Lock()
+        self._conn = None
+
+    def connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            for statement in self.setup:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+def get_database_mode():
+    return os.getenv('DATABASE_MODE', 'remote').strip().lower()
+
+class ReplicaConnection:
+    """
+    Wraps a libsql embedded-replica connection.
+    libsql pulls changes from the primary every TURSO_SYNC_INTERVAL seconds on its
+    own; on top of that we sync right after each commit so a request that just
+    wrote something reads it back from the local file (read-your-writes).
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._lock = threading.Lock()
+        self.last_sync = None
+
+    def sync(self):
+        with self._lock:
+            self._conn.sync()
+            self.last_sync = time.time()
+
+    def commit(self):
+        self._conn.commit()
+        self.sync()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def connect_database():
+    """Open a connection according to DATABASE_MODE."""
+    return CountingConnection(_connect(get_database_mode()))
+
+def _connect(mode):
+    global _replica
+
+    if mode == 'local':
+        path = os.getenv('LOCAL_DATABASE_PATH', DEFAULT_LOCAL_PATH)
+        # Connections are shared between request threads, like the libsql ones
+        return sqlite3.connect(path, check_same_thread=False)
+
+    turso_url = os.getenv("TURSO_DATABASE_URL")
+    turso_auth_token = os.getenv("TURSO_AUTH_TOKEN")
+
+    if not turso_url or not turso_auth_token:
+        raise RuntimeError("TURSO_DATABASE_URL and TURSO_AUTH_TOKEN must be set")
+
+    import libsql
+
+    if mode == 'replica':
+        # All blueprints share one replica so a single connection owns the local file
+        with _replica_lock:
+            if _replica is None:
+                replica_path = os.getenv('TURSO_REPLICA_PATH', DEFAULT_REPLICA_PATH)
+                sync_interval = float(os.getenv('TURSO_SYNC_INTERVAL', 60))
+                conn = libsql.connect(
+                    database=replica_path,
+                    sync_url=turso_url,
+                    auth_token=turso_auth_token,
+                    sync_interval=sync_interval
+                )
+                _replica = ReplicaConnection(conn)
+                # Initial sync so the first reads don't see an empty file
+                _replica.sync()
+        return _replica
+
+    if mode != 'remote':
+        raise RuntimeError(f"Unknown DATABASE_MODE '{mode}' (expected remote, replica or local)")
+
+    # Remote-only connection to Turso (no local file)
+    return libsql.connect(database=turso_url, auth_token=turso_auth_token)
@@ -0,0 +1,112 @@
+# The 38 PlantVillage classes, in the output order of the ResNet9 (utils/model.py).
+# The Hugging Face MobileNetV2 in app.py is mapped onto them by HF_LABEL_TO_CLASS below.
+
+disease_classes = ['Apple___Apple_scab',
+                   'Apple___Black_rot',
+                   'Apple___Cedar_apple_rust',
+                   'Apple___healthy',
+                   'Blueberry___healthy',
+                   'Cherry_(including_sour)___Powdery_mildew',
+                   'Cherry_(including_sour)___healthy',
+                   'Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot',
+                   'Corn_(maize)___Common_rust_',
+                   'Corn_(maize)___Northern_Leaf_Blight',
+                   'Corn_(maize)___healthy',
+                   'Grape___Black_rot',
+                   'Grape___Esca_(Black_Measles)',
+                   'Grape___Leaf_blight_(Isariopsis_Leaf_Spot)',
+                   'Grape___healthy',
+                   'Orange___Haunglongbing_(Citrus_greening)',
+                   'Peach___Bacterial_spot',
+                   'Peach___healthy',
+                   'Pepper,_bell___Bacterial_spot',
+                   'Pepper,_bell___healthy',
+                   'Potato___Early_blight',
+                   'Potato___Late_blight',
+                   'Potato___healthy',
+                   'Raspberry___healthy',
+                   'Soybean___healthy',
+                   'Squash___Powdery_mildew',
+                   'Strawberry___Leaf_scorch',
+                   'Strawberry___healthy',
+                   'Tomato___Bacterial_spot',
+                   'Tomato___Early_blight',
+                   'Tomato___Late_blight',
+                   'Tomato___Leaf_Mold',
+                   'Tomato___Septoria_leaf_spot',
+                   'Tomato___Spider_mites Two-spotted_spider_mite',
+                   'Tomato___Target_Spot',
+                   'Tomato___Tomato_Yellow_Leaf_Curl_Virus',
+                   'Tomato___Tomato_mosaic_virus',
+                   'Tomato___healthy']
+
+# id2label of the Hugging Face model (linkanjarad/mobilenet_v2_1.0_224-plant-disease-identification)
+# names the same 38 classes in its own words. Its logits are mapped onto the names above
+# through this table, never by position; hf_class_names() checks it against the config.
+HF_LABEL_TO_CLASS = {
+    'Apple Scab': 'Apple___Apple_scab',
+    'Apple with Black Rot': 'Apple___Black_rot',
+    'Cedar Apple Rust': 'Apple___Cedar_apple_rust',
+    'Healthy Apple': 'Apple___healthy',
+    'Healthy Blueberry Plant': 'Blueberry___healthy',
+    'Cherry with Powdery Mildew': 'Cherry_(including_sour)___Powdery_mildew',
+    'Healthy Cherry Plant': 'Cherry_(including_sour)___healthy',
+    'Corn (Maize) with Cercospora and Gray Leaf Spot': 'Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot',
+    'Corn (Maize) with Common Rust': 'Corn_(maize)___Common_rust_',
+    'Corn (Maize) with Northern Leaf Blight': 'Corn_(maize)___Northern_Leaf_Blight',
+    'Healthy Corn (Maize) Plant': 'Corn_(maize)___healthy',
+    'Grape with Black Rot': 'Grape___Black_rot',
+    'Grape with Esca (Black Measles)': 'Grape___Esca_(Black_Measles)',
+    'Grape with Isariopsis Leaf Spot': 'Grape___Leaf_blight_(Isariopsis_Leaf_Spot)',
+    'Healthy Grape Plant': 'Grape___healthy',
+    'Orange with Citrus Greening': 'Orange___Haunglongbing_(Citrus_greening)',
+    'Peach with Bacterial Spot': 'Peach___Bacterial_spot',
+    'Healthy Peach Plant': 'Peach___healthy',
+    'Bell Pepper with Bacterial Spot': 'Pepper,_bell___Bacterial_spot',
+    'Healthy Bell Pepper Plant': 'Pepper,_bell___healthy',
+    'Potato with Early Blight': 'Potato___Early_blight',
+    'Potato with Late Blight': 'Potato___Late_blight',
+    'Healthy Potato Plant': 'Potato___healthy',
+    'Healthy Raspberry Plant': 'Raspberry___healthy',
+    'Healthy Soybean Plant': 'Soybean___healthy',
+    'Squash with Powdery Mildew': 'Squash___Powdery_mildew',
+    'Strawberry with Leaf Scorch': 'Strawberry___Leaf_scorch',
+    'Healthy Strawberry Plant': 'Strawberry___healthy',
+    'Tomato with Bacterial Spot': 'Tomato___Bacterial_spot',
+    'Tomato with Early Blight': 'Tomato___Early_blight',
+    'Tomato with Late Blight': 'Tomato___Late_blight',
+    'Tomato with Leaf Mold': 'Tomato___Leaf_Mold',
+    'Tomato with Septoria Leaf Spot': 'Tomato___Septoria_leaf_spot',
+    'Tomato with Spider Mites or Two-spotted Spider Mite': 'Tomato___Spider_mites Two-spotted_spider_mite',
+    'Tomato with Target Spot': 'Tomato___Target_Spot',
+    'Tomato Yellow Leaf Curl Virus': 'Tomato___Tomato_Yellow_Leaf_Curl_Virus',
+    'Tomato Mosaic Virus': 'Tomato___Tomato_mosaic_virus',
+    'Healthy Tomato Plant': 'Tomato___healthy',
+}
+
+def _normalize(label):
+    return ' '.join(str(label).lower().split())
+
+_HF_LOOKUP = {_normalize(label): name for label, name in HF_LABEL_TO_CLASS.items()}
+
+def hf_class_names(id2label):
+    """
+    disease_classes names indexed by the Hugging Face model's logit index, from its
+    config.id2label. Raises RuntimeError unless every index maps to a distinct class
+    and all 38 classes are covered.
+    """
+    if len(id2label) != len(disease_classes):
+        raise RuntimeError(f"Disease model has {len(id2label)} labels, expected {len(disease_classes)}")
+    names = []
+    for index in range(len(id2label)):
+        label = id2label.get(index, id2label.get(str(index)))
+        if label is None:
+            raise RuntimeError(f"Disease model has no label for index {index}")
+        name = _HF_LOOKUP.get(_normalize(label))
+        if name is None:
+            raise RuntimeError(f"Disease model label '{label}' is not in HF_LABEL_TO_CLASS")
+        names.append(name)
+    missing = set(disease_classes) - set(names)
+    if missing:
+        raise RuntimeError(f"Disease model labels do not cover: {sorted(missing)}")
+    return names
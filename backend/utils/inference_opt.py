@@ -0,0 +1,76 @@
+# Inference-time rewrites of conv nets (ResNet9 in utils/model.py) for CPU serving.
+#
+# In eval mode a BatchNorm2d is a fixed per-channel scale and shift, so it can be folded
+# into the weights and bias of the Conv2d before it, which saves a full pass over every
+# activation map. optimize_for_inference() does that, stores the conv weights in
+# channels_last (the layout oneDNN convolutions prefer on CPU), optionally freezes a
+# traced TorchScript graph, and checks the result against the original model.
+
+import copy
+
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+def fuse_conv_bn(model):
+    """Copy of `model` in eval mode with every Conv2d -> BatchNorm2d pair folded into one Conv2d."""
+    fused = copy.deepcopy(model).eval()
+    _fuse_children(fused)
+    return fused
+
+def _fuse_children(module):
+    previous_name, previous = None, None
+    for name, child in list(module.named_children()):
+        # Only in a Sequential does registration order match execution order
+        if isinstance(module, nn.Sequential) and isinstance(child, nn.BatchNorm2d) and isinstance(previous, nn.Conv2d):
+            setattr(module, previous_name, fuse_conv_bn_eval(previous, child))
+            setattr(module, name, nn.Identity())
+        else:
+            _fuse_children(child)
+        previous_name, previous = name, child
+
+def count_batchnorms(model):
+    return sum(isinstance(m, nn.BatchNorm2d) for m in model.modules())
+
+class ChannelsLast(nn.Module):
+    """Runs `model` with channels_last weights, converting each input to match."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model.to(memory_format=torch.channels_last)
+
+    def forward(self, x):
+        return self.model(x.contiguous(memory_format=torch.channels_last))
+
+def example_input(resolution=256, batch=1, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    return torch.rand(batch, 3, resolution, resolution, generator=generator)
+
+def check_equivalence(reference, optimized, inputs, rtol=1e-3, atol=1e-4):
+    """Raise if `optimized` doesn't reproduce `reference` on `inputs`; returns the max abs difference."""
+    with torch.no_grad():
+        expected, actual = reference(inputs), optimized(inputs)
+    max_diff = (expected - actual).abs().max().item()
+    if not torch.allclose(expected, actual, rtol=rtol, atol=atol):
+        raise RuntimeError(f"Optimized model differs from the original (max abs difference {max_diff:.3g})")
+    return max_diff
+
+def optimize_for_inference(model, inputs=None, fuse=True, channels_last=True, jit=False):
+    """
+    Optimized copy of `model` for eval-only CPU inference; `model` itself is left as is.
+    `inputs` (default: one random 3x256x256 image) is used to trace the graph when `jit`
+    is set and to check the copy still gives the same outputs.
+    """
+    reference = model.eval()
+    if inputs is None:
+        inputs = example_input()
+
+    optimized = fuse_conv_bn(model) if fuse else copy.deepcopy(model).eval()
+    if channels_last:
+        optimized = ChannelsLast(optimized)
+    if jit:
+        with torch.no_grad():
+            optimized = torch.jit.freeze(torch.jit.trace(optimized.eval(), inputs))
+
+    check_equivalence(reference, optimized, inputs)
+    return optimized
@@ -0,0 +1,79 @@
+# Lazily loaded models shared by the request threads of a worker.
+#
+# Loading happens on first use (or in a warm-up thread, see MODEL_WARMUP in app.py),
+# never at import time, so workers that only serve auth or activity routes don't pay
+# for transformers, torch weights or the crop forest. Each model is loaded at most
+# once per process; concurrent first requests wait for the same load.
+
+import time
+import threading
+
+_models = {}
+
+class LazyModel:
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._value = None
+        self._lock = threading.Lock()
+        self.state = 'not_loaded'
+        self.load_seconds = None
+        self.error = None
+
+    def get(self):
+        """Return the loaded model, loading it first if needed."""
+        value = self._value
+        if value is not None:
+            return value
+        with self._lock:
+            if self._value is None:
+                self.state = 'loading'
+                start = time.perf_counter()
+                try:
+                    value = self._loader()
+                except Exception as e:
+                    # Stay retryable: the next get() tries again
+                    self.state = 'failed'
+                    self.error = str(e)
+                    raise
+                self.load_seconds = time.perf_counter() - start
+                self.error = None
+                self.state = 'loaded'
+                self._value = value
+        return self._value
+
+    @property
+    def loaded(self):
+        return self._value is not None
+
+    def status(self):
+        return {
+            'state': self.state,
+            'load_seconds': round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            'error': self.error,
+        }
+
+def register_model(name, loader):
+    """Register a loader under `name` and return its LazyModel."""
+    model = LazyModel(name, loader)
+    _models[name] = model
+    return model
+
+def load_all():
+    """Load every registered model in this thread; failures are recorded, not raised."""
+    for model in list(_models.values()):
+        try:
+            model.get()
+        except Exception as e:
+            print(f"Loading model '{model.name}' failed: {e}")
+
+def warm_up_in_background():
+    """Start loading every registered model in a daemon thread."""
+    thread = threading.Thread(target=load_all, name='model-warmup', daemon=True)
+    thread.start()
+    return thread
+
+def models_status():
+    """(all loaded, {name: status}) for the readiness endpoint."""
+    statuses = {name: model.status() for name, model in _models.items()}
+    return all(model.loaded for model in _models.values()), statuses
@@ -0,0 +1,221 @@
+# Opt-in per-request profiling.
+#
+# Off by default: unless PROFILING_ENABLED is set, init_profiling() installs nothing,
+# so there is no per-request cost at all. When enabled, a request is profiled if
+#   - it sends `X-Profile: <PROFILING_TOKEN>` (header trigger; disabled without a token), or
+#   - it is picked by PROFILING_SAMPLE_RATE (0.0 - 1.0).
+#
+# PROFILER=sampling (default) samples the request thread's stack every
+# PROFILING_INTERVAL_MS and stores folded stacks ("a;b;c count" lines), which
+# flamegraph.pl, speedscope and inferno read directly. PROFILER=cprofile stores a
+# pstats dump instead (open with snakeviz or flameprof) at a much higher overhead;
+# only one request per process is profiled with it at a time, and on Python 3.12+ the
+# profile includes the other threads, so use it with one thread per worker.
+#
+# The last PROFILING_BUFFER_SIZE profiles are kept in memory per worker process and
+# served by /api/profiles to the user ids listed in PROFILING_ALLOWED_USERS.
+
+import os
+import sys
+import time
+import random
+import marshal
+import cProfile
+import itertools
+import threading
+from collections import Counter, deque
+from datetime import datetime
+from flask import Blueprint, Response, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PROFILER = os.getenv('PROFILER', 'sampling').strip().lower()
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILING_INTERVAL_MS = float(os.getenv('PROFILING_INTERVAL_MS', 5))
+PROFILING_BUFFER_SIZE = int(os.getenv('PROFILING_BUFFER_SIZE', 50))
+# Comma-separated path prefixes to profile; empty means every path
+PROFILING_PATHS = tuple(p.strip() for p in os.getenv('PROFILING_PATHS', '').split(',') if p.strip())
+PROFILING_ALLOWED_USERS = {u.strip() for u in os.getenv('PROFILING_ALLOWED_USERS', '').split(',') if u.strip()}
+
+profiling_bp = Blueprint('profiling', __name__)
+
+_profiles = deque(maxlen=PROFILING_BUFFER_SIZE)
+_profiles_lock = threading.Lock()
+_ids = itertools.count(1)
+# Held while a cProfile profile is running in this process
+_cprofile_lock = threading.Lock()
+
+class SamplingProfiler:
+    """Samples one thread's Python stack from a helper thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def output(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+class _ProfiledResponse:
+    """Response iterable that calls `finish` once, when the server closes it."""
+
+    def __init__(self, iterable, finish):
+        self._iterable = iterable
+        self._finish = finish
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            finish, self._finish = self._finish, None
+            if finish is not None:
+                finish()
+
+class ProfilingMiddleware:
+    """WSGI middleware deciding per request whether to profile it."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def _should_profile(self, environ):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith('/api/profiles'):
+            return False
+        if PROFILING_PATHS and not path.startswith(PROFILING_PATHS):
+            return False
+        if PROFILING_TOKEN and environ.get('HTTP_X_PROFILE') == PROFILING_TOKEN:
+            return True
+        return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+    def __call__(self, environ, start_response):
+        if not self._should_profile(environ):
+            return self.wsgi_app(environ, start_response)
+
+        status = []
+
+        def capture_status(status_line, headers, exc_info=None):
+            status.append(status_line.split(' ', 1)[0])
+            return start_response(status_line, headers, exc_info)
+
+        started_at = datetime.now().isoformat()
+        start = time.perf_counter()
+        if PROFILER == 'cprofile':
+            # Only one cProfile can be active per process (on Python 3.12 it runs on the
+            # process-wide sys.monitoring), so requests arriving meanwhile go unprofiled
+            if not _cprofile_lock.acquire(blocking=False):
+                return self.wsgi_app(environ, start_response)
+            profiler = cProfile.Profile()
+            begin, release = profiler.enable, _cprofile_lock.release
+
+            def finish():
+                try:
+                    profiler.disable()
+                    profiler.create_stats()
+                    self._store(environ, status, started_at, start, 'cprofile', marshal.dumps(profiler.stats))
+                finally:
+                    _cprofile_lock.release()
+        else:
+            profiler = SamplingProfiler(threading.get_ident(), PROFILING_INTERVAL_MS / 1000.0)
+            begin, release = profiler.start, lambda: None
+
+            def finish():
+                profiler.stop()
+                self._store(environ, status, started_at, start, 'sampling', profiler.output())
+
+        try:
+            begin()
+        except ValueError as e:
+            # Some other tool (a debugger, coverage) holds the profiling hook
+            release()
+            print(f"Could not start the profiler: {e}")
+            return self.wsgi_app(environ, start_response)
+
+        try:
+            result = self.wsgi_app(environ, capture_status)
+        except BaseException:
+            finish()
+            raise
+        # The body may be generated while the server iterates it (streamed responses),
+        # so the profile ends when the server closes the response, not here
+        return _ProfiledResponse(result, finish)
+
+    def _store(self, environ, status, started_at, start, kind, data):
+        with _profiles_lock:
+            _profiles.append({
+                'id': next(_ids),
+                'method': environ.get('REQUEST_METHOD'),
+                'path': environ.get('PATH_INFO'),
+                'status': int(status[0]) if status else None,
+                'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+                'started_at': started_at,
+                'profiler': kind,
+                'data': data,
+            })
+
+def _allowed():
+    return get_jwt_identity() in PROFILING_ALLOWED_USERS
+
+@profiling_bp.route('/api/profiles', methods=['GET'])
+@jwt_required()
+def list_profiles():
+    if not _allowed():
+        return jsonify({'success': False, 'error': 'Not allowed'}), 403
+    with _profiles_lock:
+        profiles = [{k: v for k, v in p.items() if k != 'data'} for p in reversed(_profiles)]
+    return jsonify({'success': True, 'profiles': profiles}), 200
+
+@profiling_bp.route('/api/profiles/<int:profile_id>', methods=['GET'])
+@jwt_required()
+def download_profile(profile_id):
+    if not _allowed():
+        return jsonify({'success': False, 'error': 'Not allowed'}), 403
+    with _profiles_lock:
+        profile = next((p for p in _profiles if p['id'] == profile_id), None)
+    if profile is None:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+
+    if profile['profiler'] == 'cprofile':
+        body, mimetype, ext = profile['data'], 'application/octet-stream', 'prof'
+    else:
+        body, mimetype, ext = profile['data'], 'text/plain', 'folded'
+    response = Response(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=profile-{profile_id}.{ext}'
+    return response
+
+def init_profiling(app):
+    """Install the profiling middleware and routes if PROFILING_ENABLED is set."""
+    if not PROFILING_ENABLED:
+        return
+    if PROFILER not in ('sampling', 'cprofile'):
+        raise RuntimeError(f"Unknown PROFILER '{PROFILER}' (expected sampling or cprofile)")
+    if PROFILER == 'cprofile' and sys.version_info >= (3, 12):
+        print("cProfile on Python 3.12+ records every thread of the process; "
+              "run with GUNICORN_THREADS=1 for per-request profiles")
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app)
+    app.register_blueprint(profiling_bp)
+    print(f"Request profiling enabled ({PROFILER}, sample rate {PROFILING_SAMPLE_RATE})")
@@ -0,0 +1,195 @@
+# Token-bucket rate limiting for Flask routes.
+#
+#   @auth_bp.route('/api/auth/login', methods=['POST'])
+#   @rate_limit(RateLimit('login-ip', '10/60', client_ip), RateLimit('login-email', '5/300', json_field('email')))
+#   def login(): ...
+#
+# A bucket holds `capacity` tokens and refills at capacity/period tokens per second.
+# Refill is computed lazily from the time of the last request, so idle buckets cost
+# nothing and a bucket that would be full again is simply forgotten.
+#
+# RATE_LIMIT_BACKEND=memory (default) keeps buckets per worker process, so with N
+# gunicorn workers a client may get up to N times the limit. RATE_LIMIT_BACKEND=sqlite
+# shares the buckets between all workers on a host through a local SQLite file.
+
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, jsonify
+from utils.db import ProcessLocalSQLite
+from utils.metrics import Counter, Gauge
+
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+# Number of reverse proxies in front of the app (Render adds one) whose X-Forwarded-For we trust
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', 0))
+# Memory backend: most buckets kept; beyond it the least recently used one is dropped
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv('RATE_LIMIT_MAX_BUCKETS', 100000))
+
+RATE_LIMITED = Counter('farmalyze_rate_limited_total', 'Requests rejected by a rate limit', ['limit'])
+
+def parse_rate(rate):
+    """'10/60' -> (capacity 10, refill 10/60 tokens per second)."""
+    capacity, period = rate.split('/')
+    capacity, period = float(capacity), float(period)
+    if capacity <= 0 or period <= 0:
+        raise ValueError(f"Invalid rate '{rate}'")
+    return capacity, capacity / period
+
+def _refill(tokens, updated, now, capacity, refill_rate):
+    return min(capacity, tokens + (now - updated) * refill_rate)
+
+class MemoryBuckets:
+    """
+    key -> (tokens, last update) tuples, in least recently used order. At most
+    `max_buckets` are kept: each take() moves its key to the end and, when over the
+    cap, drops the one at the front, so memory stays bounded and every call is O(1)
+    however many keys a client invents. The dropped bucket is the one idle longest,
+    normally long since refilled; under a flood of fresh keys it may not be, and that
+    key simply starts over with a full bucket.
+    """
+
+    def __init__(self, max_buckets=RATE_LIMIT_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate, cost=1.0):
+        """Take `cost` tokens. Returns (allowed, seconds until enough tokens are available)."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                # Rejected keys count as used too, so a drained bucket under attack stays
+                self._buckets.move_to_end(key)
+            tokens = capacity if bucket is None else _refill(bucket[0], bucket[1], now, capacity, refill_rate)
+            if tokens < cost:
+                return False, (cost - tokens) / refill_rate
+            self._buckets[key] = (tokens - cost, now)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            return True, 0.0
+
+    def __len__(self):
+        return len(self._buckets)
+
+class SQLiteBuckets:
+    """
+    Buckets in a SQLite file shared by every worker on the host. Uses wall-clock
+    time because the file outlives the processes (and the machine's uptime).
+    """
+
+    SWEEP_EVERY = 1000
+
+    SCHEMA = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        '''CREATE TABLE IF NOT EXISTS rate_buckets (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated REAL NOT NULL,
+            refill_time REAL NOT NULL
+        ) WITHOUT ROWID''',
+    )
+
+    def __init__(self, path):
+        # Opened on first use in each worker, not here at import (see ProcessLocalSQLite)
+        self._db = ProcessLocalSQLite(path, self.SCHEMA)
+        self._calls = 0
+
+    def take(self, key, capacity, refill_rate, cost=1.0):
+        """Take `cost` tokens. Returns (allowed, seconds until enough tokens are available)."""
+        now = time.time()
+        with self._db.lock:
+            cur = self._db.connection().cursor()
+            cur.execute('BEGIN IMMEDIATE')
+            try:
+                cur.execute('SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,))
+                row = cur.fetchone()
+                tokens = capacity if row is None else _refill(row[0], row[1], now, capacity, refill_rate)
+                allowed = tokens >= cost
+                if allowed:
+                    cur.execute(
+                        '''INSERT INTO rate_buckets (key, tokens, updated, refill_time) VALUES (?, ?, ?, ?)
+                           ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated,
+                                                          refill_time = excluded.refill_time''',
+                        (key, tokens - cost, now, capacity / refill_rate)
+                    )
+                self._calls += 1
+                if self._calls % self.SWEEP_EVERY == 0:
+                    cur.execute('DELETE FROM rate_buckets WHERE updated + refill_time < ?', (now,))
+                cur.execute('COMMIT')
+            except Exception:
+                cur.execute('ROLLBACK')
+                raise
+        if not allowed:
+            return False, (cost - tokens) / refill_rate
+        return True, 0.0
+
+    def __len__(self):
+        with self._db.lock:
+            return self._db.connection().execute('SELECT COUNT(*) FROM rate_buckets').fetchone()[0]
+
+def _create_backend():
+    backend = os.getenv('RATE_LIMIT_BACKEND', 'memory').strip().lower()
+    if backend == 'sqlite':
+        return SQLiteBuckets(os.getenv('RATE_LIMIT_DB_PATH', 'farmalyze-rate-limits.db'))
+    if backend != 'memory':
+        raise RuntimeError(f"Unknown RATE_LIMIT_BACKEND '{backend}' (expected memory or sqlite)")
+    return MemoryBuckets()
+
+_buckets = _create_backend()
+
+Gauge('farmalyze_rate_limit_buckets', 'Rate limit buckets currently tracked', callback=lambda: len(_buckets))
+
+# Key functions: return the bucket key for the current request, or None to skip the limit
+
+def client_ip():
+    """Client address, honouring X-Forwarded-For only for RATE_LIMIT_TRUSTED_PROXIES hops."""
+    if RATE_LIMIT_TRUSTED_PROXIES:
+        forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+        if len(forwarded) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return forwarded[-RATE_LIMIT_TRUSTED_PROXIES]
+    return request.remote_addr
+
+def json_field(name):
+    """Key on a field of the JSON body, e.g. the email of a login attempt."""
+    def key():
+        data = request.get_json(silent=True)
+        value = data.get(name) if isinstance(data, dict) else None
+        return str(value).strip().lower() if value else None
+    return key
+
+class RateLimit:
+    def __init__(self, name, rate, key_func, cost=1.0):
+        self.name = name
+        self.capacity, self.refill_rate = parse_rate(rate)
+        self.key_func = key_func
+        self.cost = cost
+
+def rate_limit(*limits):
+    """
+    Reject the request with 429 and Retry-After when any of the limits is exhausted.
+    Limits are checked in order and checking stops at the first one that rejects,
+    so put the cheapest-to-abuse key (usually the IP) first.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if RATE_LIMIT_ENABLED:
+                for limit in limits:
+                    key = limit.key_func()
+                    if key is None:
+                        continue
+                    allowed, retry_after = _buckets.take(f'{limit.name}:{key}', limit.capacity,
+                                                         limit.refill_rate, limit.cost)
+                    if not allowed:
+                        RATE_LIMITED.inc(limit.name)
+                        response = jsonify({'msg': 'Too many attempts, please retry later'})
+                        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                        return response, 429
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,81 @@
+# Per-request metrics for the Flask app: request count and latency per blueprint and
+# route, DB round trips per request, and process memory.
+#
+# The hooks only read a clock, thread-locals and a few attributes of the request,
+# then update three dicts under a lock: a few microseconds per request. The start
+# time is kept in a thread-local rather than flask.g, and the request proxy is
+# resolved once, because each context-local lookup costs about a microsecond.
+# Latency is measured until the view returns, so for streamed responses (the activity
+# export) it covers time to first byte rather than the whole body.
+
+import os
+import time
+import threading
+from flask import request
+from utils.db import reset_db_round_trips, db_round_trips
+from utils.metrics import Counter, Gauge, Histogram
+
+REQUESTS = Counter(
+    'farmalyze_http_requests_total',
+    'HTTP requests handled',
+    ['blueprint', 'route', 'method', 'status']
+)
+REQUEST_SECONDS = Histogram(
+    'farmalyze_http_request_duration_seconds',
+    'Time from request start until the view returned a response',
+    ['blueprint', 'route', 'method']
+)
+# In remote mode every statement and commit is a network round trip to Turso; in
+# replica mode reads are served from the local file but are still counted here
+DB_ROUND_TRIPS = Histogram(
+    'farmalyze_db_round_trips_per_request',
+    'Database statements and commits issued while handling a request',
+    ['blueprint', 'route'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_START_TIME = time.time()
+_local = threading.local()
+
+def process_rss_bytes():
+    """Resident set size from /proc/self/statm, or None where that isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+def uptime_seconds():
+    return time.time() - _START_TIME
+
+def _rss_sample():
+    rss = process_rss_bytes()
+    return {} if rss is None else rss
+
+Gauge('process_resident_memory_bytes', 'Resident memory size in bytes', callback=_rss_sample)
+Gauge('process_start_time_seconds', 'Start time of the process since the epoch', callback=lambda: _START_TIME)
+
+def _before_request():
+    _local.start = time.perf_counter()
+    reset_db_round_trips()
+
+def _after_request(response):
+    start = _local.__dict__.pop('start', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    req = request._get_current_object()
+    rule = req.url_rule
+    route = rule.rule if rule is not None else '<unmatched>'
+    blueprint = req.blueprint or 'app'
+    method = req.method
+    REQUESTS.inc(blueprint, route, method, response.status_code)
+    REQUEST_SECONDS.observe(elapsed, blueprint, route, method)
+    DB_ROUND_TRIPS.observe(db_round_trips(), blueprint, route)
+    return response
+
+def init_request_metrics(app):
+    """Install the request hooks. Call before registering other after_request hooks."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,51 @@
+# Input pipeline and prediction for the legacy ResNet9 disease model (utils/model.py),
+# shared by app2.py and the disease cascade (utils/cascade.py).
+#
+# Every image is resized and center-cropped to the 256x256 input the model was trained
+# on, so batches always have the same shape. Pixels are written into a per-thread input
+# tensor that is reused across requests; it is kept in channels_last memory, which is
+# both the layout PIL/numpy produce (HWC) and the one the optimized model
+# (utils/inference_opt.py) runs in.
+
+import threading
+
+import numpy as np
+import torch
+from torchvision import transforms
+
+from utils.disease_classes import disease_classes
+
+INPUT_SIZE = 256
+
+resize_and_crop = transforms.Compose([
+    transforms.Resize(INPUT_SIZE),
+    transforms.CenterCrop(INPUT_SIZE),
+])
+
+_buffers = threading.local()
+
+def input_buffer():
+    """This thread's reusable 1x3x256x256 float batch."""
+    batch = getattr(_buffers, 'batch', None)
+    if batch is None:
+        batch = torch.empty(1, 3, INPUT_SIZE, INPUT_SIZE).contiguous(memory_format=torch.channels_last)
+        _buffers.batch = batch
+    return batch
+
+def image_to_batch(image, out=None):
+    """
+    Resize, crop and scale an RGB PIL image to [0, 1] like transforms.ToTensor(), written
+    into `out` (default: this thread's buffer, overwritten by the next call).
+    """
+    if out is None:
+        out = input_buffer()
+    pixels = torch.from_numpy(np.array(resize_and_crop(image), dtype=np.uint8))
+    out[0].copy_(pixels.permute(2, 0, 1))
+    return out.div_(255)
+
+def predict(model, image, classes=disease_classes):
+    """(label, confidence) of the ResNet9 for an RGB PIL image."""
+    with torch.inference_mode():
+        logits = model(image_to_batch(image))
+    confidence, index = torch.softmax(logits, dim=1)[0].max(0)
+    return classes[index.item()], confidence.item()
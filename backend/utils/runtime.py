@@ -0,0 +1,63 @@
+# Per-worker runtime settings for CPU inference.
+#
+# By default PyTorch sizes its intra-op pool to every core of the machine, in every
+# worker process. With several gunicorn workers that means workers x cores threads
+# fighting over the same cores, which hurts tail latency. configure_worker() gives
+# each worker its share instead:
+#   TORCH_NUM_THREADS      intra-op threads (0 = this worker's share of the cores)
+#   TORCH_INTEROP_THREADS  inter-op threads (default 1; the models have no parallel branches)
+#   CPU_AFFINITY           off (default) or auto: pin worker i to the i-th contiguous
+#                          slice of the available cores, so its threads keep warm caches
+
+import os
+
+def available_cpus():
+    """CPUs this process may run on (respects container/cgroup affinity)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def cpu_slice(index, workers, cpus):
+    """The contiguous share of `cpus` for worker `index` of `workers`."""
+    per_worker = max(1, len(cpus) // workers)
+    start = (index * per_worker) % len(cpus)
+    return cpus[start:start + per_worker]
+
+def configure_torch_threads(num_threads, interop_threads=None):
+    """Set torch's thread pools; returns False if torch isn't installed."""
+    try:
+        import torch
+    except ImportError:
+        return False
+    torch.set_num_threads(num_threads)
+    if interop_threads:
+        try:
+            torch.set_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Only allowed before the first inter-op parallel work in the process
+            print(f"Could not set torch interop threads: {e}")
+    return True
+
+def configure_worker(index=0, workers=1):
+    """
+    Apply the thread and affinity settings for worker `index` of `workers`.
+    Call in each worker process before it serves requests (gunicorn post_fork).
+    """
+    cpus = available_cpus()
+    share = cpu_slice(index, workers, cpus)
+
+    pinned = None
+    if os.getenv('CPU_AFFINITY', 'off').strip().lower() == 'auto' and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, share)
+        pinned = share
+
+    num_threads = int(os.getenv('TORCH_NUM_THREADS', 0)) or len(share)
+    interop_threads = int(os.getenv('TORCH_INTEROP_THREADS', 1))
+    configure_torch_threads(num_threads, interop_threads)
+
+    return {
+        'worker': index,
+        'torch_threads': num_threads,
+        'interop_threads': interop_threads,
+        'cpus': pinned,
+    }